@@ -1,17 +1,30 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
+import argparse
+import contextlib
 import logging
 import os
-from dxf_processor import DxfProcessor
-from gcode_visualizer import GcodeVisualizer
-from typing import List, Dict, Tuple, Set, Any
+from dxf_processor import DxfProcessor, ExtractionFilter, GcodeProgram, dxf_handle
+from edit_history import EditHistory, TrajectoryEdit, apply_edit, block_move_order
+from gcode_text_view import VirtualGcodeText
+from toolpath_segments import PathGroup, build_path_groups, TRAJECTORY_COLORS
+from background_worker import BackgroundTask
+from instrumentation import ProfileSession, StageRecorder, NULL_RECORDER
+from typing import List, Dict, Tuple, Set, Any, Hashable, Optional, Iterable, Sequence
+
+ISOLATED_PARENT_ID = "isolated_circles_parent" # Élément de l'arbre qui regroupe les cercles isolés
 
 # Configuration du logging pour l'application principale
 logging.basicConfig(level=logging.debug, format='[GCODE_VIS_APP] %(message)s')
 
+VISUALIZER_RENDERERS = ("matplotlib", "tk")
+
+
 class AppGUI:
-    def __init__(self, master):
+    def __init__(self, master, renderer: str = "matplotlib"):
+        """renderer : "matplotlib" (GcodeVisualizer) ou "tk" (TkCanvasVisualizer, démarrage sans matplotlib)."""
         self.master = master
+        self.renderer = renderer
         master.title("G-code Visualizer")
         master.geometry("1200x800")
 
@@ -21,110 +34,228 @@ class AppGUI:
         # --- État de l'application ---
         self.gcode_string = ""
         self.dxf_id_map: Dict[int, str] = {} # Map: line_idx -> original_dxf_id (from G-code generation)
+        self.gcode_program: Optional[GcodeProgram] = None # Dernier G-code généré, avec ses blocs par trajectoire
         self.ordered_trajectories: List[List[Dict]] = [] # Liste des listes de segments ordonnés
+        # Clé stable de chaque trajectoire (liste parallèle à ordered_trajectories), attribuée au
+        # chargement et conservée par les éditions : elle identifie les groupes déjà dessinés
+        # (mise à jour incrémentale du visualiseur) et fixe la couleur de la trajectoire
+        self.trajectory_keys: List[int] = []
+        self.path_groups: Dict[Hashable, PathGroup] = {} # Groupes du dernier dessin, par clé
         self.isolated_circles: List[Dict] = []
+        self.edit_history = EditHistory() # Éditions des trajectoires (défaire / refaire)
+        self.current_file_path = None # Fichier DXF actuellement chargé (pour le rechargement incrémental)
+        self.load_task = None # Chargement en arrière-plan en cours (BackgroundTask)
+        self.stage_recorder = NULL_RECORDER # Mesures par étape du dernier chargement
+        self.profile_session = None # Profil cProfile du chargement en cours (si activé)
 
         self.selected_dxf_ids: Set[str] = set() # Utiliser un set pour des recherches rapides et éviter les doublons
         self.dxf_id_to_line_map: Dict[str, List[int]] = {} # Map: original_id -> [line_idx, ...]
         # Map: original_dxf_id_segment -> parent_trajectory_tree_id (e.g., 'traj_0', 'isolated_circles_parent')
         self.dxf_id_to_traj_map: Dict[str, str] = {}
+        # Arbre peuplé à la demande : les enfants d'un parent ne sont insérés qu'à son ouverture.
+        # Un parent de trajectoire a pour id traj_<clé stable>, il suit donc la trajectoire
+        # quand elle est déplacée
+        self._tree_order: List[str] = [] # Parents, dans l'ordre de l'arbre
+        self._tree_parents: Dict[str, List[Dict]] = {} # Parent -> ses segments (trajectoire ou cercles isolés)
+        self._tree_children_loaded: Set[str] = set() # Parents dont les enfants sont insérés
+        # Index tenus à jour pour que la sélection et les déplacements coûtent selon le
+        # nombre d'entités concernées, et non selon la taille du dessin
+        self._selection_counts: Dict[str, int] = {} # Parent -> nombre de ses entités sélectionnées
+        self._tree_selection: Optional[Set[str]] = set() # Éléments sélectionnés dans l'arbre (None : à resynchroniser)
+        self._trajectory_positions: Dict[Hashable, int] = {} # Clé stable -> index dans ordered_trajectories
+        self._circle_positions: Dict[str, int] = {} # original_id d'un cercle isolé -> index dans isolated_circles
 
         self._is_programmatic_update = False # Flag pour éviter les boucles de mise à jour
 
-        self.trajectory_colors = [
-            "#FF6666", "#66CC66", "#6699FF", "#FFCC00", "#00CCCC", "#CC66FF", "#FF9966", "#66FFCC"
-        ]
+        self.trajectory_colors = list(TRAJECTORY_COLORS)
 
         self._setup_gui()
 
-    def regenerate_gcode_from_current_trajectories(self):
-        """Utilise les trajectoires déjà modifiées sans les régénérer automatiquement."""
-        all_ordered_segments = [seg for traj in self.ordered_trajectories for seg in traj]
-        self.gcode_string, self.dxf_id_map = self.dxf_processor.generate_gcode(
-            all_ordered_segments,
+    def regenerate_gcode_from_current_trajectories(self, changed_keys: Optional[Iterable[Hashable]] = ()):
+        """
+        Utilise les trajectoires déjà modifiées sans les régénérer automatiquement.
+        changed_keys : clés des trajectoires dont les segments ont changé (inversion, nouveau
+        premier élément) ; les trajectoires simplement déplacées ou supprimées n'en font pas partie.
+        None : trajectoires entièrement remplacées (rechargement), tout est reconstruit.
+        Le G-code des trajectoires inchangées est repris du programme précédent (voir
+        DxfProcessor.generate_gcode_program).
+        """
+        if changed_keys is None or len(self.trajectory_keys) != len(self.ordered_trajectories):
+            self._reset_trajectory_keys()
+            changed_keys = None
+        self._apply_gcode_program(self.dxf_processor.generate_gcode_program(
+            self.ordered_trajectories,
             self.isolated_circles,
-            (0.0, 0.0)
-        )
-
-        # Reconstruire la map ligne->id
-        self.dxf_id_to_line_map = {}
-        for line_idx, dxf_id_str in self.dxf_id_map.items():
-            handle = None
-            if '_' in dxf_id_str:
-                handle = dxf_id_str.split('_')[-1]
-            elif dxf_id_str.startswith(('L', 'A', 'C')) and len(dxf_id_str) > 1:
-                handle = dxf_id_str[1:]
-            if handle and handle not in ["HEADER", "INITIAL_POS", "FOOTER"]:
-                self.dxf_id_to_line_map.setdefault(handle, []).append(line_idx)
-
-        self.selected_dxf_ids.clear()
+            (0.0, 0.0),
+            trajectory_keys=self.trajectory_keys,
+            previous=self.gcode_program if changed_keys is not None else None,
+            changed_keys=changed_keys or ()
+        ))
+
+        self._clear_selection()
         self.update_gcode_text()
-        self.populate_treeview()
-        self.update_gcode_visualizer()
+        if changed_keys is None:
+            self.populate_treeview()
+        else:
+            self.update_treeview(changed_keys)
+        self.update_gcode_visualizer(changed_keys)
+
+    def _reset_trajectory_keys(self):
+        """
+        Nouvelles trajectoires (chargement, recalcul) : clés stables réattribuées dans l'ordre.
+        L'historique des éditions, qui désigne les trajectoires par leur clé, est vidé.
+        """
+        self.trajectory_keys = list(range(len(self.ordered_trajectories)))
+        self.edit_history.clear()
+        self._update_history_buttons()
+
+    def _trajectory_index(self, item_id: str) -> Optional[int]:
+        """Index dans ordered_trajectories du parent de trajectoire item_id de l'arbre, None sinon."""
+        if not item_id.startswith("traj_"):
+            return None
+        try:
+            return self._trajectory_positions.get(int(item_id[len("traj_"):]))
+        except ValueError:
+            return None
+
+    def _apply_gcode_program(self, program: GcodeProgram):
+        """Adopte un G-code généré (texte, maps ligne <-> ID DXF, blocs pour les éditions suivantes)."""
+        self.gcode_program = program
+        self.gcode_string, self.dxf_id_map = program.gcode, program.dxf_id_map
+        self.dxf_id_to_line_map = program.dxf_id_to_line_map
 
     def move_trajectory_up(self):
-        selected = self.gcode_tree.selection()
-        if not selected:
-            return
-        item_id = selected[0]
-        if item_id.startswith("traj_"):
-            idx = int(item_id.split("_")[1])
-            if idx > 0:
-                self.ordered_trajectories[idx - 1], self.ordered_trajectories[idx] = self.ordered_trajectories[idx], self.ordered_trajectories[idx - 1]
-                self.regenerate_gcode_from_current_trajectories()
-        elif item_id in [circle['original_id'] for circle in self.isolated_circles]:
-            idx = next((i for i, c in enumerate(self.isolated_circles) if c['original_id'] == item_id), None)
-            if idx is not None and idx > 0:
-                self.isolated_circles[idx - 1], self.isolated_circles[idx] = self.isolated_circles[idx], self.isolated_circles[idx - 1]
-                self.regenerate_gcode_from_current_trajectories()
-    def move_trajectory_down(self):
-        selected = self.gcode_tree.selection()
-        if not selected:
-            return
-        item_id = selected[0]
-        if item_id.startswith("traj_"):
-            idx = int(item_id.split("_")[1])
-            if idx < len(self.ordered_trajectories) - 1:
-                self.ordered_trajectories[idx + 1], self.ordered_trajectories[idx] = self.ordered_trajectories[idx], self.ordered_trajectories[idx + 1]
-                self.regenerate_gcode_from_current_trajectories()
-        elif item_id in [circle['original_id'] for circle in self.isolated_circles]:
-            idx = next((i for i, c in enumerate(self.isolated_circles) if c['original_id'] == item_id), None)
-            if idx is not None and idx < len(self.isolated_circles) - 1:
-                self.isolated_circles[idx + 1], self.isolated_circles[idx] = self.isolated_circles[idx], self.isolated_circles[idx + 1]
-                self.regenerate_gcode_from_current_trajectories()
-    def delete_selected_trajectory(self):
-        selected = self.gcode_tree.selection()
-        if not selected:
-            return
-        item_id = selected[0]
+        self._move_selected(-1)
 
-        if item_id.startswith("traj_"):
-            idx = int(item_id.split("_")[1])
-            del self.ordered_trajectories[idx]
-            self.regenerate_gcode_from_current_trajectories()
+    def move_trajectory_down(self):
+        self._move_selected(1)
 
-        elif item_id == "isolated_circles_parent":
-            # Supprime tous les cercles
-            self.isolated_circles.clear()
-            self.regenerate_gcode_from_current_trajectories()
+    def _selected_positions(self) -> Tuple[List[int], List[int]]:
+        """
+        Index (croissants) des trajectoires et des cercles isolés sélectionnés dans l'arbre ;
+        le parent des cercles isolés vaut pour tous les cercles. Les éditions groupées
+        agissent sur tous ces éléments à la fois, avec une seule régénération.
+        """
+        trajectory_positions, circle_positions = set(), set()
+        for item_id in self.gcode_tree.selection():
+            idx = self._trajectory_index(item_id)
+            if idx is not None:
+                trajectory_positions.add(idx)
+            elif item_id == ISOLATED_PARENT_ID:
+                circle_positions.update(range(len(self.isolated_circles)))
+            elif item_id in self._circle_positions:
+                circle_positions.add(self._circle_positions[item_id])
+        return sorted(trajectory_positions), sorted(circle_positions)
+
+    def _span_edit(self, label: str, trajectory_span: Tuple[int, int] = (0, 0), trajectory_order: Iterable[int] = (),
+                   circle_span: Tuple[int, int] = (0, 0), circle_order: Iterable[int] = ()) -> TrajectoryEdit:
+        """
+        Édition qui remplace les trajectoires [début, fin[ de trajectory_span par celles
+        d'index trajectory_order (index actuels, dans leur nouvel ordre ; celles de la tranche
+        qui n'y figurent pas sont supprimées), et de même pour les cercles isolés.
+        """
+        def pairs(indices):
+            return tuple((self.trajectory_keys[i], self.ordered_trajectories[i]) for i in indices)
+        first, stop = trajectory_span
+        circle_first, circle_stop = circle_span
+        return TrajectoryEdit(label, position=first, trajectories_before=pairs(range(first, stop)),
+                              trajectories_after=pairs(trajectory_order), circle_position=circle_first,
+                              circles_before=tuple(self.isolated_circles[circle_first:circle_stop]),
+                              circles_after=tuple(self.isolated_circles[i] for i in circle_order))
+
+    def _move_selected(self, step: int):
+        """
+        Déplace d'un cran (step = -1 : vers le début) les trajectoires et cercles isolés
+        sélectionnés ; les éléments contigus se déplacent en bloc.
+        """
+        trajectory_positions, circle_positions = self._selected_positions()
+        first, order = block_move_order(trajectory_positions, len(self.ordered_trajectories), step)
+        circle_first, circle_order = block_move_order(circle_positions, len(self.isolated_circles), step)
+        if order or circle_order:
+            self._perform_edit(self._span_edit("Monter" if step < 0 else "Descendre",
+                                               (first, first + len(order)), order,
+                                               (circle_first, circle_first + len(circle_order)), circle_order))
 
-        elif item_id in [circle['original_id'] for circle in self.isolated_circles]:
-            # Supprime un cercle isolé en particulier
-            self.isolated_circles = [c for c in self.isolated_circles if c['original_id'] != item_id]
-            self.regenerate_gcode_from_current_trajectories()
+    def delete_selected_trajectory(self):
+        """Supprime les trajectoires et cercles isolés sélectionnés."""
+        trajectory_positions, circle_positions = self._selected_positions()
+        if not trajectory_positions and not circle_positions:
+            return
+        trajectory_span = (trajectory_positions[0], trajectory_positions[-1] + 1) if trajectory_positions else (0, 0)
+        circle_span = (circle_positions[0], circle_positions[-1] + 1) if circle_positions else (0, 0)
+        deleted, deleted_circles = set(trajectory_positions), set(circle_positions)
+        self._perform_edit(self._span_edit(
+            "Supprimer", trajectory_span, [i for i in range(*trajectory_span) if i not in deleted],
+            circle_span, [i for i in range(*circle_span) if i not in deleted_circles]))
 
     def reverse_selected_trajectory(self):
-        selected = self.gcode_tree.selection()
-        if not selected:
+        """Inverse le sens de parcours des trajectoires sélectionnées."""
+        trajectory_positions, _ = self._selected_positions()
+        if not trajectory_positions:
+            return
+        first, stop = trajectory_positions[0], trajectory_positions[-1] + 1
+        reversed_positions = set(trajectory_positions)
+        before = tuple(zip(self.trajectory_keys[first:stop], self.ordered_trajectories[first:stop]))
+        after = tuple((key, traj[::-1] if first + offset in reversed_positions else traj)
+                      for offset, (key, traj) in enumerate(before))
+        self._perform_edit(TrajectoryEdit(
+            "Inverser", position=first, trajectories_before=before, trajectories_after=after,
+            reversed_segments=tuple(seg for i in trajectory_positions for seg in self.ordered_trajectories[i]),
+            changed_keys=frozenset(self.trajectory_keys[i] for i in trajectory_positions)))
+
+    def sort_selected_by_nearest(self):
+        """
+        Réordonne les trajectoires sélectionnées (puis les cercles isolés sélectionnés) par
+        plus proche voisin, aux places qu'elles occupent : chacune est suivie de celle dont
+        l'entrée est la plus proche de sa sortie, en partant de la position de l'outil avant
+        la première place. Le sens de parcours n'est pas modifié.
+        """
+        trajectory_positions, circle_positions = self._selected_positions()
+        trajectory_positions = [i for i in trajectory_positions if self.ordered_trajectories[i]]
+        if len(trajectory_positions) < 2 and len(circle_positions) < 2:
             return
-        item_id = selected[0]
-        if item_id.startswith("traj_"):
-            idx = int(item_id.split("_")[1])
-            traj = self.ordered_trajectories[idx]
-            for segment in traj:
-                self.dxf_processor._reverse_segment(segment)
-            traj.reverse()
-            self.regenerate_gcode_from_current_trajectories()
+
+        def circle_point(circle):
+            center_x, center_y = circle['coords']['center']
+            return center_x + circle['coords']['radius'], center_y # Entrée et sortie d'un cercle (voir _circle_gcode)
+
+        def exit_point(positions: Sequence[int]) -> Tuple[float, float]:
+            """Position de l'outil après les trajectoires d'index positions, dans cet ordre (aucune : origine)."""
+            for i in reversed(positions):
+                if self.ordered_trajectories[i]:
+                    return tuple(self.ordered_trajectories[i][-1]['coords']['end_point'][:2])
+            return 0.0, 0.0
+
+        trajectory_span, trajectory_order = (0, 0), []
+        if len(trajectory_positions) >= 2:
+            paths = [(tuple(self.ordered_trajectories[i][0]['coords']['start_point'][:2]),
+                      tuple(self.ordered_trajectories[i][-1]['coords']['end_point'][:2])) for i in trajectory_positions]
+            first, stop = trajectory_positions[0], trajectory_positions[-1] + 1
+            sorted_positions = iter([trajectory_positions[k] for k in
+                                     self.dxf_processor.order_by_nearest_neighbour(paths, exit_point(range(first)))])
+            selected = set(trajectory_positions)
+            trajectory_span = (first, stop)
+            trajectory_order = [next(sorted_positions) if i in selected else i for i in range(first, stop)]
+
+        circle_span, circle_order = (0, 0), []
+        if len(circle_positions) >= 2:
+            first, stop = circle_positions[0], circle_positions[-1] + 1
+            if first:
+                start_point = circle_point(self.isolated_circles[first - 1])
+            else:
+                # Les cercles suivent les trajectoires : départ après la dernière, dans leur nouvel ordre
+                final_order = list(range(len(self.ordered_trajectories)))
+                final_order[slice(*trajectory_span)] = trajectory_order
+                start_point = exit_point(final_order)
+            paths = [(circle_point(self.isolated_circles[i]),) * 2 for i in circle_positions]
+            sorted_positions = iter([circle_positions[k] for k in
+                                     self.dxf_processor.order_by_nearest_neighbour(paths, start_point)])
+            selected = set(circle_positions)
+            circle_span = (first, stop)
+            circle_order = [next(sorted_positions) if i in selected else i for i in range(first, stop)]
+
+        self._perform_edit(self._span_edit("Trier (plus proche)", trajectory_span, trajectory_order,
+                                           circle_span, circle_order))
 
     def mark_first_in_trajectory(self):
         selected = self.gcode_tree.selection()
@@ -134,41 +265,110 @@ class AppGUI:
         if not self.gcode_tree.tag_has("dxf_entity", item_id):
             return
 
-        for i, traj in enumerate(self.ordered_trajectories):
-            for j, seg in enumerate(traj):
-                if seg['original_id'] == item_id:
-                    new_traj = traj[j:] + traj[:j]
-                    start_seg = new_traj[0]
-                    reordered = [start_seg]
-                    remaining = new_traj[1:]
-                    active_pt = start_seg['coords']['end_point']
-
-                    while remaining:
-                        found = False
-                        for k, seg in enumerate(remaining):
-                            d = self.dxf_processor._calculate_distance(active_pt, seg['coords']['start_point'])
-                            dr = self.dxf_processor._calculate_distance(active_pt, seg['coords']['end_point'])
-                            if d <= self.dxf_processor.connection_tolerance:
-                                reordered.append(seg)
-                                active_pt = seg['coords']['end_point']
-                                remaining.pop(k)
-                                found = True
-                                break
-                            elif dr <= self.dxf_processor.connection_tolerance:
-                                self.dxf_processor._reverse_segment(seg)
-                                reordered.append(seg)
-                                active_pt = seg['coords']['end_point']
-                                remaining.pop(k)
-                                found = True
-                                break
-                        if not found:
-                            break
-                    self.ordered_trajectories[i] = reordered
-                    self.regenerate_gcode_from_current_trajectories()
-                    return
+        i = self._trajectory_index(self.dxf_id_to_traj_map.get(item_id, ""))
+        if i is None:
+            return
+        traj = self.ordered_trajectories[i]
+        j = next(j for j, seg in enumerate(traj) if seg['original_id'] == item_id)
+        new_traj = traj[j:] + traj[:j]
+        start_seg = new_traj[0]
+        reordered = [start_seg]
+        reversed_segments = [] # Inversés à l'application de l'édition
+        remaining = new_traj[1:]
+        active_pt = start_seg['coords']['end_point']
+
+        while remaining:
+            found = False
+            for k, seg in enumerate(remaining):
+                d = self.dxf_processor._calculate_distance(active_pt, seg['coords']['start_point'])
+                dr = self.dxf_processor._calculate_distance(active_pt, seg['coords']['end_point'])
+                if d <= self.dxf_processor.connection_tolerance:
+                    reordered.append(seg)
+                    active_pt = seg['coords']['end_point']
+                    remaining.pop(k)
+                    found = True
+                    break
+                elif dr <= self.dxf_processor.connection_tolerance:
+                    reversed_segments.append(seg)
+                    reordered.append(seg)
+                    active_pt = seg['coords']['start_point'] # Extrémité d'arrivée une fois inversé
+                    remaining.pop(k)
+                    found = True
+                    break
+            if not found:
+                break
+        key = self.trajectory_keys[i]
+        self._perform_edit(TrajectoryEdit("Marquer comme 1er élément", position=i,
+                                          trajectories_before=((key, traj),), trajectories_after=((key, reordered),),
+                                          reversed_segments=tuple(reversed_segments), changed_keys=frozenset((key,))))
+
+    def _perform_edit(self, edit: TrajectoryEdit):
+        """Applique une nouvelle édition et l'ajoute à l'historique (la pile refaire est vidée)."""
+        self.edit_history.record(edit)
+        self._apply_edit(edit)
+
+    def undo_edit(self):
+        edit = self.edit_history.undo()
+        if edit is not None:
+            self._apply_edit(edit)
+            self.status_label.config(text=f"Défait : {edit.label}")
+
+    def redo_edit(self):
+        edit = self.edit_history.redo()
+        if edit is not None:
+            self._apply_edit(edit)
+            self.status_label.config(text=f"Refait : {edit.label}")
+
+    def _apply_edit(self, edit: TrajectoryEdit):
+        """
+        Applique une édition (directe, défaite ou refaite) aux trajectoires, tient à jour la map
+        entité -> parent pour les seules trajectoires et cercles qui apparaissent ou disparaissent,
+        puis régénère de façon incrémentale (seules les trajectoires de edit.changed_keys sont
+        reconstruites).
+        """
+        apply_edit(edit, self.ordered_trajectories, self.trajectory_keys, self.isolated_circles,
+                   self.dxf_processor._reverse_segment)
+        before_keys = {key for key, _ in edit.trajectories_before}
+        after_keys = {key for key, _ in edit.trajectories_after}
+        for key, trajectory in edit.trajectories_before:
+            if key not in after_keys or key in edit.changed_keys:
+                for seg in trajectory:
+                    self.dxf_id_to_traj_map.pop(seg['original_id'], None)
+        for key, trajectory in edit.trajectories_after:
+            if key not in before_keys or key in edit.changed_keys:
+                for seg in trajectory:
+                    self.dxf_id_to_traj_map[seg['original_id']] = f"traj_{key}"
+        before_ids = {circle['original_id'] for circle in edit.circles_before}
+        after_ids = {circle['original_id'] for circle in edit.circles_after}
+        for circle_id in before_ids - after_ids:
+            self.dxf_id_to_traj_map.pop(circle_id, None)
+        for circle_id in after_ids - before_ids:
+            self.dxf_id_to_traj_map[circle_id] = ISOLATED_PARENT_ID
+
+        self.regenerate_gcode_from_current_trajectories(edit.changed_keys)
+        self._update_history_buttons()
+
+    def _update_history_buttons(self):
+        self.undo_button.config(state="normal" if self.edit_history.undo_label else "disabled")
+        self.redo_button.config(state="normal" if self.edit_history.redo_label else "disabled")
 
     def _setup_gui(self):
         """Construit l'interface graphique."""
+        # --- Menu Outils (instrumentation) ---
+        self.measure_stages_var = tk.BooleanVar(value=False)
+        self.profile_load_var = tk.BooleanVar(value=False)
+        self.sample_tk_loop_var = tk.BooleanVar(value=False)
+        menubar = tk.Menu(self.master)
+        self.tools_menu = tk.Menu(menubar, tearoff=0)
+        self.tools_menu.add_checkbutton(label="Mesurer les étapes", variable=self.measure_stages_var)
+        self.tools_menu.add_command(label="Exporter les mesures (JSON)...", command=self.export_stage_measurements)
+        self.tools_menu.add_separator()
+        self.tools_menu.add_checkbutton(label="Profiler le chargement (cProfile)", variable=self.profile_load_var)
+        self.tools_menu.add_checkbutton(label="Échantillonner la boucle Tk (pan/zoom)", variable=self.sample_tk_loop_var,
+                                        command=self.toggle_tk_loop_sampling)
+        menubar.add_cascade(label="Outils", menu=self.tools_menu)
+        self.master.config(menu=menubar)
+
         self.main_frame = ttk.Frame(self.master, padding="10")
         self.main_frame.pack(fill="both", expand=True)
 
@@ -176,9 +376,17 @@ class AppGUI:
         top_frame = ttk.Frame(self.main_frame)
         top_frame.pack(fill="x", pady=5)
         ttk.Button(top_frame, text="Load DXF", command=self.load_dxf_file).pack(side="left", padx=5)
+        ttk.Button(top_frame, text="Reload DXF", command=self.reload_dxf_file).pack(side="left", padx=5)
         ttk.Button(top_frame, text="Regenerate G-code", command=self.regenerate_gcode_and_update_gui).pack(side="left", padx=5)
         ttk.Button(top_frame, text="Save G-code", command=self.save_gcode_file).pack(side="left", padx=5)
 
+        # Filtres d'extraction : calques à conserver (noms ou motifs séparés par des virgules)
+        self.layer_filter_var = tk.StringVar()
+        self.group_by_layer_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Grouper par calque", variable=self.group_by_layer_var).pack(side="right", padx=5)
+        ttk.Entry(top_frame, textvariable=self.layer_filter_var, width=25).pack(side="right", padx=2)
+        ttk.Label(top_frame, text="Calques (ex. CUT, MARK*) :").pack(side="right", padx=2)
+
         # --- Barre d'outils de réorganisation ---
         toolbar_frame = ttk.Frame(self.main_frame)
         toolbar_frame.pack(fill="x", pady=2)
@@ -187,7 +395,14 @@ class AppGUI:
         ttk.Button(toolbar_frame, text="Descendre", command=self.move_trajectory_down).pack(side="left", padx=2)
         ttk.Button(toolbar_frame, text="Supprimer", command=self.delete_selected_trajectory).pack(side="left", padx=2)
         ttk.Button(toolbar_frame, text="Inverser", command=self.reverse_selected_trajectory).pack(side="left", padx=2)
+        ttk.Button(toolbar_frame, text="Trier (plus proche)", command=self.sort_selected_by_nearest).pack(side="left", padx=2)
         ttk.Button(toolbar_frame, text="Marquer comme 1er élément", command=self.mark_first_in_trajectory).pack(side="left", padx=2)
+        self.redo_button = ttk.Button(toolbar_frame, text="Refaire", command=self.redo_edit, state="disabled")
+        self.redo_button.pack(side="right", padx=2)
+        self.undo_button = ttk.Button(toolbar_frame, text="Défaire", command=self.undo_edit, state="disabled")
+        self.undo_button.pack(side="right", padx=2)
+        self.master.bind("<Control-z>", lambda event: self.undo_edit())
+        self.master.bind("<Control-y>", lambda event: self.redo_edit())
 
         # --- Panneau de contenu principal (Visualiseur, Arbre, Texte G-code) ---
         content_frame = ttk.Frame(self.main_frame)
@@ -200,8 +415,15 @@ class AppGUI:
         # --- G-code Visualizer (colonne 0, ligne 0) ---
         vis_frame = ttk.LabelFrame(content_frame, text="Visualiseur G-code", padding="5")
         vis_frame.grid(row=0, column=0, sticky="nsew", padx=5, pady=5)
-        self.gcode_visualizer = GcodeVisualizer(vis_frame)
+        # Import à la demande : le visualiseur Tk Canvas évite le chargement de matplotlib
+        if self.renderer == "tk":
+            from tk_canvas_visualizer import TkCanvasVisualizer
+            self.gcode_visualizer = TkCanvasVisualizer(vis_frame)
+        else:
+            from gcode_visualizer import GcodeVisualizer
+            self.gcode_visualizer = GcodeVisualizer(vis_frame)
         self.gcode_visualizer.pack(fill="both", expand=True)
+        self.gcode_visualizer.on_entity_clicked = self.on_canvas_pick
         
 
         # --- DXF Elements Treeview (colonne 1, ligne 0) ---
@@ -214,37 +436,199 @@ class AppGUI:
         self.gcode_tree.pack(side="left", fill="both", expand=True)
         # Lié à <<TreeviewSelect>> pour gérer la sélection de l'utilisateur
         self.gcode_tree.bind("<<TreeviewSelect>>", self.on_tree_select)
+        # Les enfants d'une trajectoire ne sont insérés qu'à son ouverture
+        self.gcode_tree.bind("<<TreeviewOpen>>", self.on_tree_open)
         # --- G-code Text Output (sur les 2 colonnes, ligne 1) ---
         text_frame = ttk.LabelFrame(content_frame, text="Sortie G-code", padding="5")
         text_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
-        # Utiliser une couleur de fond blanche pour permettre la sélection
-        self.gcode_text = tk.Text(text_frame, wrap="none", bg="white", undo=True, state="normal")
-        v_scroll = ttk.Scrollbar(text_frame, orient="vertical", command=self.gcode_text.yview)
-        h_scroll = ttk.Scrollbar(text_frame, orient="horizontal", command=self.gcode_text.xview)
-        self.gcode_text.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
-        v_scroll.pack(side="right", fill="y")
-        h_scroll.pack(side="bottom", fill="x")
+        # Vue virtualisée : seules les lignes visibles (et une marge) sont dans le tk.Text
+        self.gcode_text = VirtualGcodeText(text_frame, bg="white")
         self.gcode_text.pack(side="left", fill="both", expand=True)
         # Utiliser ButtonRelease-1 est plus fiable pour détecter un clic utilisateur
-        self.gcode_text.bind("<ButtonRelease-1>", self.on_gcode_text_select)
-
-        # --- Barre de statut ---
-        self.status_label = ttk.Label(self.main_frame, text="Prêt", relief="sunken", anchor="w")
-        self.status_label.pack(side="bottom", fill="x", pady=(5,0))
+        self.gcode_text.text.bind("<ButtonRelease-1>", self.on_gcode_text_select)
+
+        # --- Barre de statut (avec progression et annulation des chargements) ---
+        status_frame = ttk.Frame(self.main_frame)
+        status_frame.pack(side="bottom", fill="x", pady=(5,0))
+        self.cancel_button = ttk.Button(status_frame, text="Annuler", command=self.cancel_background_task, state="disabled")
+        self.cancel_button.pack(side="right", padx=(5,0))
+        self.progress_bar = ttk.Progressbar(status_frame, orient="horizontal", mode="determinate", maximum=1.0, length=200)
+        self.progress_bar.pack(side="right", padx=(5,0))
+        self.status_label = ttk.Label(status_frame, text="Prêt", relief="sunken", anchor="w")
+        self.status_label.pack(side="left", fill="x", expand=True)
 
     def load_dxf_file(self):
-        """Ouvre un fichier DXF, le traite et met à jour l'IHM."""
+        """Ouvre un fichier DXF et le traite en arrière-plan, puis met à jour l'IHM."""
+        if self.load_task is not None and self.load_task.running:
+            messagebox.showinfo("Chargement en cours", "Un fichier DXF est déjà en cours de chargement.")
+            return
         file_path = filedialog.askopenfilename(filetypes=[("DXF Files", "*.dxf"), ("All Files", "*.*")])
         if not file_path: return
 
         self.status_label.config(text=f"Chargement de {os.path.basename(file_path)}...")
-        dxf_entities = self.dxf_processor.extract_dxf_entities(file_path)
-        if dxf_entities:
-            self.regenerate_gcode_and_update_gui(dxf_entities)
-            self.status_label.config(text=f"Fichier {os.path.basename(file_path)} traité.")
-        else:
+        entity_filter = self._build_extraction_filter()
+        group_by_layer = self.group_by_layer_var.get()
+        connection_tolerance = self.dxf_processor.connection_tolerance
+        self.stage_recorder.close()
+        self.stage_recorder = StageRecorder() if self.measure_stages_var.get() else NULL_RECORDER
+        recorder = self.stage_recorder
+        # Profil écrit à côté du fichier DXF : <dxf>_profile.pstats et <dxf>_profile.txt
+        self.profile_session = ProfileSession(os.path.splitext(file_path)[0] + "_profile") if self.profile_load_var.get() else None
+        profile_session = self.profile_session
+
+        def pipeline(progress_callback, cancel_event):
+            # Processeur dédié : l'état courant n'est remplacé qu'une fois le chargement abouti
+            # (cProfile ne suit que le thread courant : le profil est donc activé ici, dans le thread de chargement)
+            with profile_session.profile() if profile_session else contextlib.nullcontext():
+                return DxfProcessor(connection_tolerance, instrumentation=recorder).run_pipeline(
+                    file_path, entity_filter, group_by_layer=group_by_layer,
+                    progress_callback=progress_callback, cancel_event=cancel_event)
+
+        self.load_task = BackgroundTask(
+            self.master, pipeline,
+            on_progress=self._show_progress,
+            on_done=lambda result: self._on_load_done(file_path, result),
+            on_error=self._on_load_error,
+            on_cancelled=self._on_load_cancelled)
+        self._set_busy(True)
+        self.load_task.start()
+
+    def cancel_background_task(self):
+        if self.load_task is not None and self.load_task.running:
+            self.load_task.cancel()
+            self.status_label.config(text="Annulation en cours...")
+
+    def _set_busy(self, busy: bool):
+        self.progress_bar['value'] = 0.0
+        self.cancel_button.config(state="normal" if busy else "disabled")
+        if not busy:
+            self.stage_recorder.close() # Arrête tracemalloc ; les mesures restent consultables
+            self.profile_session = None
+
+    def _save_load_profile(self, file_path: str) -> str:
+        """Enregistre le profil du chargement ; retourne un texte pour la barre de statut."""
+        try:
+            stats_path = self.profile_session.save(f"Profil du chargement de {file_path}")
+        except OSError as e:
+            logging.error(f"Impossible d'enregistrer le profil : {e}")
+            return " Profil non enregistré."
+        return f" Profil : {os.path.basename(stats_path)}." if stats_path else ""
+
+    def toggle_tk_loop_sampling(self):
+        """Démarre/arrête l'échantillonnage de la boucle Tk ; à l'arrêt, le résumé est écrit à côté du DXF."""
+        if self.sample_tk_loop_var.get():
+            self.gcode_visualizer.start_loop_sampling()
+            self.status_label.config(text="Échantillonnage de la boucle Tk : naviguez (pan/zoom) puis désactivez l'option.")
+            return
+        summary = self.gcode_visualizer.stop_loop_sampling()
+        if not summary:
+            return
+        logging.info(summary)
+        if self.current_file_path:
+            report_path = os.path.splitext(self.current_file_path)[0] + "_tk_loop.txt"
+            try:
+                with open(report_path, 'w') as f:
+                    f.write(summary + "\n")
+            except OSError as e:
+                logging.error(f"Impossible d'écrire {report_path} : {e}")
+        self.status_label.config(text=summary.replace("\n", " |"))
+
+    def export_stage_measurements(self):
+        if not self.stage_recorder.enabled or not self.stage_recorder.records:
+            messagebox.showinfo("Mesures", "Aucune mesure : activez « Mesurer les étapes » puis chargez un fichier.")
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON", "*.json")])
+        if file_path:
+            self.stage_recorder.dump_json(file_path)
+
+    def _show_progress(self, stage: str, fraction: float):
+        self.progress_bar['value'] = fraction
+        self.status_label.config(text=f"{stage}...")
+        self.master.update_idletasks()
+
+    def _on_load_done(self, file_path: str, result):
+        """Applique le résultat du chargement (sur le thread Tk)."""
+        if result is None:
+            self._set_busy(False)
             messagebox.showerror("Erreur DXF", "Impossible de lire ou traiter le fichier DXF.")
             self.status_label.config(text="Échec du chargement DXF.")
+            return
+        if self.load_task.cancel_event.is_set():
+            self._on_load_cancelled()
+            return
+
+        self._show_progress("Mise à jour de l'affichage", 0.9)
+        self.dxf_processor.current_dxf_entities = result['entities']
+        self.current_file_path = file_path
+        self.ordered_trajectories = result['ordered_trajectories']
+        self.isolated_circles = result['isolated_circles']
+        self._reset_trajectory_keys()
+        self._apply_gcode_program(result['gcode_program'])
+        self._clear_selection()
+
+        recorder = self.stage_recorder
+        profile_session = self.profile_session
+        with profile_session.profile() if profile_session else contextlib.nullcontext():
+            with recorder.stage("texte G-code") as stage:
+                self.update_gcode_text()
+                stage.count(len(self.dxf_id_map))
+            with recorder.stage("arbre") as stage:
+                self.populate_treeview()
+                stage.count(len(self.dxf_id_to_traj_map))
+            with recorder.stage("visualiseur") as stage:
+                self.update_gcode_visualizer()
+                stage.count(self.gcode_visualizer.cut_count)
+            if recorder.enabled or profile_session:
+                # Le rendu est normalement différé (RedrawScheduler, inactivité Tk) : on le force pour le mesurer
+                with recorder.stage(f"rendu {self.renderer}"):
+                    self.gcode_visualizer.flush_redraw()
+        status = f"Fichier {os.path.basename(file_path)} traité."
+        if recorder.enabled:
+            status += f" {recorder.summary()}"
+        if profile_session:
+            status += self._save_load_profile(file_path)
+        self._set_busy(False)
+        self.status_label.config(text=status)
+
+    def _on_load_error(self, error: BaseException):
+        self._set_busy(False)
+        messagebox.showerror("Erreur DXF", f"Échec du traitement du fichier DXF : {error}")
+        self.status_label.config(text="Échec du chargement DXF.")
+
+    def _on_load_cancelled(self):
+        self._set_busy(False)
+        self.status_label.config(text="Chargement annulé.")
+
+    def reload_dxf_file(self):
+        """
+        Relit le fichier DXF courant après modification sur disque, en conservant
+        l'ordre et le sens des trajectoires que la modification ne touche pas.
+        """
+        if not self.current_file_path or not self.ordered_trajectories and not self.isolated_circles:
+            self.load_dxf_file()
+            return
+
+        file_name = os.path.basename(self.current_file_path)
+        self.status_label.config(text=f"Rechargement de {file_name}...")
+        result = self.dxf_processor.reload_dxf_entities(
+            self.current_file_path, self.ordered_trajectories, self.isolated_circles,
+            self._build_extraction_filter(), group_by_layer=self.group_by_layer_var.get())
+        if result is None:
+            messagebox.showerror("Erreur DXF", "Impossible de relire le fichier DXF.")
+            self.status_label.config(text="Échec du rechargement DXF.")
+            return
+
+        _, self.ordered_trajectories, self.isolated_circles, diff = result
+        self.regenerate_gcode_from_current_trajectories(changed_keys=None)
+        self.status_label.config(text=f"Fichier {file_name} rechargé : {len(diff['added'])} ajoutées, "
+                                      f"{len(diff['removed'])} supprimées, {len(diff['modified'])} modifiées.")
+
+    def _build_extraction_filter(self):
+        """Construit le filtre d'extraction à partir des champs de l'IHM (None si aucun filtre)."""
+        layer_patterns = self.layer_filter_var.get().strip()
+        if not layer_patterns:
+            return None
+        return ExtractionFilter(layers=layer_patterns)
 
     def regenerate_gcode_and_update_gui(self, dxf_entities=None):
         """Génère le G-code et met à jour tous les composants de l'IHM."""
@@ -255,30 +639,15 @@ class AppGUI:
             return
 
         logging.info("Régénération du G-code et mise à jour de l'IHM...")
-        self.ordered_trajectories, self.isolated_circles = self.dxf_processor.generate_auto_path(dxf_entities)
-
-        all_ordered_segments = [seg for traj in self.ordered_trajectories for seg in traj]
-
-        self.gcode_string, self.dxf_id_map = self.dxf_processor.generate_gcode(all_ordered_segments, self.isolated_circles, (0.0, 0.0))
-
-        # Créer la map inversée pour la nouvelle architecture
-        self.dxf_id_to_line_map = {}
-        for line_idx, dxf_id_str in self.dxf_id_map.items():
-            handle = None
-            # Extract the actual DXF handle (e.g., 'A123' -> '123')
-            # This part needs to match how your dxf_processor.py formats the original_id
-            if '_' in dxf_id_str: # For "JUMP_TO_DXF_ABC"
-                handle = dxf_id_str.split('_')[-1]
-            elif dxf_id_str.startswith(('L', 'A', 'C')) and len(dxf_id_str) > 1: # For "LABC", "AXYZ", "C123"
-                handle = dxf_id_str[1:]
-            
-            if handle and handle not in ["HEADER", "INITIAL_POS", "FOOTER"]: # Filter out non-entity IDs
-                if handle not in self.dxf_id_to_line_map:
-                    self.dxf_id_to_line_map[handle] = []
-                self.dxf_id_to_line_map[handle].append(line_idx)
+        self.ordered_trajectories, self.isolated_circles = self.dxf_processor.generate_auto_path(
+            dxf_entities, group_by_layer=self.group_by_layer_var.get())
+        self._reset_trajectory_keys()
+
+        self._apply_gcode_program(self.dxf_processor.generate_gcode_program(
+            self.ordered_trajectories, self.isolated_circles, (0.0, 0.0)))
         
         # Réinitialiser la sélection
-        self.selected_dxf_ids.clear()
+        self._clear_selection()
 
         # Mettre à jour les widgets
         self.update_gcode_text()
@@ -299,182 +668,278 @@ class AppGUI:
                 messagebox.showerror("Erreur de sauvegarde", f"Échec de la sauvegarde : {e}")
 
     def update_gcode_text(self):
-        self.gcode_text.delete("1.0", tk.END)
-        self.gcode_text.insert("1.0", self.gcode_string)
+        self.gcode_text.set_lines(self.gcode_program.lines if self.gcode_program else self.gcode_string.splitlines())
 
     def populate_treeview(self):
         """
         Popule le Treeview avec les entités DXF regroupées par trajectoires.
         Cette version est basée sur la structure DXF (trajectoires et cercles isolés)
         et non directement sur les lignes de G-code.
+        Seuls les parents sont insérés, fermés, avec un enfant fictif qui rend le nœud
+        dépliable : leurs entités sont insérées à l'ouverture (on_tree_open).
         """
         self.gcode_tree.delete(*self.gcode_tree.get_children())
         self.dxf_id_to_traj_map.clear() # Vider la map avant de la remplir
+        self._tree_children_loaded.clear()
 
         # Afficher les trajectoires ordonnées
-        for i, trajectory in enumerate(self.ordered_trajectories):
-            traj_parent_id = f"traj_{i}"
-            # Le texte indique le nombre d'entités dans la trajectoire
-            self.gcode_tree.insert("", "end", traj_parent_id, 
-                                   text=f"Trajectoire {i+1} ({len(trajectory)} entités)", 
-                                   tags=("trajectory_parent",), open=True) 
-            
+        for i, (key, trajectory) in enumerate(zip(self.trajectory_keys, self.ordered_trajectories)):
+            traj_parent_id = f"traj_{key}"
+            self._insert_tree_parent(traj_parent_id, self._tree_parent_text(traj_parent_id, i), bool(trajectory))
+            # Mapper original_id à son élément parent du Treeview
             for seg in trajectory:
-                dxf_id = seg['original_id']
-                dxf_type = seg['type'] # e.g., 'LINE', 'ARC'
-                
-                # Utiliser dxf_id directement comme item_id pour la logique de sélection
-                self.gcode_tree.insert(traj_parent_id, "end", dxf_id, 
-                                       text=f"{dxf_type}: {dxf_id}", 
-                                       values=(dxf_id, dxf_type), # Stocker les données pertinentes
-                                       tags=("dxf_entity",)) # Nouveau tag pour les entités DXF individuelles
-                # Mapper original_id à son élément parent du Treeview
-                self.dxf_id_to_traj_map[dxf_id] = traj_parent_id
+                self.dxf_id_to_traj_map[seg['original_id']] = traj_parent_id
 
         # Afficher les cercles isolés
         if self.isolated_circles:
-            isolated_parent_id = "isolated_circles_parent" 
-            self.gcode_tree.insert("", "end", isolated_parent_id, 
-                                   text=f"Cercles isolés ({len(self.isolated_circles)} entités)", 
-                                   tags=("isolated_parent",), open=True) 
-            
+            self._insert_tree_parent(ISOLATED_PARENT_ID, self._tree_parent_text(ISOLATED_PARENT_ID), True)
             for circle in self.isolated_circles:
-                dxf_id = circle['original_id']
-                dxf_type = circle['type'] # Devrait être 'CIRCLE'
-                
-                self.gcode_tree.insert(isolated_parent_id, "end", dxf_id, 
-                                       text=f"{dxf_type}: {dxf_id}", 
-                                       values=(dxf_id, dxf_type),
-                                       tags=("dxf_entity",))
-                self.dxf_id_to_traj_map[dxf_id] = isolated_parent_id
-
-    def update_gcode_visualizer(self):
-        # Reconstruction complète avec déplacements G0 visibles
-        visualizer_segments = []
-        current_x, current_y = 0.0, 0.0  # position initiale
-        for i, trajectory in enumerate(self.ordered_trajectories):
-            color = self.trajectory_colors[i % len(self.trajectory_colors)]
-            for segment in trajectory:
-                sx, sy = segment['coords']['start_point']
-                if self.dxf_processor._calculate_distance((current_x, current_y), (sx, sy)) > self.dxf_processor.connection_tolerance:
-                    # Ajouter segment G0 fictif
-                    visualizer_segments.append({
-                        'type': 'LINE',
-                        'coords': {'start_point': (current_x, current_y), 'end_point': (sx, sy)},
-                        'color': 'gray',
-                        'original_id': f"JUMP_TO_DXF_{segment['original_id']}"
-                    })
-                visualizer_segments.append({
-                    'type': segment['type'],
-                    'coords': segment['coords'],
-                    'color': color,
-                    'original_id': segment['original_id'],
-                    'direction_reversed': segment.get('direction_reversed', False)
-                })
-                current_x, current_y = segment['coords']['end_point']
-        # Cercles isolés (même logique)
-        for circle in self.isolated_circles:
-            cx, cy = circle['coords']['center']
-            r = circle['coords']['radius']
-            sx, sy = (cx + r, cy)
-            if self.dxf_processor._calculate_distance((current_x, current_y), (sx, sy)) > self.dxf_processor.connection_tolerance:
-                visualizer_segments.append({
-                    'type': 'LINE',
-                    'coords': {'start_point': (current_x, current_y), 'end_point': (sx, sy)},
-                    'color': 'gray',
-                    'original_id': f"JUMP_TO_CIRCLE_{circle['original_id']}"
-                })
-            visualizer_segments.append({
-                'type': 'CIRCLE',
-                'coords': circle['coords'],
-                'color': 'red',
-                'original_id': circle['original_id']
-            })
-            current_x, current_y = sx, sy
+                self.dxf_id_to_traj_map[circle['original_id']] = ISOLATED_PARENT_ID
+        self._index_tree_parents()
 
-        # Mettre à jour le visualiseur avec les segments
-        self.gcode_visualizer.draw_gcode_path(visualizer_segments)
-
-    def _update_gcode_text_selection(self):
-        """Met à jour la sélection de l'éditeur de texte en fonction de self.selected_dxf_ids."""
-        logging.info(f"[GCODE_TEXT_SEL] Début _update_gcode_text_selection. selected_dxf_ids: {self.selected_dxf_ids}") # Nouveau log
-        self.gcode_text.tag_remove(tk.SEL, "1.0", tk.END)
-        self.gcode_text.focus_set()  # <-- Ajoute ceci pour forcer la sélection visible
-        gcode_lines_to_select = []
-        for dxf_id in self.selected_dxf_ids:
-            lines = self.dxf_id_to_line_map.get(dxf_id, [])
-            if not lines:
-                logging.warning(f"[GCODE_TEXT_SEL] Aucun G-code line_idx trouvé pour dxf_id: {dxf_id}. dxf_id_to_line_map: {self.dxf_id_to_line_map.keys()}")
-            gcode_lines_to_select.extend(lines)
-
-        logging.info(f"[GCODE_TEXT_SEL] Lignes G-code à sélectionner (avant tri/dedupl.): {gcode_lines_to_select}") # Nouveau log
-
-        if gcode_lines_to_select:
-            gcode_lines_to_select = sorted(list(set(gcode_lines_to_select)))
-            logging.info(f"[GCODE_TEXT_SEL] Lignes G-code à sélectionner (après tri/dedupl.): {gcode_lines_to_select}") # Nouveau log
-            for line_idx in gcode_lines_to_select:
-                self.gcode_text.tag_add(tk.SEL, f"{line_idx + 1}.0", f"{line_idx + 1}.end")
-                logging.info(f"[GCODE_TEXT_SEL] Sélection ajoutée pour la ligne: {line_idx + 1}") # Nouveau log
-            if gcode_lines_to_select:
-                self.gcode_text.see(f"{gcode_lines_to_select[0] + 1}.0")
-                logging.info(f"[GCODE_TEXT_SEL] Fait défiler jusqu'à la ligne: {gcode_lines_to_select[0] + 1}") # Nouveau log
+    def _index_tree_parents(self):
+        """Recalcule l'ordre des parents, leurs segments et les positions des trajectoires et cercles."""
+        self._tree_order = [f"traj_{key}" for key in self.trajectory_keys]
+        self._tree_parents = dict(zip(self._tree_order, self.ordered_trajectories))
+        if self.isolated_circles:
+            self._tree_order.append(ISOLATED_PARENT_ID)
+            self._tree_parents[ISOLATED_PARENT_ID] = self.isolated_circles
+        self._trajectory_positions = {key: position for position, key in enumerate(self.trajectory_keys)}
+        self._circle_positions = {circle['original_id']: position
+                                  for position, circle in enumerate(self.isolated_circles)}
+
+    def _tree_parent_text(self, parent_id: str, position: int = 0) -> str:
+        if parent_id == ISOLATED_PARENT_ID:
+            return f"Cercles isolés ({len(self.isolated_circles)} entités)"
+        trajectory = self.ordered_trajectories[position]
+        # Le texte indique le nombre d'entités dans la trajectoire (et son calque si groupé)
+        layer_label = f" [{trajectory[0].get('layer', '0')}]" if trajectory and self.group_by_layer_var.get() else ""
+        return f"Trajectoire {position+1}{layer_label} ({len(trajectory)} entités)"
+
+    def _insert_tree_parent(self, parent_id: str, text: str, has_children: bool, index="end"):
+        tag = "isolated_parent" if parent_id == ISOLATED_PARENT_ID else "trajectory_parent"
+        self.gcode_tree.insert("", index, parent_id, text=text, tags=(tag,), open=False)
+        if has_children:
+            self.gcode_tree.insert(parent_id, "end", tags=("placeholder",)) # Enfant fictif : nœud dépliable
+
+    def on_tree_open(self, event):
+        """Insère les entités du parent que l'utilisateur déplie (le parent ouvert a le focus)."""
+        self._load_tree_children(self.gcode_tree.focus())
+
+    def _load_tree_children(self, parent_id: str):
+        """Remplace l'enfant fictif d'un parent par ses entités, sélectionnées si elles le sont."""
+        segments = self._tree_parents.get(parent_id)
+        if segments is None or parent_id in self._tree_children_loaded:
+            return
+        self.gcode_tree.delete(*self.gcode_tree.get_children(parent_id))
+        for seg in segments:
+            dxf_id = seg['original_id']
+            dxf_type = seg['type'] # e.g., 'LINE', 'ARC', 'CIRCLE'
+            # Utiliser dxf_id directement comme item_id pour la logique de sélection
+            self.gcode_tree.insert(parent_id, "end", dxf_id,
+                                   text=f"{dxf_type}: {dxf_id}",
+                                   values=(dxf_id, dxf_type), # Stocker les données pertinentes
+                                   tags=("dxf_entity",)) # Nouveau tag pour les entités DXF individuelles
+        self._tree_children_loaded.add(parent_id)
+
+        if not self._selection_counts.get(parent_id):
+            return
+        selected_children = [seg['original_id'] for seg in segments if seg['original_id'] in self.selected_dxf_ids]
+        was_programmatic, self._is_programmatic_update = self._is_programmatic_update, True
+        try:
+            self.gcode_tree.selection_add(selected_children)
+        finally:
+            self._is_programmatic_update = was_programmatic
+        if self._tree_selection is not None:
+            self._tree_selection.update(selected_children)
+
+    def _reset_tree_children(self, parent_id: str):
+        """Les entités d'un parent ont changé : elles sont réinsérées s'il est ouvert, sinon à sa prochaine ouverture."""
+        self._tree_children_loaded.discard(parent_id)
+        self.gcode_tree.delete(*self.gcode_tree.get_children(parent_id))
+        if not self._tree_parents.get(parent_id):
+            return
+        if self.gcode_tree.item(parent_id, "open"):
+            self._load_tree_children(parent_id)
         else:
-            logging.info("[GCODE_TEXT_SEL] Aucune ligne G-code à sélectionner.")
+            self.gcode_tree.insert(parent_id, "end", tags=("placeholder",))
 
-    def _refresh_widgets_from_selection(self):
-        """Met à jour tous les widgets (visualiseur, texte, treeview) à partir de la source de vérité : self.selected_dxf_ids."""
+    def update_treeview(self, changed_keys: Iterable[Hashable] = ()):
+        """
+        Aligne l'arbre sur les trajectoires après une édition, sans le reconstruire : les
+        parents supprimés sont retirés, les autres déplacés (Treeview.move) à leur nouvelle
+        place avec leurs enfants et leur état ouvert/fermé. Seuls les libellés dont le numéro
+        change sont réécrits, et seules les entités des trajectoires de changed_keys sont
+        réinsérées (si elles étaient affichées).
+        """
+        old_positions = {parent_id: position for position, parent_id in enumerate(self._tree_order)}
+        self._index_tree_parents()
+
+        def insert_parent(parent_id: str, position: int):
+            self._insert_tree_parent(parent_id, self._tree_parent_text(parent_id, position),
+                                     bool(self._tree_parents[parent_id]), position)
+
+        removed = self._sync_tree_items("", self._tree_order, list(old_positions), insert_parent)
+        self._tree_children_loaded.difference_update(removed)
+
+        changed = {f"traj_{key}" for key in changed_keys}
+        for position, parent_id in enumerate(self._tree_order):
+            if parent_id not in old_positions:
+                continue # Inséré par _sync_tree_items, déjà à jour
+            if parent_id in changed:
+                self._reset_tree_children(parent_id)
+            if parent_id in changed or parent_id == ISOLATED_PARENT_ID or old_positions[parent_id] != position:
+                self.gcode_tree.item(parent_id, text=self._tree_parent_text(parent_id, position))
+
+        if ISOLATED_PARENT_ID in self._tree_children_loaded:
+            # Cercles déplacés ou supprimés un à un : mêmes opérations sur leurs éléments
+            circle_ids = [circle['original_id'] for circle in self.isolated_circles]
+            shown_ids = list(self.gcode_tree.get_children(ISOLATED_PARENT_ID))
+            if set(circle_ids).issubset(shown_ids):
+                self._sync_tree_items(ISOLATED_PARENT_ID, circle_ids, shown_ids)
+            else:
+                self._reset_tree_children(ISOLATED_PARENT_ID)
+
+    def _sync_tree_items(self, parent: str, desired: List[str], current: List[str], insert_item=None) -> List[str]:
+        """
+        Aligne les éléments de parent (actuellement current, dans l'ordre) sur desired :
+        suppression des absents, Treeview.move des éléments déplacés, insert_item(id, position)
+        pour les nouveaux. Retourne les éléments supprimés.
+        """
+        desired_set = set(desired)
+        removed = [item_id for item_id in current if item_id not in desired_set]
+        if removed:
+            self.gcode_tree.delete(*removed)
+        current = [item_id for item_id in current if item_id in desired_set]
+        existing = set(current)
+        for position, item_id in enumerate(desired):
+            if position < len(current) and current[position] == item_id:
+                continue
+            if item_id in existing:
+                self.gcode_tree.move(item_id, parent, position)
+                current.remove(item_id)
+            else:
+                insert_item(item_id, position)
+            current.insert(position, item_id)
+        return removed
+
+    def update_gcode_visualizer(self, changed_keys: Optional[Iterable[Hashable]] = None):
+        """
+        Redessine les trajectoires avec déplacements G0 visibles. changed_keys=None :
+        reconstruction complète (nouveau fichier) ; sinon seules ces trajectoires et les
+        déplacements G0 entre groupes sont reconstruits, le reste du dessin est repris.
+        """
+        if changed_keys is None or len(self.trajectory_keys) != len(self.ordered_trajectories):
+            self.trajectory_keys = list(range(len(self.ordered_trajectories)))
+            changed_keys = None
+        groups = build_path_groups(self.ordered_trajectories, self.isolated_circles,
+                                   self.dxf_processor.connection_tolerance, self.trajectory_colors,
+                                   trajectory_keys=self.trajectory_keys,
+                                   previous=self.path_groups if changed_keys is not None else None,
+                                   changed_keys=changed_keys or ())
+        self.path_groups = {group.key: group for group in groups}
+        # Mettre à jour le visualiseur avec les segments
+        self.gcode_visualizer.update_gcode_path(groups, changed_keys)
+
+    def _clear_selection(self):
+        """Vide la sélection (nouveau programme) ; la sélection de l'arbre sera resynchronisée au prochain changement."""
+        self.selected_dxf_ids = set()
+        self._selection_counts.clear()
+        self._tree_selection = None
+
+    def _set_selection(self, new_selected_dxf_ids: Set[str]):
+        """
+        Remplace la sélection (source de vérité : self.selected_dxf_ids) et rafraîchit les
+        widgets avec les seules entités ajoutées ou retirées ; le nombre d'entités
+        sélectionnées de chaque parent est tenu à jour au passage.
+        """
+        added = new_selected_dxf_ids - self.selected_dxf_ids
+        removed = self.selected_dxf_ids - new_selected_dxf_ids
+        self.selected_dxf_ids = new_selected_dxf_ids
+        for dxf_ids, step in ((added, 1), (removed, -1)):
+            for dxf_id in dxf_ids:
+                parent_id = self.dxf_id_to_traj_map.get(dxf_id)
+                if parent_id is not None:
+                    self._selection_counts[parent_id] = self._selection_counts.get(parent_id, 0) + step
+        logging.debug("[SELECTION] %d ajoutées, %d retirées, %d sélectionnées",
+                      len(added), len(removed), len(new_selected_dxf_ids))
+        self._refresh_widgets_from_selection(added, removed)
+
+    def _update_gcode_text_selection(self, added: Set[str], removed: Set[str]):
+        """Ajoute à la sélection de l'éditeur de texte les lignes des entités added et en retire celles de removed."""
+        added_lines = []
+        for dxf_id in added:
+            lines = self.dxf_id_to_line_map.get(dxf_id, ())
+            if not lines:
+                logging.warning("[GCODE_TEXT_SEL] Aucun G-code line_idx trouvé pour dxf_id: %s.", dxf_id)
+            added_lines.extend(lines)
+        removed_lines = [line_idx for dxf_id in removed for line_idx in self.dxf_id_to_line_map.get(dxf_id, ())]
+
+        # Les lignes sont regroupées en plages consécutives par la vue texte
+        self.gcode_text.update_selected_lines(added_lines, removed_lines)
+        if added_lines:
+            first_line = min(added_lines)
+            self.gcode_text.see(first_line)
+            logging.debug("[GCODE_TEXT_SEL] +%d / -%d lignes, %d plages ; défilement jusqu'à la ligne %d",
+                          len(added_lines), len(removed_lines), len(self.gcode_text.selection_spans), first_line + 1)
+
+    def _update_tree_selection(self, added: Set[str], removed: Set[str]):
+        """
+        Répercute dans l'arbre les entités ajoutées à la sélection ou retirées. Un parent
+        dont toutes les entités sont sélectionnées (d'après _selection_counts) l'est aussi.
+        Les entités d'un parent replié et entièrement sélectionné ne sont pas insérées :
+        elles le seront, sélectionnées, à son ouverture. Si la sélection de l'arbre n'est
+        plus connue (_tree_selection à None), elle est entièrement reconstruite.
+        """
+        if self._tree_selection is None:
+            self.gcode_tree.selection_set(())
+            self._tree_selection = set()
+            added, removed = self.selected_dxf_ids, set()
+
+        to_select, to_deselect, parents = [], [], set()
+        for dxf_ids, targets in ((added, to_select), (removed, to_deselect)):
+            for dxf_id in dxf_ids:
+                parent_id = self.dxf_id_to_traj_map.get(dxf_id)
+                if parent_id is None:
+                    continue
+                parents.add(parent_id)
+                if parent_id in self._tree_children_loaded:
+                    targets.append(dxf_id)
+
+        for parent_id in parents:
+            segments = self._tree_parents.get(parent_id)
+            if not segments:
+                continue
+            count = self._selection_counts.get(parent_id, 0)
+            if count == len(segments):
+                if parent_id not in self._tree_selection:
+                    to_select.append(parent_id)
+                continue
+            if parent_id in self._tree_selection:
+                to_deselect.append(parent_id)
+            if count:
+                self._load_tree_children(parent_id) # Sélectionne ses entités déjà sélectionnées
+
+        if to_deselect:
+            self.gcode_tree.selection_remove(to_deselect)
+            self._tree_selection.difference_update(to_deselect)
+        if to_select:
+            self.gcode_tree.selection_add(to_select)
+            self._tree_selection.update(to_select)
+            self.gcode_tree.see(to_select[0])
+
+    def _refresh_widgets_from_selection(self, added: Set[str], removed: Set[str]):
+        """Met à jour tous les widgets (visualiseur, texte, treeview) après un changement de self.selected_dxf_ids."""
         self._is_programmatic_update = True # Débute une mise à jour programmatique
         try:
             # 1. Rafraîchir le visualiseur
             self.gcode_visualizer.highlight_dxf_entities_by_ids(list(self.selected_dxf_ids))
 
             # 2. Rafraîchir l'éditeur de texte
-            self._update_gcode_text_selection()
+            self._update_gcode_text_selection(added, removed)
 
             # 3. Rafraîchir le Treeview
-            current_tree_selection = set(self.gcode_tree.selection())
-            desired_tree_selection = set()
-
-            # Ajouter les éléments DXF individuels à la sélection désirée
-            for dxf_id in self.selected_dxf_ids:
-                if self.gcode_tree.exists(dxf_id): # Vérifier si l'ID DXF existe comme élément de l'arbre
-                    desired_tree_selection.add(dxf_id)
-            
-            # Ajouter les éléments parent de trajectoire/cercles isolés si tous leurs enfants sont sélectionnés
-            # Pour les trajectoires ordonnées:
-            for i, trajectory in enumerate(self.ordered_trajectories):
-                traj_tree_id = f"traj_{i}"
-                if not self.gcode_tree.exists(traj_tree_id):
-                    continue
-
-                all_children_selected = True
-                if not trajectory: # Gérer les trajectoires vides
-                    all_children_selected = False 
-                else:
-                    for seg in trajectory:
-                        if seg['original_id'] not in self.selected_dxf_ids:
-                            all_children_selected = False
-                            break
-                if all_children_selected and trajectory: # S'assurer qu'il y a des enfants et qu'ils sont tous sélectionnés
-                    desired_tree_selection.add(traj_tree_id)
-
-            # Pour les cercles isolés:
-            if self.isolated_circles:
-                circ_tree_id = "isolated_circles_parent"
-                if self.gcode_tree.exists(circ_tree_id):
-                    all_children_selected = True
-                    for circle in self.isolated_circles:
-                        if circle['original_id'] not in self.selected_dxf_ids:
-                            all_children_selected = False
-                            break
-                    if all_children_selected and self.isolated_circles: # S'assurer qu'il y a des enfants et qu'ils sont tous sélectionnés
-                        desired_tree_selection.add(circ_tree_id)
-
-            if desired_tree_selection != current_tree_selection:
-                self.gcode_tree.selection_set(list(desired_tree_selection))
-                if desired_tree_selection:
-                    self.gcode_tree.see(list(desired_tree_selection)[0])
-                
+            self._update_tree_selection(added, removed)
         finally:
             self._is_programmatic_update = False
 
@@ -482,32 +947,42 @@ class AppGUI:
     def on_tree_select(self, event):
         """Met à jour l'état de la sélection depuis le Treeview et rafraîchit tous les autres widgets."""
         if self._is_programmatic_update:
-            logging.info("[TREE_SELECT] Ignoré: mise à jour programmatique.") # Nouveau log
+            logging.debug("[TREE_SELECT] Ignoré: mise à jour programmatique.")
             return # Ignore les sélections déclenchées par le programme
 
         selected_items_in_tree = self.gcode_tree.selection() # Ce sont les items *explicitement* sélectionnés par l'utilisateur
-        logging.info(f"[TREE_SELECT] Éléments Treeview sélectionnés par l'utilisateur: {selected_items_in_tree}") # Nouveau log
+        if self._tree_selection is not None and self._tree_selection == set(selected_items_in_tree):
+            # Événement différé d'une mise à jour programmatique : l'arbre est déjà à jour
+            logging.debug("[TREE_SELECT] Ignoré: sélection inchangée.")
+            return
+        logging.debug("[TREE_SELECT] %d éléments Treeview sélectionnés par l'utilisateur", len(selected_items_in_tree))
 
         new_selected_dxf_ids = set()
 
         for item_id in selected_items_in_tree:
             if self.gcode_tree.tag_has("trajectory_parent", item_id) or self.gcode_tree.tag_has("isolated_parent", item_id):
-                children_items = self.gcode_tree.get_children(item_id)
-                logging.info(f"[TREE_SELECT] Parent sélectionné ({item_id}), ajout des enfants: {children_items}") # Nouveau log
-                for child_id in children_items:
-                    new_selected_dxf_ids.add(child_id)
+                # Entités lues dans les trajectoires : celles d'un parent replié ne sont pas dans l'arbre
+                children_ids = [seg['original_id'] for seg in self._tree_parents.get(item_id, ())]
+                logging.debug("[TREE_SELECT] Parent sélectionné (%s), ajout de ses %d entités", item_id, len(children_ids))
+                new_selected_dxf_ids.update(children_ids)
             elif self.gcode_tree.tag_has("dxf_entity", item_id):
                 new_selected_dxf_ids.add(item_id)
-                logging.info(f"[TREE_SELECT] Entité DXF sélectionnée: {item_id}") # Nouveau log
-        
-        logging.info(f"[TREE_SELECT] new_selected_dxf_ids avant mise à jour: {new_selected_dxf_ids}. Précédent selected_dxf_ids: {self.selected_dxf_ids}") # Nouveau log
-        # Mettre à jour l'état centralisé de la sélection
-        self.selected_dxf_ids = new_selected_dxf_ids
-        logging.info(f"[TREE_SELECT] selected_dxf_ids après mise à jour: {self.selected_dxf_ids}") # Nouveau log
-        
-        # IMPORTANT: Rafraîchir TOUS les widgets basés sur la nouvelle sélection, y compris le Treeview.
-        self._refresh_widgets_from_selection()
-        logging.info("[TREE_SELECT] Appel de _refresh_widgets_from_selection.") # Nouveau log
+                logging.debug("[TREE_SELECT] Entité DXF sélectionnée: %s", item_id)
+
+        # La sélection de l'arbre est celle de l'utilisateur : elle est reconstruite pour
+        # ajouter les parents complets et les entités des parents sélectionnés
+        self._tree_selection = None
+        # Mettre à jour l'état centralisé de la sélection et rafraîchir TOUS les widgets, y compris le Treeview
+        self._set_selection(new_selected_dxf_ids)
+
+    def on_canvas_pick(self, dxf_id, additive: bool):
+        """Met à jour la sélection depuis un clic dans le visualiseur (Ctrl/Maj : ajoute ou retire l'entité)."""
+        if additive:
+            if dxf_id is None:
+                return
+            self._set_selection(self.selected_dxf_ids ^ {dxf_id})
+        else:
+            self._set_selection({dxf_id} if dxf_id is not None else set())
 
     def on_gcode_text_select(self, event):
         """Met à jour l'état de la sélection depuis l'éditeur de texte et rafraîchit tout."""
@@ -516,38 +991,26 @@ class AppGUI:
 
         new_selected_dxf_ids = set()
         
-        # Obtenir les indices des lignes sélectionnées par l'utilisateur
-        try:
-            start_index = self.gcode_text.index(tk.SEL_FIRST)
-            end_index = self.gcode_text.index(tk.SEL_LAST)
-            
-            start_line_idx = int(start_index.split('.')[0]) - 1
-            end_line_idx = int(end_index.split('.')[0]) - 1
-            
+        # Obtenir les indices (dans le programme) des lignes sélectionnées par l'utilisateur
+        selected_range = self.gcode_text.selected_line_range()
+        if selected_range is not None: # Sinon : aucune sélection textuelle active
+            start_line_idx, end_line_idx = selected_range
             for line_idx in range(start_line_idx, end_line_idx + 1):
-                if 0 <= line_idx < len(self.dxf_id_map):
-                    dxf_id_str_with_prefix = self.dxf_id_map.get(line_idx)
-                    handle = None
-                    # Extraire le handle DXF réel
-                    if dxf_id_str_with_prefix:
-                        if '_' in dxf_id_str_with_prefix: # e.g. JUMP_TO_DXF_ABC
-                            handle = dxf_id_str_with_prefix.split('_')[-1]
-                        elif dxf_id_str_with_prefix.startswith(('L', 'A', 'C')) and len(dxf_id_str_with_prefix) > 1: # e.g. LABCD
-                            handle = dxf_id_str_with_prefix[1:]
-                    if handle and handle not in ["HEADER", "INITIAL_POS", "FOOTER"]:
-                        new_selected_dxf_ids.add(handle)
-        except tk.TclError:
-            # Aucune sélection textuelle active
-            pass
-
-        # Mettre à jour l'état centralisé de la sélection
-        self.selected_dxf_ids = new_selected_dxf_ids
-        
-        # Rafraîchir tous les autres widgets (y compris le Treeview)
-        self._refresh_widgets_from_selection()
+                dxf_id_str_with_prefix = self.dxf_id_map.get(line_idx)
+                # Extraire le handle DXF réel (ex. 'JUMP_TO_DXF_ABC' -> 'ABC', 'LABCD' -> 'ABCD')
+                handle = dxf_handle(dxf_id_str_with_prefix) if dxf_id_str_with_prefix else None
+                if handle:
+                    new_selected_dxf_ids.add(handle)
+
+        # Mettre à jour l'état centralisé de la sélection et rafraîchir tous les autres widgets
+        self._set_selection(new_selected_dxf_ids)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Visualiseur et éditeur de trajectoires G-code.")
+    parser.add_argument("--renderer", choices=VISUALIZER_RENDERERS, default="matplotlib",
+                        help="Rendu du visualiseur : matplotlib (complet) ou tk (léger, démarrage rapide)")
+    args = parser.parse_args()
     root = tk.Tk()
-    app = AppGUI(root)
+    app = AppGUI(root, renderer=args.renderer)
     root.mainloop()
@@ -0,0 +1,87 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+from dxf_processor import PipelineCancelled
+
+
+class BackgroundTask:
+    """
+    Exécute une fonction longue dans un thread de travail sans bloquer Tk.
+
+    La fonction cible reçoit (progress_callback, cancel_event) : elle rapporte sa
+    progression via progress_callback(étape, fraction) et s'interrompt (en levant
+    PipelineCancelled) aux frontières d'étape quand cancel_event est positionné.
+    Les messages transitent par une queue que le thread Tk dépile avec after() :
+    les callbacks on_* sont donc toujours appelés sur le thread Tk.
+    """
+    def __init__(self, tk_widget, target: Callable[[Callable[[str, float], None], threading.Event], Any],
+                 on_progress: Optional[Callable[[str, float], None]] = None,
+                 on_done: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None,
+                 on_cancelled: Optional[Callable[[], None]] = None,
+                 poll_interval_ms: int = 50):
+        self.tk_widget = tk_widget
+        self.target = target
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.poll_interval_ms = poll_interval_ms
+
+        self.cancel_event = threading.Event()
+        self._messages: "queue.Queue[tuple]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._finished = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._finished
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dxf-background-task", daemon=True)
+        self._thread.start()
+        self.tk_widget.after(self.poll_interval_ms, self._poll)
+
+    def cancel(self):
+        """Demande l'arrêt ; la tâche s'arrête à la prochaine frontière d'étape."""
+        self.cancel_event.set()
+
+    def _run(self):
+        def report(stage: str, fraction: float):
+            self._messages.put(('progress', stage, fraction))
+
+        try:
+            result = self.target(report, self.cancel_event)
+        except PipelineCancelled as e:
+            logging.info(f"Tâche annulée avant l'étape : {e}")
+            self._messages.put(('cancelled',))
+        except Exception as e:
+            logging.exception("Erreur dans la tâche de fond")
+            self._messages.put(('error', e))
+        else:
+            self._messages.put(('done', result))
+
+    def _poll(self):
+        """Dépile les messages du thread de travail (toujours sur le thread Tk)."""
+        try:
+            while True:
+                message = self._messages.get_nowait()
+                kind = message[0]
+                if kind == 'progress':
+                    if self.on_progress and not self.cancel_event.is_set():
+                        self.on_progress(message[1], message[2])
+                    continue
+
+                self._finished = True
+                if kind == 'done' and self.on_done:
+                    self.on_done(message[1])
+                elif kind == 'error' and self.on_error:
+                    self.on_error(message[1])
+                elif kind == 'cancelled' and self.on_cancelled:
+                    self.on_cancelled()
+                return
+        except queue.Empty:
+            pass
+        self.tk_widget.after(self.poll_interval_ms, self._poll)
@@ -0,0 +1,181 @@
+"""
+Benchmark du pipeline DxfProcessor sur des DXF synthétiques de taille croissante.
+
+Mesure séparément extract_dxf_entities, generate_auto_path et generate_gcode pour
+chaque forme et chaque taille, écrit les résultats en JSON et CSV, et estime
+l'exposant de mise à l'échelle (pente log-log) de chaque étape afin de repérer
+les comportements en O(n²).
+
+Exemple (depuis la racine du dépôt) :
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 1000000 --plot
+"""
+import argparse
+import csv
+import json
+import logging
+import math
+import os
+import sys
+import time
+
+from benchmarks.synthetic_dxf import GENERATORS, cached_dxf
+from dxf_processor import DxfProcessor
+
+STAGES = ('extract_dxf_entities', 'generate_auto_path', 'generate_gcode')
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+
+def time_pipeline(file_path: str, repeat: int = 1) -> dict:
+    """Temps (meilleur de `repeat`) de chaque étape du pipeline pour un fichier."""
+    best = {stage: math.inf for stage in STAGES}
+    entity_count = 0
+    for _ in range(repeat):
+        processor = DxfProcessor()
+
+        start = time.perf_counter()
+        entities = processor.extract_dxf_entities(file_path)
+        best['extract_dxf_entities'] = min(best['extract_dxf_entities'], time.perf_counter() - start)
+        entity_count = len(entities)
+
+        start = time.perf_counter()
+        trajectories, circles = processor.generate_auto_path(entities)
+        best['generate_auto_path'] = min(best['generate_auto_path'], time.perf_counter() - start)
+
+        segments = [seg for trajectory in trajectories for seg in trajectory]
+        start = time.perf_counter()
+        processor.generate_gcode(segments, circles, (0.0, 0.0))
+        best['generate_gcode'] = min(best['generate_gcode'], time.perf_counter() - start)
+    return {'entities': entity_count, 'seconds': best}
+
+
+def scaling_exponent(points):
+    """Pente de la droite des moindres carrés de log(t) en fonction de log(n) (None si indéterminée)."""
+    points = [(math.log(n), math.log(t)) for n, t in points if n > 0 and t > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def run_benchmarks(shapes, sizes, data_dir: str, repeat: int, max_stage_seconds: float, seed: int = 0):
+    """
+    Exécute le benchmark. Pour une forme, les tailles suivantes sont sautées dès que
+    la projection (à l'exposant mesuré) d'une étape dépasse max_stage_seconds.
+    """
+    rows = []
+    for shape in shapes:
+        shape_rows = []
+        for size in sorted(sizes):
+            if shape_rows:
+                projected = max(_project(shape_rows, size, stage) for stage in STAGES)
+                if projected > max_stage_seconds:
+                    logging.warning(f"{shape} : taille {size} sautée (projection {projected:.0f} s > {max_stage_seconds:.0f} s).")
+                    break
+            file_path = cached_dxf(shape, size, data_dir, seed)
+            measure = time_pipeline(file_path, repeat)
+            shape_rows.append({'shape': shape, 'size': size, **measure})
+            print(f"{shape:20s} {size:>8d} " + " ".join(f"{stage}={measure['seconds'][stage]:.3f}s" for stage in STAGES))
+        rows.extend(shape_rows)
+    return rows
+
+
+def _project(shape_rows, size: int, stage: str) -> float:
+    """Temps projeté d'une étape à la taille size, à partir des deux dernières mesures."""
+    last = shape_rows[-1]
+    exponent = 2.0 # On suppose le pire (quadratique) tant qu'une seule taille a été mesurée
+    if len(shape_rows) >= 2:
+        measured = scaling_exponent([(row['size'], row['seconds'][stage]) for row in shape_rows[-2:]])
+        if measured is not None:
+            exponent = min(max(measured, 1.0), 3.0)
+    return last['seconds'][stage] * (size / max(last['size'], 1)) ** exponent
+
+
+def analyse_scaling(rows, noise_floor: float = 0.05) -> dict:
+    """Exposant par (forme, étape), calculé sur les mesures au-dessus du bruit."""
+    exponents = {}
+    for shape in sorted({row['shape'] for row in rows}):
+        shape_rows = [row for row in rows if row['shape'] == shape]
+        for stage in STAGES:
+            points = [(row['entities'], row['seconds'][stage]) for row in shape_rows
+                      if row['seconds'][stage] >= noise_floor]
+            exponents[f"{shape}/{stage}"] = scaling_exponent(points)
+    return exponents
+
+
+def write_results(rows, exponents, output_dir: str):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, 'pipeline_results.json'), 'w') as f:
+        json.dump({'rows': rows, 'scaling_exponents': exponents}, f, indent=2)
+    with open(os.path.join(output_dir, 'pipeline_results.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['shape', 'size', 'entities', 'stage', 'seconds'])
+        for row in rows:
+            for stage in STAGES:
+                writer.writerow([row['shape'], row['size'], row['entities'], stage, f"{row['seconds'][stage]:.6f}"])
+
+
+def plot_scaling(rows, output_path: str):
+    """Courbes log-log temps/entités, une par forme, un graphique par étape."""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(5 * len(STAGES), 4))
+    for column, stage in enumerate(STAGES):
+        ax = figure.add_subplot(1, len(STAGES), column + 1)
+        for shape in sorted({row['shape'] for row in rows}):
+            shape_rows = [row for row in rows if row['shape'] == shape]
+            ax.loglog([row['entities'] for row in shape_rows], [row['seconds'][stage] for row in shape_rows],
+                      marker='o', label=shape)
+        ax.set_title(stage)
+        ax.set_xlabel("entités")
+        ax.set_ylabel("secondes")
+        ax.grid(True, which='both', alpha=0.3)
+    figure.axes[0].legend(fontsize='small')
+    figure.tight_layout()
+    figure.savefig(output_path)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline DXF -> G-code sur des DXF synthétiques.")
+    parser.add_argument("--shapes", nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument("--sizes", nargs='+', type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=1, help="Répétitions par mesure (on garde la meilleure)")
+    parser.add_argument("--max-stage-seconds", type=float, default=120.0,
+                        help="Saute les tailles dont une étape dépasserait ce temps (projection)")
+    parser.add_argument("--data-dir", default=os.path.join("bench_results", "dxf"), help="Cache des DXF générés")
+    parser.add_argument("--output-dir", default="bench_results")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--plot", action="store_true", help="Écrit les courbes dans scaling.png")
+    parser.add_argument("--quadratic-threshold", type=float, default=1.5,
+                        help="Exposant au-delà duquel une étape est signalée")
+    parser.add_argument("--fail-on-quadratic", action="store_true",
+                        help="Code de sortie 1 si une étape dépasse le seuil d'exposant")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING) # Le pipeline journalise beaucoup en INFO
+
+    rows = run_benchmarks(args.shapes, args.sizes, args.data_dir, args.repeat, args.max_stage_seconds, args.seed)
+    exponents = analyse_scaling(rows)
+    write_results(rows, exponents, args.output_dir)
+    if args.plot:
+        plot_scaling(rows, os.path.join(args.output_dir, 'scaling.png'))
+
+    flagged = {key: value for key, value in exponents.items()
+               if value is not None and value > args.quadratic_threshold}
+    for key, value in sorted(exponents.items()):
+        if value is None:
+            print(f"{key:50s} (sous le seuil de bruit)")
+            continue
+        marker = "  <-- superlinéaire" if key in flagged else ""
+        print(f"{key:50s} n^{value:.2f}{marker}")
+    return 1 if flagged and args.fail_on_quadratic else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Garde-fou de performance : compare les temps actuels à une référence versionnée
+(benchmarks/baseline.json) et échoue si une étape régresse au-delà de sa tolérance.
+
+Couvre le pipeline DxfProcessor et le rendu du visualiseur (GcodeRenderer, backend
+Agg), sans affichage : utilisable sur une machine Linux sans serveur X.
+
+Exemples (depuis la racine du dépôt) :
+    python -m benchmarks.regression_gate
+    python -m benchmarks.regression_gate --update-baseline   # après un changement assumé
+"""
+import matplotlib
+matplotlib.use('Agg')
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import time
+
+from benchmarks.bench_pipeline import time_pipeline
+from benchmarks.synthetic_dxf import cached_dxf
+from dxf_processor import DxfProcessor
+from gcode_renderer import GcodeRenderer, build_path_segments
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Cas mesurés : (forme, nombre d'entités). Tailles choisies pour rester sous la minute au total.
+CASES = [
+    ('rect_grid', 800),
+    ('random_polygons', 600),
+    ('tessellated_circles', 640),
+    ('isolated_circles', 2000),
+    ('branched_mesh', 800),
+]
+DEFAULT_TOLERANCES = {'default': 0.50, 'render_agg': 0.75}
+DEFAULT_MIN_ABSOLUTE_DELTA = 0.005 # Secondes : en dessous, l'écart est considéré comme du bruit
+
+
+def time_rendering(file_path: str, repeat: int = 1) -> dict:
+    """Temps de draw_gcode_path (construction des collections) et du rendu Agg complet."""
+    processor = DxfProcessor()
+    entities = processor.extract_dxf_entities(file_path)
+    trajectories, circles = processor.generate_auto_path(entities)
+    segments = build_path_segments(trajectories, circles, processor.connection_tolerance)
+
+    best = {'draw_gcode_path': float('inf'), 'render_agg': float('inf')}
+    for _ in range(repeat):
+        renderer = GcodeRenderer()
+        start = time.perf_counter()
+        renderer.draw_gcode_path(segments)
+        best['draw_gcode_path'] = min(best['draw_gcode_path'], time.perf_counter() - start)
+
+        start = time.perf_counter()
+        renderer.figure.canvas.draw()
+        best['render_agg'] = min(best['render_agg'], time.perf_counter() - start)
+    return best
+
+
+def measure_all(data_dir: str, repeat: int) -> dict:
+    results = {}
+    for shape, size in CASES:
+        file_path = cached_dxf(shape, size, data_dir)
+        timings = dict(time_pipeline(file_path, repeat)['seconds'])
+        timings.update(time_rendering(file_path, repeat))
+        results[f"{shape}_{size}"] = timings
+        print(f"{shape}_{size:<10d} " + " ".join(f"{stage}={seconds:.4f}s" for stage, seconds in timings.items()))
+    return results
+
+
+def compare(baseline: dict, current: dict):
+    """Retourne la liste des régressions (cas, étape, référence, actuel, tolérance)."""
+    tolerances = baseline.get('tolerances', DEFAULT_TOLERANCES)
+    min_delta = baseline.get('min_absolute_delta_s', DEFAULT_MIN_ABSOLUTE_DELTA)
+    regressions = []
+    for case, stages in baseline['results'].items():
+        if case not in current:
+            logging.warning(f"Cas {case} absent des mesures actuelles.")
+            continue
+        for stage, reference in stages.items():
+            measured = current[case].get(stage)
+            if measured is None:
+                continue
+            tolerance = tolerances.get(stage, tolerances.get('default', DEFAULT_TOLERANCES['default']))
+            if measured > reference * (1.0 + tolerance) and measured - reference > min_delta:
+                regressions.append((case, stage, reference, measured, tolerance))
+    return regressions
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compare les performances actuelles à la référence versionnée.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Fichier de référence JSON")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions par mesure (on garde la meilleure)")
+    parser.add_argument("--data-dir", default=os.path.join("bench_results", "dxf"), help="Cache des DXF générés")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="Remplace les temps de référence par les mesures actuelles (tolérances conservées)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    current = measure_all(args.data_dir, args.repeat)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        updated = {
+            'machine': f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+            'tolerances': (baseline or {}).get('tolerances', DEFAULT_TOLERANCES),
+            'min_absolute_delta_s': (baseline or {}).get('min_absolute_delta_s', DEFAULT_MIN_ABSOLUTE_DELTA),
+            'results': {case: {stage: round(seconds, 6) for stage, seconds in stages.items()}
+                        for case, stages in current.items()},
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(updated, f, indent=2)
+            f.write("\n")
+        print(f"Référence mise à jour : {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"Aucune référence trouvée ({args.baseline}) : lancez avec --update-baseline.")
+        return 2
+
+    regressions = compare(baseline, current)
+    for case, stage, reference, measured, tolerance in regressions:
+        print(f"RÉGRESSION {case}/{stage} : {measured:.4f}s contre {reference:.4f}s (tolérance +{tolerance:.0%})")
+    if regressions:
+        return 1
+    print("Aucune régression de performance.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
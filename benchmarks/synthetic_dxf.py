@@ -0,0 +1,98 @@
+"""
+Générateurs de fichiers DXF synthétiques pour les benchmarks.
+
+Chaque générateur produit environ `entity_count` entités dans le modelspace :
+- rect_grid : grille de rectangles (4 LINE fermées chacun)
+- random_polygons : polygones fermés aléatoires de 3 à 12 côtés
+- tessellated_circles : cercles approchés par 32 LINE
+- isolated_circles : entités CIRCLE isolées
+- branched_mesh : maillage carré dont chaque nœud a jusqu'à 4 branches (un seul composant)
+"""
+import math
+import os
+import random
+
+import ezdxf
+
+CELL_SIZE = 10.0 # Pas de la grille qui sépare les pièces indépendantes
+
+
+def _grid_origins(count: int):
+    columns = max(1, int(math.ceil(math.sqrt(count))))
+    for index in range(count):
+        yield (index % columns) * CELL_SIZE, (index // columns) * CELL_SIZE
+
+
+def _add_closed_polyline_as_lines(msp, points):
+    for start, end in zip(points, points[1:] + points[:1]):
+        msp.add_line(start, end)
+
+
+def rect_grid(msp, entity_count: int, rng: random.Random):
+    for x, y in _grid_origins(max(1, entity_count // 4)):
+        width, height = rng.uniform(2.0, 8.0), rng.uniform(2.0, 8.0)
+        _add_closed_polyline_as_lines(msp, [(x, y), (x + width, y), (x + width, y + height), (x, y + height)])
+
+
+def random_polygons(msp, entity_count: int, rng: random.Random):
+    remaining = entity_count
+    origins = _grid_origins(max(1, entity_count // 3))
+    while remaining > 0:
+        x, y = next(origins)
+        sides = min(rng.randint(3, 12), max(remaining, 3))
+        angles = sorted(rng.uniform(0.0, 2 * math.pi) for _ in range(sides))
+        radius = rng.uniform(1.0, 4.5)
+        center = (x + CELL_SIZE / 2, y + CELL_SIZE / 2)
+        _add_closed_polyline_as_lines(msp, [(center[0] + radius * math.cos(a), center[1] + radius * math.sin(a))
+                                            for a in angles])
+        remaining -= sides
+
+
+def tessellated_circles(msp, entity_count: int, rng: random.Random, segments_per_circle: int = 32):
+    for x, y in _grid_origins(max(1, entity_count // segments_per_circle)):
+        radius = rng.uniform(1.0, 4.5)
+        center = (x + CELL_SIZE / 2, y + CELL_SIZE / 2)
+        step = 2 * math.pi / segments_per_circle
+        _add_closed_polyline_as_lines(msp, [(center[0] + radius * math.cos(i * step), center[1] + radius * math.sin(i * step))
+                                            for i in range(segments_per_circle)])
+
+
+def isolated_circles(msp, entity_count: int, rng: random.Random):
+    for x, y in _grid_origins(entity_count):
+        msp.add_circle((x + CELL_SIZE / 2, y + CELL_SIZE / 2), rng.uniform(1.0, 4.5))
+
+
+def branched_mesh(msp, entity_count: int, rng: random.Random):
+    # Un maillage n x n de pas 1 contient 2 * n * (n + 1) arêtes
+    n = max(1, int(math.sqrt(entity_count / 2)))
+    for i in range(n + 1):
+        for j in range(n):
+            msp.add_line((j, i), (j + 1, i))
+            msp.add_line((i, j), (i, j + 1))
+
+
+GENERATORS = {
+    'rect_grid': rect_grid,
+    'random_polygons': random_polygons,
+    'tessellated_circles': tessellated_circles,
+    'isolated_circles': isolated_circles,
+    'branched_mesh': branched_mesh,
+}
+
+
+def generate_dxf(shape: str, entity_count: int, file_path: str, seed: int = 0) -> int:
+    """Écrit un DXF synthétique et retourne le nombre d'entités réellement créées."""
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    GENERATORS[shape](msp, entity_count, random.Random(seed))
+    doc.saveas(file_path)
+    return len(msp)
+
+
+def cached_dxf(shape: str, entity_count: int, directory: str, seed: int = 0) -> str:
+    """Chemin d'un DXF synthétique, généré seulement s'il n'existe pas déjà dans directory."""
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, f"{shape}_{entity_count}_s{seed}.dxf")
+    if not os.path.exists(file_path):
+        generate_dxf(shape, entity_count, file_path, seed)
+    return file_path
@@ -0,0 +1,90 @@
+"""
+Conversion DXF -> G-code en ligne de commande, sans IHM.
+
+Exemple :
+    python dxf_cli.py piece.dxf -o piece.gcode --layers CUT,MARK --stats-json mesures.json
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+
+from dxf_processor import DxfProcessor, ExtractionFilter
+from instrumentation import ProfileSession, StageRecorder
+from preview import DEFAULT_SIZE_PX, parse_size, save_preview
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()] if value else None
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Convertit un fichier DXF en G-code.")
+    parser.add_argument("dxf_file", help="Fichier DXF à convertir")
+    parser.add_argument("-o", "--output", help="Fichier G-code de sortie (par défaut : <dxf>.gcode)")
+    parser.add_argument("--layers", help="Calques à conserver (noms ou motifs, séparés par des virgules)")
+    parser.add_argument("--colors", help="Couleurs ACI à conserver (séparées par des virgules)")
+    parser.add_argument("--linetypes", help="Types de ligne à conserver (noms ou motifs, séparés par des virgules)")
+    parser.add_argument("--window", nargs=4, type=float, metavar=("XMIN", "YMIN", "XMAX", "YMAX"),
+                        help="Ne garder que les entités qui intersectent cette fenêtre")
+    parser.add_argument("--group-by-layer", action="store_true", help="Une série de trajectoires par calque")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Tolérance de connexion (défaut : 0.01)")
+    parser.add_argument("--stats", action="store_true", help="Affiche les mesures par étape")
+    parser.add_argument("--stats-json", metavar="FICHIER", help="Écrit les mesures par étape en JSON")
+    parser.add_argument("--preview", metavar="IMAGE", help="Écrit un aperçu des trajectoires (PNG ou SVG selon l'extension)")
+    parser.add_argument("--preview-size", type=parse_size, default=DEFAULT_SIZE_PX, metavar="LxH",
+                        help="Taille de l'aperçu en pixels (défaut : 400x300)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile la conversion (cProfile) : écrit <sortie>_profile.pstats et un résumé .txt")
+    parser.add_argument("--profile-top", type=int, default=40, metavar="N",
+                        help="Nombre de fonctions listées dans le résumé du profil (défaut : 40)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    output_path = args.output or os.path.splitext(args.dxf_file)[0] + ".gcode"
+
+    colors = _split_list(args.colors)
+    entity_filter = ExtractionFilter(layers=_split_list(args.layers),
+                                     colors=[int(c) for c in colors] if colors else None,
+                                     linetypes=_split_list(args.linetypes),
+                                     window=args.window)
+
+    recorder = StageRecorder() if (args.stats or args.stats_json) else None
+    profile_session = ProfileSession(os.path.splitext(output_path)[0] + "_profile", args.profile_top) if args.profile else None
+    processor = DxfProcessor(args.tolerance, instrumentation=recorder)
+    try:
+        with profile_session.profile() if profile_session else contextlib.nullcontext():
+            result = processor.run_pipeline(args.dxf_file, entity_filter, group_by_layer=args.group_by_layer)
+            if result is None:
+                logging.error(f"Impossible de lire ou traiter le fichier DXF : {args.dxf_file}")
+                return 1
+
+            with processor.instrumentation.stage("écriture") as stage:
+                with open(output_path, 'w') as f:
+                    f.write(result['gcode'])
+                stage.count(len(result['dxf_id_map']))
+            if args.preview:
+                with processor.instrumentation.stage("aperçu"):
+                    save_preview(result['ordered_trajectories'], result['isolated_circles'], args.preview,
+                                 args.preview_size, args.tolerance)
+        logging.info(f"G-code écrit dans {output_path}")
+
+        if profile_session is not None:
+            profile_session.save(f"Profil de la conversion de {args.dxf_file}")
+
+        if recorder is not None:
+            if args.stats_json:
+                recorder.dump_json(args.stats_json)
+            if args.stats:
+                print(recorder.summary())
+        return 0
+    finally:
+        if recorder is not None:
+            recorder.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
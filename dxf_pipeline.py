@@ -0,0 +1,135 @@
+# dxf_pipeline.py
+
+"""
+Pipeline DXF -> G-code sans état partagé.
+
+Contrairement à DxfProcessor (qui conserve current_dxf_entities et inverse les
+segments en place), chaque étape est une fonction pure :
+- extract_geometry() retourne un GeometrySet immuable ;
+- plan_paths() retourne un PathPlan : l'ordre des entités et leur sens de parcours
+  sous forme de drapeaux, sans jamais toucher à la géométrie ;
+- render_gcode() produit le G-code à partir des deux.
+Un GeometrySet peut donc être partagé entre threads et mis en cache, et plusieurs
+conversions peuvent tourner en parallèle dans le même processus.
+"""
+
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from dxf_processor import DxfProcessor, ExtractionFilter
+
+DEFAULT_CONNECTION_TOLERANCE = 0.01
+
+# Une étape d'un plan : (original_id, parcouru à l'envers ?)
+PlanStep = Tuple[str, bool]
+
+
+class GeometrySet:
+    """
+    Ensemble immuable d'entités extraites d'un fichier DXF.
+    Les enregistrements (et leurs 'coords') sont des vues en lecture seule.
+    """
+    __slots__ = ('source', 'entities')
+
+    def __init__(self, source: str, entities: Dict[str, Dict]):
+        self.source = source
+        self.entities: Mapping[str, Mapping] = MappingProxyType(
+            {entity_id: _freeze_record(record) for entity_id, record in entities.items()})
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def __getitem__(self, entity_id: str) -> Mapping:
+        return self.entities[entity_id]
+
+
+class PathPlan(NamedTuple):
+    """Ordre d'usinage : trajectoires et cercles isolés, avec un drapeau d'inversion par entité."""
+    trajectories: Tuple[Tuple[PlanStep, ...], ...]
+    circles: Tuple[PlanStep, ...]
+
+
+def _freeze_record(record: Dict) -> Mapping:
+    frozen = dict(record)
+    frozen['coords'] = MappingProxyType(dict(record['coords']))
+    return MappingProxyType(frozen)
+
+
+def extract_geometry(file_path: str, entity_filter: Optional[ExtractionFilter] = None) -> Optional[GeometrySet]:
+    """Lit un fichier DXF et retourne un GeometrySet immuable (None si la lecture échoue)."""
+    if entity_filter is not None:
+        entity_filter = entity_filter.copy() # Les caches du filtre ne sont pas partagés entre tâches
+    entities = DxfProcessor().extract_dxf_entities(file_path, entity_filter)
+    if entities is None:
+        return None
+    return GeometrySet(file_path, entities)
+
+
+def plan_paths(geometry: GeometrySet, connection_tolerance: float = DEFAULT_CONNECTION_TOLERANCE,
+               group_by_layer: bool = False) -> PathPlan:
+    """Calcule les trajectoires d'un GeometrySet sans le modifier."""
+    processor = DxfProcessor(connection_tolerance)
+    trajectory_orders, circle_ids = processor.plan_auto_path(geometry.entities, group_by_layer=group_by_layer)
+    return PathPlan(tuple(tuple(order) for order in trajectory_orders),
+                    tuple((circle_id, False) for circle_id in circle_ids))
+
+
+def oriented_segment(geometry: GeometrySet, step: PlanStep) -> Mapping:
+    """
+    Vue d'une entité dans le sens indiqué par le plan. L'enregistrement partagé
+    est retourné tel quel s'il n'est pas inversé, sinon une copie légère.
+    """
+    entity_id, reversed_flag = step
+    record = geometry.entities[entity_id]
+    if not reversed_flag:
+        return record
+    view = dict(record)
+    view['direction_reversed'] = not record.get('direction_reversed', False)
+    if 'start_point' in record['coords']:
+        coords = dict(record['coords'])
+        coords['start_point'], coords['end_point'] = coords['end_point'], coords['start_point']
+        view['coords'] = coords
+    return view
+
+
+def render_gcode(geometry: GeometrySet, plan: PathPlan,
+                 initial_start_point: Tuple[float, float] = (0.0, 0.0),
+                 connection_tolerance: float = DEFAULT_CONNECTION_TOLERANCE) -> Tuple[str, Dict[int, str]]:
+    """Génère le G-code d'un plan. Retourne le G-code et la map ligne -> ID DXF."""
+    segments = [oriented_segment(geometry, step) for trajectory in plan.trajectories for step in trajectory]
+    circles = [oriented_segment(geometry, step) for step in plan.circles]
+    return DxfProcessor(connection_tolerance).generate_gcode(segments, circles, initial_start_point)
+
+
+def reverse_trajectory(plan: PathPlan, index: int) -> PathPlan:
+    """Nouveau plan où la trajectoire index est parcourue dans l'autre sens."""
+    reversed_trajectory = tuple((entity_id, not flag) for entity_id, flag in reversed(plan.trajectories[index]))
+    trajectories = plan.trajectories[:index] + (reversed_trajectory,) + plan.trajectories[index + 1:]
+    return plan._replace(trajectories=trajectories)
+
+
+def move_trajectory(plan: PathPlan, index: int, new_index: int) -> PathPlan:
+    """Nouveau plan où la trajectoire index est déplacée en position new_index."""
+    trajectories: List = list(plan.trajectories)
+    trajectories.insert(new_index, trajectories.pop(index))
+    return plan._replace(trajectories=tuple(trajectories))
+
+
+def delete_trajectory(plan: PathPlan, index: int) -> PathPlan:
+    """Nouveau plan sans la trajectoire index."""
+    return plan._replace(trajectories=plan.trajectories[:index] + plan.trajectories[index + 1:])
+
+
+def run_pipeline(file_path: str, entity_filter: Optional[ExtractionFilter] = None,
+                 connection_tolerance: float = DEFAULT_CONNECTION_TOLERANCE, group_by_layer: bool = False,
+                 initial_start_point: Tuple[float, float] = (0.0, 0.0)):
+    """
+    Enchaîne extraction, cheminement et génération du G-code pour un fichier.
+    Retourne (geometry, plan, gcode, dxf_id_map), ou None si la lecture échoue.
+    """
+    geometry = extract_geometry(file_path, entity_filter)
+    if geometry is None:
+        return None
+    plan = plan_paths(geometry, connection_tolerance, group_by_layer)
+    gcode, dxf_id_map = render_gcode(geometry, plan, initial_start_point, connection_tolerance)
+    return geometry, plan, gcode, dxf_id_map
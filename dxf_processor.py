@@ -3,168 +3,539 @@
 import ezdxf
 import math
 import logging
-from typing import List, Dict, Tuple
+import fnmatch
+from typing import List, Dict, Tuple, Hashable, Iterable, Optional
+from instrumentation import NULL_RECORDER
 
 # Configuration du logging pour ce module
 logging.basicConfig(level=logging.INFO, format='[DXF_PROCESSOR] %(message)s')
 
+SUPPORTED_DXF_TYPES = ('LINE', 'ARC', 'CIRCLE')
+BYLAYER_COLOR = 256
+
+
+class ExtractionFilter:
+    """
+    Filtre appliqué pendant l'extraction, sur les attributs bruts des entités DXF,
+    avant toute conversion géométrique.
+    - layers : noms ou motifs fnmatch de calques (insensibles à la casse, comme en DXF)
+    - colors : numéros de couleur ACI (BYLAYER est résolu via la table des calques)
+    - linetypes : noms ou motifs de types de ligne (BYLAYER est résolu via la table des calques)
+    - window : fenêtre (xmin, ymin, xmax, ymax) que la boîte englobante doit intersecter
+    """
+    def __init__(self, layers: Optional[Iterable[str]] = None, colors: Optional[Iterable[int]] = None,
+                 linetypes: Optional[Iterable[str]] = None,
+                 window: Optional[Tuple[float, float, float, float]] = None):
+        self.layer_patterns = self._normalize_patterns(layers)
+        self.colors = set(int(c) for c in colors) if colors is not None else None
+        self.linetype_patterns = self._normalize_patterns(linetypes)
+        self.window = tuple(window) if window is not None else None
+        self._layer_table = None
+        self._layer_decisions: Dict[str, bool] = {} # Cache: nom de calque -> accepté ?
+        self._layer_attributes: Dict[str, Tuple[int, str]] = {} # Cache: nom de calque -> (couleur, type de ligne)
+
+    @staticmethod
+    def _normalize_patterns(patterns) -> Optional[List[str]]:
+        if patterns is None:
+            return None
+        if isinstance(patterns, str):
+            patterns = patterns.split(',')
+        return [p.strip().upper() for p in patterns if p and p.strip()]
+
+    @staticmethod
+    def _matches(name: str, patterns: List[str]) -> bool:
+        name = name.upper()
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+    def copy(self) -> 'ExtractionFilter':
+        """Nouveau filtre aux mêmes critères, avec ses propres caches (un par tâche/thread)."""
+        return ExtractionFilter(self.layer_patterns, self.colors, self.linetype_patterns, self.window)
+
+    def is_empty(self) -> bool:
+        return (self.layer_patterns is None and self.colors is None
+                and self.linetype_patterns is None and self.window is None)
+
+    def bind(self, doc):
+        """Associe le filtre à un document (table des calques) et vide les caches."""
+        self._layer_table = doc.layers
+        self._layer_decisions.clear()
+        self._layer_attributes.clear()
+
+    def _resolve_layer_attributes(self, layer_name: str) -> Tuple[int, str]:
+        attributes = self._layer_attributes.get(layer_name)
+        if attributes is None:
+            color, linetype = 7, 'CONTINUOUS'
+            if self._layer_table is not None and self._layer_table.has_entry(layer_name):
+                layer = self._layer_table.get(layer_name)
+                color, linetype = layer.color, layer.dxf.get('linetype', 'Continuous').upper()
+            attributes = self._layer_attributes[layer_name] = (color, linetype)
+        return attributes
+
+    def _intersects_window(self, entity) -> bool:
+        if entity.dxftype() == 'LINE':
+            start, end = entity.dxf.start, entity.dxf.end
+            min_x, max_x = min(start[0], end[0]), max(start[0], end[0])
+            min_y, max_y = min(start[1], end[1]), max(start[1], end[1])
+        else: # ARC et CIRCLE : boîte du cercle complet, suffisante pour un rejet rapide
+            center, radius = entity.dxf.center, entity.dxf.radius
+            min_x, max_x = center[0] - radius, center[0] + radius
+            min_y, max_y = center[1] - radius, center[1] + radius
+        win_min_x, win_min_y, win_max_x, win_max_y = self.window
+        return min_x <= win_max_x and max_x >= win_min_x and min_y <= win_max_y and max_y >= win_min_y
+
+    def accepts(self, entity) -> bool:
+        """Retourne True si l'entité brute passe tous les critères du filtre."""
+        dxf = entity.dxf
+        layer_name = dxf.get('layer', '0')
+
+        if self.layer_patterns is not None:
+            accepted = self._layer_decisions.get(layer_name)
+            if accepted is None:
+                accepted = self._layer_decisions[layer_name] = self._matches(layer_name, self.layer_patterns)
+            if not accepted:
+                return False
+
+        if self.colors is not None:
+            color = dxf.get('color', BYLAYER_COLOR)
+            if color == BYLAYER_COLOR:
+                color = self._resolve_layer_attributes(layer_name)[0]
+            if color not in self.colors:
+                return False
+
+        if self.linetype_patterns is not None:
+            linetype = dxf.get('linetype', 'BYLAYER').upper()
+            if linetype == 'BYLAYER':
+                linetype = self._resolve_layer_attributes(layer_name)[1]
+            if not self._matches(linetype, self.linetype_patterns):
+                return False
+
+        if self.window is not None and not self._intersects_window(entity):
+            return False
+
+        return True
+
+
+def dxf_handle(dxf_id: str) -> Optional[str]:
+    """
+    Handle DXF réel d'un ID de ligne G-code (ex. 'A123' -> '123', 'JUMP_TO_DXF_ABC' -> 'ABC'),
+    None pour les lignes sans entité (en-tête, pied de page).
+    """
+    handle = None
+    if '_' in dxf_id:
+        handle = dxf_id.split('_')[-1]
+    elif dxf_id.startswith(('L', 'A', 'C')) and len(dxf_id) > 1:
+        handle = dxf_id[1:]
+    if handle in ("HEADER", "INITIAL_POS", "FOOTER"):
+        return None
+    return handle
+
+
+class GcodeBlock:
+    """
+    G-code d'une trajectoire mis en cache par DxfProcessor.generate_gcode_program.
+    Seules les lignes du premier segment dépendent de la position de l'outil en arrivant
+    (déplacement G0, I/J d'un arc) : le bloc garde celles des segments suivants (lines, ids),
+    leurs index par handle DXF relatifs au début du bloc (handle_lines) et la position
+    finale de l'outil (end_point).
+    """
+    __slots__ = ('lines', 'ids', 'handle_lines', 'end_point')
+
+    def __init__(self, lines: List[str], ids: List[str], handle_lines: Dict[str, List[int]],
+                 end_point: Tuple[float, float]):
+        self.lines = lines
+        self.ids = ids
+        self.handle_lines = handle_lines
+        self.end_point = end_point
+
+
+class GcodeProgram:
+    """
+    Résultat de DxfProcessor.generate_gcode_program :
+    - gcode : texte du programme, lines : ses lignes ;
+    - dxf_id_map : index de ligne -> ID DXF (comme generate_gcode) ;
+    - dxf_id_to_line_map : handle DXF -> [index de ligne, ...] ;
+    - blocks : clé de trajectoire -> GcodeBlock, à repasser en previous à la génération suivante ;
+    - block_lines : clé de trajectoire (ou ('circle', original_id)) -> lignes [début, fin[.
+    """
+    __slots__ = ('gcode', 'lines', 'dxf_id_map', 'dxf_id_to_line_map', 'blocks', 'block_lines')
+
+    def __init__(self, gcode: str, lines: List[str], dxf_id_map: Dict[int, str], dxf_id_to_line_map: Dict[str, List[int]],
+                 blocks: Dict[Hashable, GcodeBlock], block_lines: Dict[Hashable, Tuple[int, int]]):
+        self.gcode = gcode
+        self.lines = lines
+        self.dxf_id_map = dxf_id_map
+        self.dxf_id_to_line_map = dxf_id_to_line_map
+        self.blocks = blocks
+        self.block_lines = block_lines
+
+
+class PipelineCancelled(Exception):
+    """Levée à une frontière d'étape quand la tâche en cours a été annulée."""
+
+
 class DxfProcessor:
     """
     Traite les fichiers DXF pour en extraire des entités géométriques,
     créer des trajectoires d'usinage et générer le G-code correspondant.
     """
-    def __init__(self, connection_tolerance: float = 0.01):
+    def __init__(self, connection_tolerance: float = 0.01, instrumentation=None):
         self.connection_tolerance = connection_tolerance 
         self.current_dxf_entities: Dict[str, Dict] = {} 
+        # Enregistreur des mesures par étape (instrumentation.StageRecorder) ; inactif par défaut
+        self.instrumentation = instrumentation if instrumentation is not None else NULL_RECORDER
 
-    def extract_dxf_entities(self, file_path: str) -> Dict[str, Dict]:
+    def extract_dxf_entities(self, file_path: str, entity_filter: Optional[ExtractionFilter] = None) -> Dict[str, Dict]:
         """
         Lit un fichier DXF et extrait les entités LINE, ARC, et CIRCLE.
         Ne conserve que les coordonnées 2D (X, Y).
+        Si un ExtractionFilter est fourni, les entités rejetées sont écartées
+        avant la construction de leur enregistrement.
         """
         self.current_dxf_entities = {}
         logging.info(f"Début de l'extraction des entités du fichier : {file_path}")
         try:
-            doc = ezdxf.readfile(file_path)
-            msp = doc.modelspace()
+            with self.instrumentation.stage("lecture DXF") as stage:
+                doc = ezdxf.readfile(file_path)
+                msp = doc.modelspace()
+                stage.count(len(msp))
             logging.info(f"Modelspace contient {len(msp)} entités.")
 
-            for entity in msp:
-                entity_data = {'original_id': str(entity.dxf.handle)} 
-
-                if entity.dxftype() == 'LINE':
-                    entity_data.update({
-                        'type': 'LINE',
-                        'coords': {
-                            'start_point': tuple(entity.dxf.start)[:2], 
-                            'end_point': tuple(entity.dxf.end)[:2] 
-                        },
-                        'id_display': f"Line {entity_data['original_id'][-4:]}" 
-                    })
-                elif entity.dxftype() == 'ARC':
-                    # Normaliser les angles pour le traitement
-                    start_angle = entity.dxf.start_angle
-                    end_angle = entity.dxf.end_angle
-                    if end_angle < start_angle:
-                        end_angle += 360 
+            with self.instrumentation.stage("extraction") as stage:
+                if entity_filter is not None and entity_filter.is_empty():
+                    entity_filter = None
+                if entity_filter is not None:
+                    entity_filter.bind(doc)
+                rejected_count = 0
+
+                for entity in msp:
+                    if entity.dxftype() not in SUPPORTED_DXF_TYPES:
+                        continue # Ignorer les autres types d'entités 
+                    if entity_filter is not None and not entity_filter.accepts(entity):
+                        rejected_count += 1
+                        continue
+
+                    entity_data = {'original_id': str(entity.dxf.handle), 'layer': entity.dxf.get('layer', '0')} 
+
+                    if entity.dxftype() == 'LINE':
+                        entity_data.update({
+                            'type': 'LINE',
+                            'coords': {
+                                'start_point': tuple(entity.dxf.start)[:2], 
+                                'end_point': tuple(entity.dxf.end)[:2] 
+                            },
+                            'id_display': f"Line {entity_data['original_id'][-4:]}" 
+                        })
+                    elif entity.dxftype() == 'ARC':
+                        # Normaliser les angles pour le traitement
+                        start_angle = entity.dxf.start_angle
+                        end_angle = entity.dxf.end_angle
+                        if end_angle < start_angle:
+                            end_angle += 360 
                     
-                    center = tuple(entity.dxf.center)[:2]
-                    radius = entity.dxf.radius
-
-                    # Calculer les points de départ et de fin en 2D
-                    start_point = (center[0] + radius * math.cos(math.radians(start_angle)),
-                                   center[1] + radius * math.sin(math.radians(start_angle)))
-                    end_point = (center[0] + radius * math.cos(math.radians(end_angle)),
-                                 center[1] + radius * math.sin(math.radians(end_angle)))
-
-                    entity_data.update({
-                        'type': 'ARC',
-                        'coords': {
-                            'center': center, 
-                            'radius': radius, 
-                            'start_angle': start_angle, 
-                            'end_angle': end_angle,
-                            'start_point': start_point, 
-                            'end_point': end_point 
-                        },
-                        'id_display': f"Arc {entity_data['original_id'][-4:]}" 
-                    })
-                elif entity.dxftype() == 'CIRCLE':
-                    entity_data.update({
-                        'type': 'CIRCLE',
-                        'coords': {
-                            'center': tuple(entity.dxf.center)[:2], 
-                            'radius': entity.dxf.radius 
-                        },
-                        'id_display': f"Circle {entity_data['original_id'][-4:]}" 
-                    })
-                else:
-                    continue # Ignorer les autres types d'entités 
-
-                self.current_dxf_entities[entity_data['original_id']] = entity_data
+                        center = tuple(entity.dxf.center)[:2]
+                        radius = entity.dxf.radius
+
+                        # Calculer les points de départ et de fin en 2D
+                        start_point = (center[0] + radius * math.cos(math.radians(start_angle)),
+                                       center[1] + radius * math.sin(math.radians(start_angle)))
+                        end_point = (center[0] + radius * math.cos(math.radians(end_angle)),
+                                     center[1] + radius * math.sin(math.radians(end_angle)))
+
+                        entity_data.update({
+                            'type': 'ARC',
+                            'coords': {
+                                'center': center, 
+                                'radius': radius, 
+                                'start_angle': start_angle, 
+                                'end_angle': end_angle,
+                                'start_point': start_point, 
+                                'end_point': end_point 
+                            },
+                            'id_display': f"Arc {entity_data['original_id'][-4:]}" 
+                        })
+                    elif entity.dxftype() == 'CIRCLE':
+                        entity_data.update({
+                            'type': 'CIRCLE',
+                            'coords': {
+                                'center': tuple(entity.dxf.center)[:2], 
+                                'radius': entity.dxf.radius 
+                            },
+                            'id_display': f"Circle {entity_data['original_id'][-4:]}" 
+                        })
+                    else:
+                        continue # Ignorer les autres types d'entités 
+
+                    entity_data['geometry_hash'] = self._geometry_hash(entity_data)
+                    self.current_dxf_entities[entity_data['original_id']] = entity_data
+                stage.count(len(self.current_dxf_entities))
             
+            if rejected_count:
+                logging.info(f"{rejected_count} entités écartées par le filtre d'extraction.")
             logging.info(f"{len(self.current_dxf_entities)} entités supportées extraites.") 
             return self.current_dxf_entities
         except (ezdxf.DXFError, IOError, Exception) as e:
             logging.error(f"Erreur lors du traitement du fichier DXF : {e}")
             return None 
 
-    def generate_auto_path(self, dxf_entities: Dict[str, Dict]) -> Tuple[List[List[Dict]], List[Dict]]:
+    def run_pipeline(self, file_path: str, entity_filter: Optional[ExtractionFilter] = None,
+                     group_by_layer: bool = False, initial_start_point: Tuple[float, float] = (0.0, 0.0),
+                     progress_callback=None, cancel_event=None) -> Optional[Dict]:
+        """
+        Enchaîne extraction, cheminement et génération du G-code.
+        progress_callback(étape, fraction) est appelé à chaque frontière d'étape ; si
+        cancel_event (threading.Event) est positionné, PipelineCancelled est levée à la
+        frontière suivante. Retourne un dict avec 'entities', 'ordered_trajectories',
+        'isolated_circles', 'gcode', 'dxf_id_map' et 'gcode_program' (GcodeProgram, dont
+        les blocs servent aux éditions suivantes), ou None si la lecture échoue.
+        """
+        def checkpoint(stage: str, fraction: float):
+            if cancel_event is not None and cancel_event.is_set():
+                raise PipelineCancelled(stage)
+            if progress_callback is not None:
+                progress_callback(stage, fraction)
+
+        checkpoint("Extraction des entités", 0.0)
+        entities = self.extract_dxf_entities(file_path, entity_filter)
+        if entities is None:
+            return None
+
+        checkpoint("Calcul des trajectoires", 0.4)
+        ordered_trajectories, isolated_circles = self.generate_auto_path(entities, group_by_layer=group_by_layer)
+
+        checkpoint("Génération du G-code", 0.8)
+        program = self.generate_gcode_program(ordered_trajectories, isolated_circles, initial_start_point)
+
+        checkpoint("G-code généré", 1.0)
+        return {
+            'entities': entities,
+            'ordered_trajectories': ordered_trajectories,
+            'isolated_circles': isolated_circles,
+            'gcode': program.gcode,
+            'dxf_id_map': program.dxf_id_map,
+            'gcode_program': program,
+        }
+
+    def group_entities_by_layer(self, dxf_entities: Dict[str, Dict]) -> Dict[str, Dict[str, Dict]]:
+        """
+        Regroupe les entités par calque, dans l'ordre de première apparition des calques.
+        Chaque groupe peut ensuite être traité comme une opération distincte.
+        """
+        groups: Dict[str, Dict[str, Dict]] = {}
+        for entity_id, entity in dxf_entities.items():
+            groups.setdefault(entity.get('layer', '0'), {})[entity_id] = entity
+        return groups
+
+    def generate_auto_path(self, dxf_entities: Dict[str, Dict], group_by_layer: bool = False) -> Tuple[List[List[Dict]], List[Dict]]:
         """
         Organise les entités en trajectoires connectées (boucles) et en cercles isolés.
+        Avec group_by_layer, les trajectoires ne traversent jamais deux calques et
+        sont émises calque par calque (les cercles isolés aussi).
+        Les segments parcourus à l'envers sont inversés en place (voir plan_auto_path
+        pour une variante sans effet de bord).
+        """
+        trajectory_orders, circle_ids = self.plan_auto_path(dxf_entities, group_by_layer=group_by_layer)
+
+        ordered_trajectories = []
+        for order in trajectory_orders:
+            path = []
+            for entity_id, should_reverse in order:
+                segment = dxf_entities[entity_id]
+                if should_reverse:
+                    self._reverse_segment(segment)
+                path.append(segment)
+            ordered_trajectories.append(path)
+        isolated_circles = [dxf_entities[circle_id] for circle_id in circle_ids]
+        return ordered_trajectories, isolated_circles
+
+    def plan_auto_path(self, dxf_entities: Dict[str, Dict], group_by_layer: bool = False) -> Tuple[List[List[Tuple[str, bool]]], List[str]]:
+        """
+        Calcule l'organisation en trajectoires sans modifier les entités.
+        Retourne, pour chaque trajectoire, la liste ordonnée des (id, à_inverser)
+        ainsi que la liste des IDs des cercles isolés.
         """
+        if group_by_layer:
+            trajectory_orders, circle_ids = [], []
+            for layer_name, layer_entities in self.group_entities_by_layer(dxf_entities).items():
+                logging.info(f"Calque {layer_name} : {len(layer_entities)} entités.")
+                layer_orders, layer_circle_ids = self.plan_auto_path(layer_entities)
+                trajectory_orders.extend(layer_orders)
+                circle_ids.extend(layer_circle_ids)
+            return trajectory_orders, circle_ids
+
         logging.info("Génération automatique des trajectoires...")
         
         entities_for_pathing = {k: v for k, v in dxf_entities.items() if v['type'] != 'CIRCLE'} 
-        isolated_circles = [v for v in dxf_entities.values() if v['type'] == 'CIRCLE'] 
-        ordered_trajectories = []
+        circle_ids = [k for k, v in dxf_entities.items() if v['type'] == 'CIRCLE'] 
+        trajectory_orders = []
         
         # 1. Identifier les groupes de segments connectés
-        components = self._find_connected_components(entities_for_pathing)
+        with self.instrumentation.stage("composants") as stage:
+            components = self._find_connected_components(entities_for_pathing)
+            stage.count(len(entities_for_pathing))
         
         # 2. Transformer chaque groupe en une trajectoire ordonnée
-        for component in components:
-            if component:
-                start_id = next(iter(component))
-                path = self._path_single_trajectory(component, component[start_id])
-                if path:
-                    ordered_trajectories.append(path)
+        with self.instrumentation.stage("cheminement") as stage:
+            for component in components:
+                if component:
+                    start_id = next(iter(component))
+                    order = self._order_single_trajectory(component, start_id)
+                    if order:
+                        trajectory_orders.append(order)
+            stage.count(len(components))
         
-        logging.info(f"{len(ordered_trajectories)} trajectoires et {len(isolated_circles)} cercles isolés générés.") 
-        return ordered_trajectories, isolated_circles
+        logging.info(f"{len(trajectory_orders)} trajectoires et {len(circle_ids)} cercles isolés générés.") 
+        return trajectory_orders, circle_ids
+
+    def diff_dxf_entities(self, old_entities: Dict[str, Dict], new_entities: Dict[str, Dict]) -> Dict[str, set]:
+        """
+        Compare deux extractions par handle et empreinte géométrique.
+        Retourne les ensembles d'IDs 'added', 'removed', 'modified' et 'unchanged'.
+        """
+        old_ids, new_ids = old_entities.keys(), new_entities.keys()
+        common_ids = old_ids & new_ids
+        modified = {eid for eid in common_ids
+                    if old_entities[eid].get('geometry_hash') != new_entities[eid].get('geometry_hash')}
+        return {
+            'added': set(new_ids - old_ids),
+            'removed': set(old_ids - new_ids),
+            'modified': modified,
+            'unchanged': common_ids - modified,
+        }
+
+    def update_auto_path(self, ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict],
+                         new_entities: Dict[str, Dict], diff: Dict[str, set],
+                         group_by_layer: bool = False) -> Tuple[List[List[Dict]], List[Dict]]:
+        """
+        Met à jour des trajectoires existantes après une nouvelle extraction.
+        Seules les trajectoires touchées par le diff (et celles qui s'y connectent)
+        repassent par la recherche de composants et le cheminement ; les autres
+        gardent leur position, leur ordre interne et leur sens de parcours.
+        Les IDs conservés dans new_entities sont réassociés aux segments existants.
+        """
+        changed_ids = diff['removed'] | diff['modified']
+        trajectory_of: Dict[str, int] = {}
+        affected_positions = set()
+        for position, trajectory in enumerate(ordered_trajectories):
+            for segment in trajectory:
+                trajectory_of[segment['original_id']] = position
+                if segment['original_id'] in changed_ids:
+                    affected_positions.add(position)
+
+        # Entités à recheminer : nouvelles, modifiées, et survivantes des trajectoires touchées
+        pool = {eid: new_entities[eid] for eid in diff['added'] | diff['modified']}
+        for position in affected_positions:
+            for segment in ordered_trajectories[position]:
+                if segment['original_id'] in new_entities:
+                    pool.setdefault(segment['original_id'], new_entities[segment['original_id']])
+
+        # Une trajectoire intacte qui touche une entité du pool doit être fusionnée avec elle
+        untouched_segments = [seg for position, trajectory in enumerate(ordered_trajectories)
+                              if position not in affected_positions for seg in trajectory]
+        endpoint_index = self._build_endpoint_index(untouched_segments)
+        frontier = [entity for entity in pool.values() if entity['type'] != 'CIRCLE']
+        while frontier and endpoint_index:
+            next_frontier = []
+            for entity in frontier:
+                for point in self._get_segment_endpoints(entity):
+                    for neighbor_id in self._query_endpoint_index(endpoint_index, point):
+                        position = trajectory_of[neighbor_id]
+                        if position in affected_positions:
+                            continue
+                        affected_positions.add(position)
+                        for segment in ordered_trajectories[position]:
+                            fresh = new_entities[segment['original_id']]
+                            pool.setdefault(segment['original_id'], fresh)
+                            next_frontier.append(fresh)
+            frontier = next_frontier
+
+        logging.info(f"Rechargement incrémental : {len(pool)} entités à recheminer, "
+                     f"{len(affected_positions)} trajectoires touchées sur {len(ordered_trajectories)}.")
+        new_trajectories, pooled_circles = self.generate_auto_path(pool, group_by_layer=group_by_layer)
+
+        # Chaque nouvelle trajectoire prend la place de la première ancienne trajectoire qu'elle reprend
+        anchored: Dict[int, List[List[Dict]]] = {}
+        appended = []
+        for path in new_trajectories:
+            anchors = [trajectory_of[seg['original_id']] for seg in path if seg['original_id'] in trajectory_of]
+            if anchors:
+                anchored.setdefault(min(anchors), []).append(path)
+            else:
+                appended.append(path)
+
+        result_trajectories = []
+        for position, trajectory in enumerate(ordered_trajectories):
+            if position in affected_positions:
+                result_trajectories.extend(anchored.get(position, []))
+            else:
+                result_trajectories.append(trajectory)
+                for segment in trajectory:
+                    new_entities[segment['original_id']] = segment
+        result_trajectories.extend(appended)
+
+        # Cercles : on garde l'ordre et le sens des cercles intacts, les modifiés restent en place
+        pooled_circle_ids = {circle['original_id'] for circle in pooled_circles}
+        result_circles = []
+        for circle in isolated_circles:
+            circle_id = circle['original_id']
+            if circle_id in diff['unchanged']:
+                result_circles.append(circle)
+                new_entities[circle_id] = circle
+            elif circle_id in pooled_circle_ids:
+                result_circles.append(new_entities[circle_id])
+                pooled_circle_ids.discard(circle_id)
+        result_circles.extend(c for c in pooled_circles if c['original_id'] in pooled_circle_ids)
+
+        return result_trajectories, result_circles
+
+    def reload_dxf_entities(self, file_path: str, ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict],
+                            entity_filter: Optional[ExtractionFilter] = None, group_by_layer: bool = False):
+        """
+        Relit un fichier DXF modifié et ne recalcule que ce qui a changé par rapport
+        à current_dxf_entities. Retourne (entités, trajectoires, cercles, diff),
+        ou None si la lecture échoue.
+        """
+        previous_entities = self.current_dxf_entities
+        new_entities = self.extract_dxf_entities(file_path, entity_filter)
+        if new_entities is None:
+            self.current_dxf_entities = previous_entities
+            return None
+
+        diff = self.diff_dxf_entities(previous_entities, new_entities)
+        logging.info(f"Diff DXF : {len(diff['added'])} ajoutées, {len(diff['removed'])} supprimées, "
+                     f"{len(diff['modified'])} modifiées, {len(diff['unchanged'])} inchangées.")
+        trajectories, circles = self.update_auto_path(ordered_trajectories, isolated_circles,
+                                                      new_entities, diff, group_by_layer=group_by_layer)
+        return new_entities, trajectories, circles, diff
 
     def generate_gcode(self, ordered_segments: List[Dict], isolated_circles: List[Dict], initial_start_point: Tuple[float, float]) -> Tuple[str, Dict[int, str]]:
         """
         Génère une chaîne de caractères G-code à partir des segments ordonnés et des cercles.
         Retourne le G-code et une map associant chaque ligne à un ID d'entité DXF.
         """
+        with self.instrumentation.stage("G-code") as stage:
+            gcode, dxf_id_map = self._generate_gcode(ordered_segments, isolated_circles, initial_start_point)
+            stage.count(len(dxf_id_map))
+        return gcode, dxf_id_map
+
+    def _generate_gcode(self, ordered_segments: List[Dict], isolated_circles: List[Dict], initial_start_point: Tuple[float, float]) -> Tuple[str, Dict[int, str]]:
         logging.info("Génération du G-code...")
         gcode_lines, dxf_id_map = [], {}
-        current_x, current_y = initial_start_point
+        current = initial_start_point
 
         def add_line(line, dxf_id):
             gcode_lines.append(line)
             dxf_id_map[len(gcode_lines) - 1] = dxf_id
 
         # En-tête du G-code
-        add_line(f"G0 X{current_x:.3f} Y{current_y:.3f} ; Position initiale", "INITIAL_POS") 
+        add_line(f"G0 X{current[0]:.3f} Y{current[1]:.3f} ; Position initiale", "INITIAL_POS") 
 
         # Traitement des segments ordonnés (lignes et arcs)
         for segment in ordered_segments:
-            start_x, start_y = segment['coords']['start_point']
-            end_x, end_y = segment['coords']['end_point']
-
-            # Si la position actuelle n'est pas le début du segment, s'y déplacer en rapide (G0)
-            if self._calculate_distance((current_x, current_y), (start_x, start_y)) > self.connection_tolerance:
-                add_line(f"G0 X{start_x:.3f} Y{start_y:.3f} ; Aller au segment {segment['original_id']}", f"JUMP_TO_DXF_{segment['original_id']}") 
-                current_x, current_y = start_x, start_y
-
-            if segment['type'] == 'LINE':
-                add_line(f"G1 X{end_x:.3f} Y{end_y:.3f}", f"L{segment['original_id']}") 
-            elif segment['type'] == 'ARC':
-                center_x, center_y = segment['coords']['center']
-                i, j = center_x - current_x, center_y - current_y
-                # G2 = sens horaire, G3 = sens anti-horaire
-                # Un angle final plus grand signifie un parcours anti-horaire (G3)
-                gcode_cmd = "G3" if (segment['coords']['end_angle'] > segment['coords']['start_angle']) ^ segment.get('direction_reversed', False) else "G2" 
-                add_line(f"{gcode_cmd} X{end_x:.3f} Y{end_y:.3f} I{i:.3f} J{j:.3f}", f"A{segment['original_id']}") 
-            
-            current_x, current_y = end_x, end_y
+            current = self._segment_gcode(segment, current, add_line)
 
         # Traitement des cercles isolés
         for circle in isolated_circles:
-            center_x, center_y = circle['coords']['center']
-            radius = circle['coords']['radius']
-            start_x, start_y = center_x + radius, center_y # Point de départ du cercle sur l'axe X+
-
-            if self._calculate_distance((current_x, current_y), (start_x, start_y)) > self.connection_tolerance:
-                add_line(f"G0 X{start_x:.3f} Y{start_y:.3f} ; Aller au cercle {circle['original_id']}", f"JUMP_TO_CIRCLE_{circle['original_id']}") 
-                current_x, current_y = start_x, start_y
-
-            # Un cercle complet est un G2 ou G3 avec I et J relatifs
-            gcode_cmd = "G3" if circle.get('direction_reversed', False) else "G2" 
-            add_line(f"{gcode_cmd} I{-radius:.3f} J0.000", f"C{circle['original_id']}") 
-            current_x, current_y = start_x, start_y # On revient au point de départ du cercle
+            current = self._circle_gcode(circle, current, add_line)
 
         # Pied de page du G-code
         add_line("M2 ; Fin du programme", "FOOTER") 
@@ -172,13 +543,194 @@ class DxfProcessor:
         logging.info("Génération du G-code terminée.")
         return "\n".join(gcode_lines), dxf_id_map 
 
-    
+    def _segment_gcode(self, segment: Dict, current: Tuple[float, float], add_line) -> Tuple[float, float]:
+        """Émet les lignes d'un segment (précédées d'un G0 si besoin) ; retourne la nouvelle position."""
+        current_x, current_y = current
+        start_x, start_y = segment['coords']['start_point']
+        end_x, end_y = segment['coords']['end_point']
+
+        # Si la position actuelle n'est pas le début du segment, s'y déplacer en rapide (G0)
+        if self._calculate_distance((current_x, current_y), (start_x, start_y)) > self.connection_tolerance:
+            add_line(f"G0 X{start_x:.3f} Y{start_y:.3f} ; Aller au segment {segment['original_id']}", f"JUMP_TO_DXF_{segment['original_id']}") 
+            current_x, current_y = start_x, start_y
+
+        if segment['type'] == 'LINE':
+            add_line(f"G1 X{end_x:.3f} Y{end_y:.3f}", f"L{segment['original_id']}") 
+        elif segment['type'] == 'ARC':
+            center_x, center_y = segment['coords']['center']
+            i, j = center_x - current_x, center_y - current_y
+            # G2 = sens horaire, G3 = sens anti-horaire
+            # Un angle final plus grand signifie un parcours anti-horaire (G3)
+            gcode_cmd = "G3" if (segment['coords']['end_angle'] > segment['coords']['start_angle']) ^ segment.get('direction_reversed', False) else "G2" 
+            add_line(f"{gcode_cmd} X{end_x:.3f} Y{end_y:.3f} I{i:.3f} J{j:.3f}", f"A{segment['original_id']}") 
+        return end_x, end_y
+
+    def _circle_gcode(self, circle: Dict, current: Tuple[float, float], add_line) -> Tuple[float, float]:
+        """Émet les lignes d'un cercle isolé (précédées d'un G0 si besoin) ; retourne la nouvelle position."""
+        center_x, center_y = circle['coords']['center']
+        radius = circle['coords']['radius']
+        start_x, start_y = center_x + radius, center_y # Point de départ du cercle sur l'axe X+
+
+        if self._calculate_distance(current, (start_x, start_y)) > self.connection_tolerance:
+            add_line(f"G0 X{start_x:.3f} Y{start_y:.3f} ; Aller au cercle {circle['original_id']}", f"JUMP_TO_CIRCLE_{circle['original_id']}") 
+
+        # Un cercle complet est un G2 ou G3 avec I et J relatifs
+        gcode_cmd = "G3" if circle.get('direction_reversed', False) else "G2" 
+        add_line(f"{gcode_cmd} I{-radius:.3f} J0.000", f"C{circle['original_id']}") 
+        return start_x, start_y # On revient au point de départ du cercle
+
+    def generate_gcode_program(self, ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict],
+                               initial_start_point: Tuple[float, float],
+                               trajectory_keys: Optional[List[Hashable]] = None,
+                               previous: Optional['GcodeProgram'] = None,
+                               changed_keys: Iterable[Hashable] = ()) -> 'GcodeProgram':
+        """
+        Génère le même G-code que generate_gcode, assemblé par trajectoire pour les éditions.
+
+        trajectory_keys (parallèle à ordered_trajectories, par défaut leur index) identifie
+        les trajectoires d'une génération à l'autre. Avec previous, le bloc d'une trajectoire
+        dont la clé n'est pas dans changed_keys est repris de previous : seules les lignes de
+        son premier segment, qui dépendent de la position d'arrivée, sont réémises, et ses
+        index de lignes sont décalés à sa nouvelle place. Déplacer ou supprimer une trajectoire
+        ne régénère donc que les entrées de blocs ; changed_keys liste celles dont les segments
+        ont changé (inversion, nouveau premier segment).
+        """
+        with self.instrumentation.stage("G-code") as stage:
+            program = self._assemble_gcode_program(ordered_trajectories, isolated_circles, initial_start_point,
+                                                   trajectory_keys, previous, changed_keys)
+            stage.count(len(program.dxf_id_map))
+        return program
+
+    def _assemble_gcode_program(self, ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict],
+                                initial_start_point: Tuple[float, float],
+                                trajectory_keys: Optional[List[Hashable]], previous: Optional['GcodeProgram'],
+                                changed_keys: Iterable[Hashable]) -> 'GcodeProgram':
+        keys = trajectory_keys if trajectory_keys is not None else range(len(ordered_trajectories))
+        changed = set(changed_keys)
+        cached_blocks = previous.blocks if previous is not None else {}
+        gcode_lines, dxf_ids = [], []
+        dxf_id_to_line_map: Dict[str, List[int]] = {}
+        blocks: Dict[Hashable, GcodeBlock] = {}
+        block_lines: Dict[Hashable, Tuple[int, int]] = {}
+        built_count = 0
+
+        def add_line(line, dxf_id):
+            gcode_lines.append(line)
+            dxf_ids.append(dxf_id)
+            handle = dxf_handle(dxf_id)
+            if handle:
+                dxf_id_to_line_map.setdefault(handle, []).append(len(gcode_lines) - 1)
+
+        current = initial_start_point
+        add_line(f"G0 X{current[0]:.3f} Y{current[1]:.3f} ; Position initiale", "INITIAL_POS")
+        for key, trajectory in zip(keys, ordered_trajectories):
+            if not trajectory:
+                continue
+            first_line = len(gcode_lines)
+            current = self._segment_gcode(trajectory[0], current, add_line)
+            block = cached_blocks.get(key) if key not in changed else None
+            if block is None:
+                block = self._trajectory_block(trajectory)
+                built_count += 1
+            offset = len(gcode_lines)
+            gcode_lines.extend(block.lines)
+            dxf_ids.extend(block.ids)
+            for handle, local_lines in block.handle_lines.items():
+                dxf_id_to_line_map.setdefault(handle, []).extend([offset + index for index in local_lines])
+            current = block.end_point
+            blocks[key] = block
+            block_lines[key] = (first_line, len(gcode_lines))
+
+        for circle in isolated_circles:
+            first_line = len(gcode_lines)
+            current = self._circle_gcode(circle, current, add_line)
+            block_lines[('circle', circle['original_id'])] = (first_line, len(gcode_lines))
+        add_line("M2 ; Fin du programme", "FOOTER")
+
+        logging.info(f"G-code assemblé : {built_count} blocs générés, {len(blocks) - built_count} repris "
+                     f"({len(gcode_lines)} lignes).")
+        return GcodeProgram("\n".join(gcode_lines), gcode_lines, dict(enumerate(dxf_ids)), dxf_id_to_line_map,
+                            blocks, block_lines)
+
+    def _trajectory_block(self, trajectory: List[Dict]) -> 'GcodeBlock':
+        """Lignes des segments d'une trajectoire après le premier (voir GcodeBlock)."""
+        lines, ids = [], []
+
+        def add_line(line, dxf_id):
+            lines.append(line)
+            ids.append(dxf_id)
+
+        current = trajectory[0]['coords']['end_point']
+        for segment in trajectory[1:]:
+            current = self._segment_gcode(segment, current, add_line)
+        handle_lines: Dict[str, List[int]] = {}
+        for index, dxf_id in enumerate(ids):
+            handle = dxf_handle(dxf_id)
+            if handle:
+                handle_lines.setdefault(handle, []).append(index)
+        return GcodeBlock(lines, ids, handle_lines, tuple(current))
+
     def _calculate_distance(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
         return math.hypot(p1[0] - p2[0], p1[1] - p2[1]) 
 
+    def _geometry_hash(self, entity: Dict) -> int:
+        """Empreinte de la géométrie d'une entité, indépendante de son sens de parcours."""
+        coords = entity['coords']
+        if entity['type'] == 'LINE':
+            start = (round(coords['start_point'][0], 6), round(coords['start_point'][1], 6))
+            end = (round(coords['end_point'][0], 6), round(coords['end_point'][1], 6))
+            key = ('LINE', entity.get('layer'), min(start, end), max(start, end))
+        elif entity['type'] == 'ARC':
+            key = ('ARC', entity.get('layer'), round(coords['center'][0], 6), round(coords['center'][1], 6),
+                   round(coords['radius'], 6), round(coords['start_angle'], 6), round(coords['end_angle'], 6))
+        else:
+            key = (entity['type'], entity.get('layer'), round(coords['center'][0], 6), round(coords['center'][1], 6),
+                   round(coords['radius'], 6))
+        return hash(key)
+
+    def _endpoint_cell(self, point: Tuple[float, float]) -> Tuple[int, int]:
+        cell_size = max(self.connection_tolerance, 1e-9)
+        return (math.floor(point[0] / cell_size), math.floor(point[1] / cell_size))
+
+    def _build_endpoint_index(self, segments: List[Dict]) -> Dict[Tuple[int, int], List[Tuple[str, Tuple[float, float]]]]:
+        """Grille uniforme (pas = tolérance de connexion) des extrémités des segments."""
+        index: Dict[Tuple[int, int], List[Tuple[str, Tuple[float, float]]]] = {}
+        for segment in segments:
+            for point in self._get_segment_endpoints(segment):
+                index.setdefault(self._endpoint_cell(point), []).append((segment['original_id'], point))
+        return index
+
+    def _query_endpoint_index(self, index: Dict, point: Tuple[float, float]) -> List[str]:
+        """IDs des segments dont une extrémité est à moins de la tolérance de point."""
+        cell_x, cell_y = self._endpoint_cell(point)
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for segment_id, endpoint in index.get((cell_x + dx, cell_y + dy), ()):
+                    if self._calculate_distance(point, endpoint) <= self.connection_tolerance:
+                        found.append(segment_id)
+        return found
+
     def _get_segment_endpoints(self, segment: Dict) -> Tuple[Tuple[float, float], Tuple[float, float]]:
         return segment['coords']['start_point'], segment['coords']['end_point'] 
 
+    def order_by_nearest_neighbour(self, paths: List[Tuple[Tuple[float, float], Tuple[float, float]]],
+                                   start_point: Tuple[float, float]) -> List[int]:
+        """
+        Ordre glouton du plus proche voisin de chemins donnés par (point d'entrée, point de
+        sortie) : en partant de start_point, le chemin suivant est celui dont l'entrée est la
+        plus proche de la sortie du précédent. Retourne les index des chemins dans cet ordre.
+        """
+        remaining = list(range(len(paths)))
+        order = []
+        current = start_point
+        while remaining:
+            k = min(range(len(remaining)), key=lambda k: self._calculate_distance(current, paths[remaining[k]][0]))
+            index = remaining.pop(k)
+            order.append(index)
+            current = paths[index][1]
+        return order
+
     def _reverse_segment(self, segment: Dict):
         if segment['type'] in ['LINE', 'ARC']:
             segment['coords']['start_point'], segment['coords']['end_point'] = segment['coords']['end_point'], segment['coords']['start_point'] 
@@ -200,7 +752,7 @@ class DxfProcessor:
             if entity_id in visited_ids:
                 continue
             
-            component_ids = set()
+            component_ids, component_order = set(), [] # Ordre de découverte : résultat reproductible
             queue = [entity_id]
             
             while queue:
@@ -209,6 +761,7 @@ class DxfProcessor:
                     continue
                 
                 component_ids.add(current_id)
+                component_order.append(current_id)
                 visited_ids.add(current_id)
                 current_start, current_end = self._get_segment_endpoints(dxf_entities[current_id])
                 
@@ -223,14 +776,15 @@ class DxfProcessor:
                            self._calculate_distance(current_end, neighbor_end)) <= self.connection_tolerance:
                         queue.append(neighbor_id)
             
-            components.append({cid: dxf_entities[cid] for cid in component_ids})
+            components.append({cid: dxf_entities[cid] for cid in component_order})
         logging.info(f"{len(components)} composants connectés trouvés.") 
         return components
 
-    def _path_single_trajectory(self, component: Dict, start_segment: Dict) -> List[Dict]:
-        path = [start_segment]
+    def _order_single_trajectory(self, component: Dict, start_id: str) -> List[Tuple[str, bool]]:
+        """Ordonne un composant connecté en [(id, à_inverser), ...] sans modifier ses entités."""
+        order = [(start_id, False)]
         remaining = component.copy()
-        del remaining[start_segment['original_id']]
+        start_segment = remaining.pop(start_id)
         
         active_point = start_segment['coords']['end_point']
         
@@ -239,15 +793,12 @@ class DxfProcessor:
             if next_id is None:
                 break # Fin de la trajectoire ouverte
                 
-            next_segment = remaining.pop(next_id)
-            if should_reverse:
-                self._reverse_segment(next_segment)
-            
-            path.append(next_segment)
-            active_point = next_segment['coords']['end_point']
+            start_p, end_p = self._get_segment_endpoints(remaining.pop(next_id))
+            order.append((next_id, should_reverse))
+            active_point = start_p if should_reverse else end_p
 
             # Condition de fermeture de boucle
             if self._calculate_distance(active_point, start_segment['coords']['start_point']) <= self.connection_tolerance:
                 break # Boucle fermée
 
-        return path
+        return order
@@ -0,0 +1,106 @@
+"""
+Historique (défaire / refaire) des éditions de trajectoires de l'IHM.
+
+Une édition n'est pas un instantané des trajectoires : elle décrit la tranche de
+ordered_trajectories (avec les clés stables) et celle de isolated_circles qu'elle
+remplace, avant et après, et les segments dont elle inverse le sens. Ces tranches
+référencent les listes et dictionnaires de segments existants, sans copie : une
+édition occupe une mémoire proportionnelle à ce qu'elle change, et la défaire
+consiste à appliquer l'édition inverse (tranches échangées, mêmes segments
+réinversés), avec les mêmes mises à jour incrémentales qu'une édition directe.
+"""
+from collections import deque
+from typing import Callable, Dict, FrozenSet, Hashable, Iterable, List, NamedTuple, Optional, Tuple
+
+MAX_UNDO_STEPS = 100 # Éditions gardées dans l'historique
+
+
+class TrajectoryEdit(NamedTuple):
+    label: str # Libellé affiché (ex. "Supprimer")
+    position: int = 0 # Début de la tranche remplacée dans ordered_trajectories
+    trajectories_before: Tuple[Tuple[Hashable, List[Dict]], ...] = () # (clé, trajectoire) remplacées
+    trajectories_after: Tuple[Tuple[Hashable, List[Dict]], ...] = ()
+    circle_position: int = 0 # Début de la tranche remplacée dans isolated_circles
+    circles_before: Tuple[Dict, ...] = ()
+    circles_after: Tuple[Dict, ...] = ()
+    reversed_segments: Tuple[Dict, ...] = () # Segments dont le sens est inversé par l'édition
+    changed_keys: FrozenSet[Hashable] = frozenset() # Trajectoires dont les segments changent
+
+    def inverted(self) -> 'TrajectoryEdit':
+        """Édition qui annule celle-ci (les inversions de sens sont leur propre inverse)."""
+        return self._replace(trajectories_before=self.trajectories_after,
+                             trajectories_after=self.trajectories_before,
+                             circles_before=self.circles_after, circles_after=self.circles_before)
+
+
+def apply_edit(edit: TrajectoryEdit, ordered_trajectories: List[List[Dict]], trajectory_keys: List[Hashable],
+               isolated_circles: List[Dict], reverse_segment: Callable[[Dict], None]):
+    """Applique une édition en place sur les listes données ; reverse_segment inverse un segment."""
+    for segment in edit.reversed_segments:
+        reverse_segment(segment)
+    stop = edit.position + len(edit.trajectories_before)
+    ordered_trajectories[edit.position:stop] = [trajectory for _, trajectory in edit.trajectories_after]
+    trajectory_keys[edit.position:stop] = [key for key, _ in edit.trajectories_after]
+    stop = edit.circle_position + len(edit.circles_before)
+    isolated_circles[edit.circle_position:stop] = edit.circles_after
+
+
+def block_move_order(selected: Iterable[int], count: int, step: int) -> Tuple[int, List[int]]:
+    """
+    Déplacement d'un cran (step = -1 : vers le début, 1 : vers la fin) des éléments d'index
+    selected dans une liste de count éléments. Les éléments contigus restent groupés ; un
+    élément bloqué par le bord, ou par un élément sélectionné lui-même bloqué, ne bouge pas.
+    Retourne (début de la tranche modifiée, index actuels de ses éléments dans le nouvel
+    ordre) ; la tranche est vide si rien ne bouge.
+    """
+    occupied = set(selected)
+    placed: Dict[int, int] = {} # Position -> index actuel de l'élément qui y arrive
+    for position in sorted(occupied, reverse=step > 0):
+        target = position + step
+        if 0 <= target < count and target not in occupied:
+            placed[position], placed[target] = placed.get(target, target), placed.get(position, position)
+            occupied.discard(position)
+            occupied.add(target)
+    if not placed:
+        return 0, []
+    first, last = min(placed), max(placed)
+    return first, [placed.get(position, position) for position in range(first, last + 1)]
+
+
+class EditHistory:
+    """Piles défaire / refaire ; une nouvelle édition vide la pile refaire."""
+    def __init__(self, max_steps: int = MAX_UNDO_STEPS):
+        self._undo = deque(maxlen=max_steps)
+        self._redo: List[TrajectoryEdit] = []
+
+    def record(self, edit: TrajectoryEdit):
+        self._undo.append(edit)
+        self._redo.clear()
+
+    def undo(self) -> Optional[TrajectoryEdit]:
+        """Édition à appliquer pour défaire la dernière, None si l'historique est vide."""
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        self._redo.append(edit)
+        return edit.inverted()
+
+    def redo(self) -> Optional[TrajectoryEdit]:
+        """Dernière édition défaite, à appliquer de nouveau ; None s'il n'y en a pas."""
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        self._undo.append(edit)
+        return edit
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+
+    @property
+    def undo_label(self) -> Optional[str]:
+        return self._undo[-1].label if self._undo else None
+
+    @property
+    def redo_label(self) -> Optional[str]:
+        return self._redo[-1].label if self._redo else None
@@ -0,0 +1,653 @@
+"""
+Rendu matplotlib des trajectoires G-code, indépendant de toute boîte à outils graphique.
+
+GcodeRenderer dessine sur une Figure matplotlib quelconque : celle du GcodeVisualizer
+(FigureCanvasTkAgg) dans l'IHM, ou une figure Agg hors écran pour les rendus sans
+affichage (benchmarks, aperçus).
+"""
+import logging
+from typing import List, Dict, Tuple, Any, Callable, Hashable, Iterable, Optional
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.path import Path
+
+from spatial_index import GridIndex
+from tessellation import (ARC_CHORD_TOLERANCE, arc_parameters, arc_points, bucket_range, tessellate_segment,
+                          tolerance_bucket)
+from toolpath_segments import TRAJECTORY_COLORS, PathGroup, build_path_segments, segment_distance
+
+CUT_LINEWIDTH = 2
+JUMP_LINEWIDTH = 1
+HIGHLIGHT_COLOR = 'magenta' # Couleur de surbrillance
+HIGHLIGHT_LINEWIDTH = 4 # Rendre la ligne plus épaisse pour la surbrillance
+SIMULATION_CUT_COLOR = '#333333' # Tracé « déjà coupé » de la simulation
+LOD_TOLERANCE_PX = 0.5 # Écart maximal toléré (en pixels) entre un arc et sa corde
+SUBPIXEL_EXTENT_PX = 2.0 # En dessous, un segment ne se distingue plus : un seul est gardé par case de cette taille
+
+
+def vertex_bboxes(vertices: List[np.ndarray]) -> np.ndarray:
+    """Boîtes englobantes (N x 4 : xmin, ymin, xmax, ymax) d'une liste de polylignes."""
+    if not vertices:
+        return np.empty((0, 4))
+    starts = np.cumsum([0] + [len(points) for points in vertices[:-1]])
+    stacked = np.concatenate(vertices)
+    return np.hstack((np.minimum.reduceat(stacked, starts), np.maximum.reduceat(stacked, starts)))
+
+
+class LodLineCollection(LineCollection):
+    """
+    LineCollection avec culling et niveaux de détail, recalculés à chaque rendu :
+    - seuls les segments dont la boîte englobante intersecte la vue sont dessinés (GridIndex) ;
+    - les segments plus petits que SUBPIXEL_EXTENT_PX ne sont gardés qu'à raison d'un par
+      case de SUBPIXEL_EXTENT_PX pixels ;
+    - un arc (arcs : centre x, centre y, rayon, angle de départ, balayage ; rayon nul pour
+      une ligne) est retessellé par le module tessellation avec une flèche de
+      LOD_TOLERANCE_PX à l'échelle de la vue : peu de cordes vu de loin, un tracé lisse
+      en zoomant.
+    Le coût d'un rendu dépend donc de la vue et de la résolution, pas de la taille du dessin.
+    Les Path matplotlib sont créés à la demande et conservés par bucket de tolérance.
+
+    vertices reste la tessellation de référence (ARC_CHORD_TOLERANCE) : boîtes englobantes,
+    surbrillance et simulation.
+
+    item_colors (N x 4), s'il est fourni, donne la couleur de chaque segment ; après une
+    modification sur place, appeler refresh_colors().
+
+    item_range (début, fin), s'il est fourni, limite le rendu aux segments d'index compris
+    dans [début, fin[ (tracé partiel de la simulation). shared est une autre collection aux
+    mêmes sommets dont l'index spatial et les Path sont réutilisés.
+    """
+    def __init__(self, vertices: List[np.ndarray], item_colors: Optional[np.ndarray] = None,
+                 arcs: Optional[np.ndarray] = None, shared: Optional['LodLineCollection'] = None, **kwargs):
+        super().__init__([], **kwargs)
+        self.item_range: Optional[Tuple[int, int]] = None
+        if shared is not None:
+            self.vertices, self.item_colors = vertices, item_colors
+            self.arcs, self.index, self._path_cache = shared.arcs, shared.index, shared._path_cache
+            self._reset_view()
+        else:
+            self.set_items(vertices, item_colors, arcs)
+
+    def set_items(self, vertices: List[np.ndarray], item_colors: Optional[np.ndarray] = None,
+                  arcs: Optional[np.ndarray] = None, bboxes: Optional[np.ndarray] = None,
+                  path_cache: Optional[List[Any]] = None):
+        """
+        Remplace les segments de la collection. bboxes (N x 4) et path_cache (par segment :
+        None, le Path d'une ligne ou un dict bucket -> Path pour un arc) peuvent être repris
+        d'un dessin précédent pour ne pas les recalculer.
+        """
+        self.vertices = vertices
+        self.item_colors = item_colors
+        self.arcs = np.zeros((len(vertices), 5)) if arcs is None else np.asarray(arcs, dtype=float).reshape(-1, 5)
+        self.index = GridIndex(vertex_bboxes(vertices) if bboxes is None else bboxes)
+        self._path_cache = path_cache if path_cache is not None else [None] * len(vertices)
+        self._reset_view()
+
+    def _reset_view(self):
+        self.visible_indices = np.empty(0, dtype=np.intp)
+        self._view_key = None
+        self._view_visible = self._view_levels = self.visible_indices
+        self._selection_key = None
+        self.stale = True
+
+    def _lod_path(self, index: int, bucket: int) -> Path:
+        cached = self._path_cache[index]
+        if isinstance(cached, Path):
+            return cached
+        path = cached.get(bucket) if cached is not None else None
+        if path is None:
+            center_x, center_y, radius, start_angle, sweep = self.arcs[index].tolist()
+            if radius <= 0:
+                path = self._path_cache[index] = Path(self.vertices[index])
+                return path
+            if cached is None:
+                cached = self._path_cache[index] = {}
+            path = cached[bucket] = Path(arc_points((center_x, center_y), radius, start_angle, sweep,
+                                                    2.0 ** bucket))
+        return path
+
+    def _update_view(self):
+        ax = self.axes
+        (xmin, xmax), (ymin, ymax) = sorted(ax.get_xlim()), sorted(ax.get_ylim())
+        width_px = ax.bbox.width
+        view_key = (xmin, xmax, ymin, ymax, width_px, ax.bbox.height)
+        if view_key != self._view_key:
+            self._view_key = view_key
+            self._view_visible, self._view_levels = self._visible_levels(xmin, xmax, ymin, ymax, width_px)
+        selection_key = (view_key, self.item_range)
+        if selection_key == self._selection_key:
+            return
+        self._selection_key = selection_key
+
+        visible, levels = self._view_visible, self._view_levels
+        if self.item_range is not None:
+            start, stop = np.searchsorted(visible, self.item_range)
+            visible, levels = visible[start:stop], levels[start:stop]
+        self._paths = [self._lod_path(index, level) for index, level in zip(visible.tolist(), levels.tolist())]
+        self.visible_indices = visible
+        if self.item_colors is not None:
+            self.set_color(self.item_colors[visible])
+
+    def _visible_levels(self, xmin: float, xmax: float, ymin: float, ymax: float,
+                        width_px: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Segments à dessiner dans la vue (triés) et bucket de tolérance de chacun."""
+        px_per_unit = width_px / max(xmax - xmin, 1e-12)
+        # Un arc retessellé finement peut déborder de sa boîte (tessellation de référence) de sa flèche
+        margin = HIGHLIGHT_LINEWIDTH / max(px_per_unit, 1e-12) + ARC_CHORD_TOLERANCE
+        visible = self.index.query(xmin - margin, ymin - margin, xmax + margin, ymax + margin)
+        boxes = self.index.bboxes[visible]
+        extents_px = np.maximum(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]) * px_per_unit
+        tiny = extents_px < SUBPIXEL_EXTENT_PX
+        if tiny.any():
+            # Un seul segment par case parmi ceux qui y tiennent entièrement
+            tiny_indices = visible[tiny]
+            cell_per_unit = px_per_unit / SUBPIXEL_EXTENT_PX
+            cell_x = np.floor(((boxes[tiny, 0] + boxes[tiny, 2]) / 2 - xmin + margin) * cell_per_unit).astype(np.int64)
+            cell_y = np.floor(((boxes[tiny, 1] + boxes[tiny, 3]) / 2 - ymin + margin) * cell_per_unit).astype(np.int64)
+            _, first = np.unique((cell_x << 32) + cell_y, return_index=True)
+            visible = np.sort(np.concatenate((visible[~tiny], tiny_indices[first])))
+
+        # Tolérance de corde : LOD_TOLERANCE_PX à l'échelle de la vue, bornée aux buckets utiles de chaque arc
+        radii = self.arcs[visible, 2]
+        levels = np.zeros(len(visible), dtype=np.intp)
+        arcs = radii > 0
+        if arcs.any():
+            finest, coarsest = bucket_range(radii[arcs])
+            view_bucket = tolerance_bucket(LOD_TOLERANCE_PX / max(px_per_unit, 1e-12))
+            levels[arcs] = np.clip(view_bucket, finest, coarsest)
+        return visible, levels
+
+    def refresh_colors(self):
+        """Réapplique item_colors aux segments visibles (après une modification sur place)."""
+        if self.item_colors is not None:
+            self.set_color(self.item_colors[self.visible_indices])
+
+    def draw(self, renderer):
+        if self.axes is not None:
+            self._update_view()
+        super().draw(renderer)
+
+
+class GcodeRenderer:
+    """
+    Dessine un chemin G-code sur une Figure matplotlib et gère la surbrillance.
+    Sans figure fournie, une figure hors écran (backend Agg) est créée.
+    request_redraw est appelé quand le dessin doit être rafraîchi.
+
+    Le chemin est dessiné en deux LodLineCollection (coupes, déplacements G0) : le coût
+    d'un rendu dépend du nombre de sommets visibles et non du nombre d'objets Python.
+    """
+    def __init__(self, figure: Optional[Figure] = None, figsize: Tuple[float, float] = (8, 6),
+                 request_redraw: Optional[Callable[[], None]] = None):
+        if figure is None:
+            figure = Figure(figsize=figsize)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self._request_redraw = request_redraw
+
+        self.cut_collection: Optional[LineCollection] = None # Une polyligne par segment de coupe
+        self.jump_collection: Optional[LineCollection] = None # Déplacements G0, en pointillés
+        self.cut_ids: List[str] = [] # Index dans cut_collection -> original_id
+        self._cut_indices: Optional[Dict[str, List[int]]] = {} # Voir cut_indices
+        self.cut_colors = np.empty((0, 4)) # Couleurs RGBA d'origine des coupes (pour la surbrillance)
+        self.cut_paths: List[np.ndarray] = [] # Sommets de chaque segment de coupe
+        self.cut_segments: List[Dict] = [] # Segment d'origine de chaque coupe (pour la sélection à la souris)
+        # Couleurs affichées par cut_collection, modifiées sur place : une sélection ne touche que
+        # les index qui entrent ou sortent de la surbrillance
+        self._display_colors = np.empty((0, 4))
+        self.highlighted_indices: set = set()
+        # L'épaisseur de la surbrillance est portée par une collection superposée qui ne contient que
+        # la sélection : des épaisseurs par segment sur cut_collection coûteraient O(n) à chaque clic
+        # (matplotlib recalcule les pointillés de chaque élément)
+        self.highlight_collection: Optional[LineCollection] = None
+        self.vertex_count = 0
+        # Groupes dessinés (voir update_gcode_path) : clé -> (début, fin) dans les coupes et
+        # sommets de ses déplacements G0 internes
+        self._groups: Dict[Hashable, Tuple[int, int, List[np.ndarray]]] = {}
+        self._entry_jump_points: Dict[int, Tuple[Dict, np.ndarray]] = {} # id(segment G0) -> (segment, sommets)
+
+        # Simulation (voir show_simulation) : artistes créés une fois, mis à jour à chaque trame
+        self.simulation = None # ToolpathTimeline affichée
+        self.sim_collection: Optional[LodLineCollection] = None # Coupes terminées (item_range)
+        self.sim_head_line: Optional[Line2D] = None # Coupe en cours, jusqu'à l'outil
+        self.sim_marker: Optional[Line2D] = None
+        self._sim_done_items = 0 # Coupes terminées à la position courante
+        # Mode blitting : fond statique + coupes terminées [0, _sim_layer_items[ déjà dessinées
+        self._sim_layer = None
+        self._sim_layer_items = 0
+
+        # Mode blitting (voir enable_blitting) : fond statique mis en cache après chaque rendu complet
+        self.use_blit = False
+        self._background = None
+        self._pan_region = None
+
+        self._configure_plot()
+
+    def request_redraw(self):
+        self._background = None # Le fond en cache ne correspond plus au prochain rendu
+        if self._request_redraw is not None:
+            self._request_redraw()
+        else:
+            self.figure.canvas.draw_idle()
+
+    def enable_blitting(self):
+        """
+        Active le blitting : la surbrillance devient un artiste animé, dessiné par-dessus
+        une copie du rendu statique (trajectoires) prise à chaque rendu complet. Un
+        changement de sélection ne redessine plus que la surbrillance, et un pan à la
+        souris déplace l'image en cache (pan_preview) jusqu'au rendu complet de end_pan.
+        Sans effet si le canevas ne sait pas faire de blit.
+        """
+        canvas = self.figure.canvas
+        if self.use_blit or not getattr(canvas, 'supports_blit', False):
+            return
+        self.use_blit = True
+        for artist in self._overlay_artists():
+            artist.set_animated(True)
+        canvas.mpl_connect('draw_event', self._on_draw_event)
+
+    def _overlay_artists(self) -> List[Any]:
+        """Artistes dessinés par-dessus le fond statique : surbrillance et simulation."""
+        return [artist for artist in (self.sim_collection, self.highlight_collection, self.sim_head_line,
+                                      self.sim_marker) if artist is not None]
+
+    def _on_draw_event(self, event):
+        # Appelé à la fin de chaque rendu complet : les artistes animés en sont exclus
+        self._background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self._sim_layer = None
+        self._draw_overlay()
+
+    def _draw_overlay(self):
+        """Dessine les artistes animés sur le fond en cache (sans blit)."""
+        canvas = self.figure.canvas
+        if self.sim_collection is None:
+            canvas.restore_region(self._background)
+        else:
+            # Les coupes terminées s'accumulent dans _sim_layer : en lecture, une trame ne dessine
+            # que celles terminées depuis la trame précédente ; un retour en arrière repart du fond
+            done = self._sim_done_items
+            if self._sim_layer is None or done < self._sim_layer_items:
+                canvas.restore_region(self._background)
+                first = 0
+            else:
+                canvas.restore_region(self._sim_layer)
+                first = self._sim_layer_items
+            if self._sim_layer is None or done > first:
+                self.sim_collection.item_range = (first, done)
+                self.figure.draw_artist(self.sim_collection)
+                self._sim_layer = canvas.copy_from_bbox(self.figure.bbox)
+                self._sim_layer_items = done
+        for artist in (self.highlight_collection, self.sim_head_line, self.sim_marker):
+            if artist is not None:
+                self.figure.draw_artist(artist)
+
+    def _blit_overlay(self) -> bool:
+        """Redessine la surbrillance et la simulation sur le fond en cache ; False si aucun fond valide."""
+        if not self.use_blit or self._background is None or self._pan_region is not None:
+            return False
+        self._draw_overlay()
+        self.figure.canvas.blit(self.figure.bbox)
+        return True
+
+    def show_simulation(self, timeline):
+        """
+        Affiche la simulation d'un ToolpathTimeline (calculé sur les segments de
+        draw_gcode_path) : un marqueur d'outil et le tracé déjà coupé, positionnés ensuite
+        par update_simulation. Les artistes sont créés ici une fois pour toutes.
+        """
+        if self.cut_collection is None:
+            return
+        self.hide_simulation()
+        self.simulation = timeline
+        self.sim_collection = LodLineCollection(self.cut_paths, shared=self.cut_collection,
+                                                colors=SIMULATION_CUT_COLOR, linewidths=CUT_LINEWIDTH + 1,
+                                                animated=self.use_blit)
+        self.sim_collection.item_range = (0, 0)
+        self.ax.add_collection(self.sim_collection, autolim=False)
+        self.sim_head_line, = self.ax.plot([], [], color=SIMULATION_CUT_COLOR, linewidth=CUT_LINEWIDTH + 1,
+                                           animated=self.use_blit)
+        self.sim_marker, = self.ax.plot([], [], marker='o', markersize=9, markerfacecolor='yellow',
+                                        markeredgecolor='black', linestyle='none', animated=self.use_blit)
+        self._sim_done_items = 0
+        self._sim_layer = None
+        self.update_simulation(0.0)
+
+    def update_simulation(self, time_s: float) -> Optional[str]:
+        """
+        Place l'outil à l'instant time_s ; retourne l'original_id du segment en cours.
+        Le coût d'une trame ne dépend que des coupes terminées depuis la trame précédente.
+        """
+        timeline = self.simulation
+        if timeline is None:
+            return None
+        index, (x, y) = timeline.locate(time_s)
+        segment_index = timeline.segment_index_at_vertex(index)
+        if segment_index < 0:
+            return None
+        self._sim_done_items = int(timeline.segment_cut_item[segment_index])
+        if timeline.segment_is_rapid[segment_index]:
+            self.sim_head_line.set_data([], [])
+        else:
+            head = timeline.vertices[timeline.segment_first_vertex[segment_index]:index + 1]
+            self.sim_head_line.set_data(np.append(head[:, 0], x), np.append(head[:, 1], y))
+        self.sim_marker.set_data([x], [y])
+        if self._pan_region is not None:
+            self.sim_collection.item_range = (0, self._sim_done_items) # Affiché au rendu de end_pan
+        elif not self._blit_overlay():
+            self.sim_collection.item_range = (0, self._sim_done_items)
+            self.request_redraw()
+        return timeline.segment_ids[segment_index]
+
+    def hide_simulation(self):
+        if self.simulation is None:
+            return
+        for artist in (self.sim_collection, self.sim_head_line, self.sim_marker):
+            if artist is not None and artist.axes is not None:
+                artist.remove()
+        self._reset_simulation()
+        self.request_redraw()
+
+    def _reset_simulation(self):
+        self.simulation = None
+        self.sim_collection = self.sim_head_line = self.sim_marker = None
+        self._sim_done_items = 0
+        self._sim_layer = None
+        self._sim_layer_items = 0
+
+    def begin_pan(self):
+        """Mémorise l'image affichée pour la déplacer pendant le pan (mode blitting)."""
+        if self.use_blit and self._background is not None:
+            self._pan_region = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+
+    def pan_preview(self, dx_pixels: float, dy_pixels: float) -> bool:
+        """
+        Affiche l'image mémorisée par begin_pan décalée de (dx, dy) pixels (y vers le haut),
+        sans rendu des trajectoires. Retourne False si le blitting n'est pas disponible.
+        """
+        if self._pan_region is None:
+            return False
+        canvas = self.figure.canvas
+        x1, y1, _, _ = self._pan_region.get_extents()
+        self.figure.draw_artist(self.figure.patch) # Efface les zones découvertes
+        canvas.restore_region(self._pan_region, xy=(x1 + int(round(dx_pixels)), y1 - int(round(dy_pixels))))
+        canvas.blit(self.figure.bbox)
+        return True
+
+    def end_pan(self, redraw: bool = True):
+        """
+        Termine un pan : un rendu complet aux nouvelles limites remplace l'image décalée.
+        redraw=False si la vue n'a pas bougé (simple clic).
+        """
+        if self._pan_region is None:
+            return
+        self._pan_region = None
+        if redraw:
+            self.request_redraw()
+
+    def _configure_plot(self):
+        """Configure l'aspect du graphique pour un affichage épuré avec axes XY minimalistes."""
+        self.ax.set_aspect('equal', adjustable='datalim')
+        self.ax.axis('off')  # Supprime axes, ticks, cadre, etc.
+        self.ax.grid(False)
+        self.ax.set_title("")
+        self.ax.legend_ = None
+
+        # Supprime tout ce qui reste
+        self.ax.xaxis.set_visible(False)
+        self.ax.yaxis.set_visible(False)
+        self.ax.set_xticks([])
+        self.ax.set_yticks([])
+
+        # Ajoute deux flèches pour X et Y depuis l'origine
+        arrow_len = 10  # Ajuste la longueur selon ton échelle
+        self.ax.annotate('', xy=(arrow_len, 0), xytext=(0, 0),
+                         arrowprops=dict(facecolor='black', width=1.5, headwidth=8))
+        self.ax.annotate('', xy=(0, arrow_len), xytext=(0, 0),
+                         arrowprops=dict(facecolor='black', width=1.5, headwidth=8))
+        # Labels X et Y
+        self.ax.text(arrow_len + 1, 0, "X", fontsize=10, va='center', ha='left')
+        self.ax.text(0, arrow_len + 1, "Y", fontsize=10, va='bottom', ha='center')
+
+   
+    @property
+    def cut_indices(self) -> Dict[str, List[int]]:
+        """Map: original_id -> [index dans cut_collection, ...], reconstruite à la demande après un dessin."""
+        if self._cut_indices is None:
+            cut_indices: Dict[str, List[int]] = {}
+            for index, original_id in enumerate(self.cut_ids):
+                cut_indices.setdefault(original_id, []).append(index)
+            self._cut_indices = cut_indices
+        return self._cut_indices
+
+    def draw_gcode_path(self, segments: List[Dict]):
+        """
+        Dessine le chemin G-code sur le graphique Matplotlib.
+        segments: Liste de dictionnaires, chacun décrivant un segment (ligne, arc, cercle).
+                Chaque dict doit contenir 'type', 'coords', 'color', 'original_id'.
+                Les segments dont l'original_id commence par "JUMP_TO_" sont des déplacements G0.
+        """
+        self.update_gcode_path([PathGroup(None, None, segments)])
+
+    @staticmethod
+    def _tessellate_segments(segments: List[Dict], rgba_cache: Dict[Any, Tuple[float, float, float, float]]):
+        """Sommets, couleurs, paramètres d'arc, ids et segments des coupes, puis sommets des déplacements G0."""
+        cut_points, cut_rgba, cut_arcs, cut_ids, cut_segments, jump_points = [], [], [], [], [], []
+        for segment in segments:
+            try:
+                arc = arc_parameters(segment)
+                points = tessellate_segment(segment) if arc is None else arc_points(arc[:2], *arc[2:])
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Segment ignoré ({e}) : {segment}")
+                continue
+            if points is None:
+                logging.warning(f"Type de segment inconnu: {segment.get('type')}")
+                continue
+
+            original_id = segment.get('original_id', 'unknown')
+            if str(original_id).startswith("JUMP_TO_"): # G0
+                jump_points.append(points)
+                continue
+            color = segment.get('color', 'blue')
+            rgba = rgba_cache.get(color)
+            if rgba is None:
+                rgba = rgba_cache[color] = to_rgba(color)
+            cut_ids.append(original_id)
+            cut_segments.append(segment)
+            cut_points.append(points)
+            cut_rgba.append(rgba)
+            cut_arcs.append(arc or (0.0, 0.0, 0.0, 0.0, 0.0))
+        return cut_points, cut_rgba, cut_arcs, cut_ids, cut_segments, jump_points
+
+    def _entry_jump(self, segment: Dict, cache: Dict[int, Tuple[Dict, np.ndarray]]) -> np.ndarray:
+        """Sommets d'un déplacement G0 d'entrée, repris du dessin précédent pour le même segment."""
+        cached = self._entry_jump_points.get(id(segment))
+        points = cached[1] if cached is not None and cached[0] is segment else tessellate_segment(segment)
+        cache[id(segment)] = (segment, points)
+        return points
+
+    def update_gcode_path(self, groups: List[PathGroup], changed_keys: Optional[Iterable[Hashable]] = None):
+        """
+        Dessine des segments groupés par trajectoire (voir toolpath_segments.build_path_groups).
+
+        changed_keys=None : dessin complet (axes vidés, vue recadrée sur le dessin).
+        Sinon, mise à jour sans ax.clear() ni recadrage : les coupes d'un groupe déjà dessiné
+        et absent de changed_keys sont reprises telles quelles (sommets, couleurs, boîtes
+        englobantes, Path en cache) ; seuls les groupes modifiés ou nouveaux sont tessellés,
+        et les groupes absents disparaissent. La surbrillance et la simulation sont effacées.
+        """
+        incremental = changed_keys is not None and self.cut_collection is not None
+        changed = set(changed_keys or ())
+        previous = self._groups if incremental else {}
+        if incremental:
+            self.hide_simulation()
+        else:
+            self._reset_simulation() # ax.clear() retire aussi les artistes de la simulation
+            self.ax.clear()
+            self._configure_plot()
+            self._entry_jump_points = {}
+        old_bboxes = self.cut_collection.index.bboxes if incremental else None
+        old_arcs = self.cut_collection.arcs if incremental else None
+        old_cache = self.cut_collection._path_cache if incremental else None
+
+        cut_paths, cut_ids, cut_segments, jump_paths = [], [], [], []
+        color_chunks, arc_chunks, bbox_chunks = [], [], []
+        path_cache: List[Any] = []
+        groups_drawn: Dict[Hashable, Tuple[int, int, List[np.ndarray]]] = {}
+        entry_jump_points: Dict[int, Tuple[Dict, np.ndarray]] = {}
+        rgba_cache: Dict[Any, Tuple[float, float, float, float]] = {}
+        reused_count = 0
+
+        run = None # (début, fin) : groupes inchangés consécutifs, copiés en une seule tranche
+
+        def copy_run():
+            first, last = run
+            cut_paths.extend(self.cut_paths[first:last])
+            cut_ids.extend(self.cut_ids[first:last])
+            cut_segments.extend(self.cut_segments[first:last])
+            color_chunks.append(self.cut_colors[first:last])
+            arc_chunks.append(old_arcs[first:last])
+            bbox_chunks.append(old_bboxes[first:last])
+            path_cache.extend(old_cache[first:last])
+
+        position = 0 # Nombre de coupes placées, y compris la tranche en attente
+        for group in groups:
+            if group.entry_jump is not None:
+                jump_paths.append(self._entry_jump(group.entry_jump, entry_jump_points))
+            drawn = previous.get(group.key) if group.key not in changed else None
+            if drawn is not None:
+                # Groupe inchangé : tranche des tableaux du dessin précédent
+                first, last, internal_jumps = drawn
+                if run is not None and run[1] == first:
+                    run = (run[0], last)
+                else:
+                    if run is not None:
+                        copy_run()
+                    run = (first, last)
+                reused_count += last - first
+                count = last - first
+            else:
+                if run is not None:
+                    copy_run()
+                    run = None
+                points, rgba, arcs, ids, segments, internal_jumps = self._tessellate_segments(group.segments,
+                                                                                               rgba_cache)
+                cut_paths.extend(points)
+                cut_ids.extend(ids)
+                cut_segments.extend(segments)
+                color_chunks.append(np.array(rgba, dtype=float).reshape(-1, 4))
+                arc_chunks.append(np.array(arcs, dtype=float).reshape(-1, 5))
+                bbox_chunks.append(vertex_bboxes(points))
+                path_cache.extend([None] * len(points))
+                count = len(points)
+            jump_paths.extend(internal_jumps)
+            groups_drawn[group.key] = (position, position + count, internal_jumps)
+            position += count
+        if run is not None:
+            copy_run()
+
+        self._groups = groups_drawn
+        self._entry_jump_points = entry_jump_points
+        self.cut_ids = cut_ids
+        self.cut_segments = cut_segments
+        self.cut_paths = cut_paths
+        self._cut_indices = None
+        self.cut_colors = np.concatenate(color_chunks) if color_chunks else np.empty((0, 4))
+        cut_arcs = np.concatenate(arc_chunks) if arc_chunks else np.empty((0, 5))
+        cut_bboxes = np.concatenate(bbox_chunks) if bbox_chunks else np.empty((0, 4))
+        self._display_colors = self.cut_colors.copy()
+        self.highlighted_indices = set()
+        if incremental:
+            self.cut_collection.set_items(cut_paths, self._display_colors, cut_arcs, cut_bboxes, path_cache)
+            self.jump_collection.set_items(jump_paths)
+            self.highlight_collection.set_segments([])
+        else:
+            self.jump_collection = LodLineCollection(jump_paths, colors='gray', linestyles='--',
+                                                     linewidths=JUMP_LINEWIDTH)
+            self.cut_collection = LodLineCollection([], linewidths=CUT_LINEWIDTH)
+            self.cut_collection.set_items(cut_paths, self._display_colors, cut_arcs, cut_bboxes, path_cache)
+            self.highlight_collection = LineCollection([], colors=HIGHLIGHT_COLOR, linewidths=HIGHLIGHT_LINEWIDTH,
+                                                       animated=self.use_blit)
+            # Les collections LOD n'ont pas de Path avant leur premier rendu : les limites de
+            # données sont déclarées à partir de leurs boîtes englobantes
+            self.ax.add_collection(self.jump_collection, autolim=False)
+            self.ax.add_collection(self.cut_collection, autolim=False)
+            self.ax.add_collection(self.highlight_collection, autolim=False)
+
+        self.vertex_count = sum(map(len, cut_paths)) + sum(map(len, jump_paths))
+        bboxes = np.vstack((cut_bboxes, self.jump_collection.index.bboxes))
+        if len(bboxes):
+            min_x, min_y = bboxes[:, :2].min(axis=0)
+            max_x, max_y = bboxes[:, 2:].max(axis=0)
+            self.ax.ignore_existing_data_limits = True
+            self.ax.update_datalim([(min_x, min_y), (max_x, max_y)])
+            if not incremental:
+                padding = max((max_x - min_x) * 0.1, (max_y - min_y) * 0.1, 10)
+                self.ax.set_xlim(min_x - padding, max_x + padding)
+                self.ax.set_ylim(min_y - padding, max_y + padding)
+                self.ax.set_aspect('equal')
+        elif not incremental:
+            self.ax.set_xlim(-100, 100)
+            self.ax.set_ylim(-100, 100)
+
+        self.request_redraw()
+        if incremental:
+            logging.info(f"Mise à jour de {len(changed)} groupes : {len(cut_paths) - reused_count} coupes "
+                         f"tessellées, {reused_count} reprises ({self.vertex_count} sommets).")
+        else:
+            segment_count = sum(len(group.segments) + (group.entry_jump is not None) for group in groups)
+            logging.info(f"Dessin de {segment_count} segments ({self.vertex_count} sommets) sur le visualiseur.")
+
+
+    def pick(self, x: float, y: float, tolerance: float) -> Optional[int]:
+        """
+        Index (dans cut_ids / cut_segments) de la coupe la plus proche du point (x, y),
+        en unités du dessin, si elle est à moins de tolerance ; None sinon. Les candidats
+        viennent de l'index spatial, la distance exacte n'est calculée que pour eux.
+        """
+        if self.cut_collection is None:
+            return None
+        candidates = self.cut_collection.index.query(x - tolerance, y - tolerance, x + tolerance, y + tolerance)
+        best_index, best_distance = None, tolerance
+        for index in candidates.tolist():
+            distance = segment_distance(self.cut_segments[index], x, y)
+            if distance <= best_distance:
+                best_index, best_distance = index, distance
+        return best_index
+
+    def highlight_dxf_entities_by_ids(self, selected_dxf_ids: List[str]):
+        """
+        Met en surbrillance les entités DXF spécifiées par leurs IDs.
+        selected_dxf_ids: Liste des original_id des entités à mettre en surbrillance.
+        Seuls les index qui changent d'état depuis la sélection précédente sont modifiés.
+        """
+        if self.cut_collection is None:
+            return
+        logging.debug(f"Mise en surbrillance de {len(selected_dxf_ids)} IDs DXF")
+
+        selected = {index for dxf_id in selected_dxf_ids for index in self.cut_indices.get(dxf_id, ())}
+        released = list(self.highlighted_indices - selected)
+        added = list(selected - self.highlighted_indices)
+        if not released and not added:
+            return
+        self.highlighted_indices = selected
+
+        self.highlight_collection.set_segments([self.cut_paths[index] for index in sorted(selected)])
+        if self.use_blit:
+            # Le fond en cache doit rester celui des couleurs d'origine : seule la collection
+            # superposée porte la surbrillance
+            if not self._blit_overlay():
+                self.request_redraw()
+            return
+
+        if released:
+            self._display_colors[released] = self.cut_colors[released]
+        if added:
+            self._display_colors[added] = to_rgba(HIGHLIGHT_COLOR)
+        self.cut_collection.refresh_colors()
+        self.request_redraw()
@@ -0,0 +1,189 @@
+"""
+Vue texte virtualisée du programme G-code.
+
+Le tk.Text ne contient que la partie visible du programme et une marge de
+WINDOW_MARGIN lignes de part et d'autre ; les lignes sont lues dans la liste du
+programme à la demande. La barre de défilement est rapportée au programme entier
+(position -> index de ligne), et le défilement natif du tk.Text (molette, clavier,
+sélection à la souris) rematérialise la fenêtre quand il en atteint un bord.
+Un programme d'un million de lignes s'ouvre ainsi aussi vite qu'un petit.
+
+La sélection affichée (lignes des entités sélectionnées) est gardée en plages de
+lignes consécutives, mises à jour ligne à ligne quand la sélection change ; seules
+celles qui recoupent la fenêtre sont marquées, d'un tag par plage.
+"""
+import bisect
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+
+class VirtualGcodeText(tk.Frame):
+    WINDOW_MARGIN = 200 # Lignes matérialisées au-dessus et au-dessous de la partie visible
+    SELECTION_TAG = "dxf_selection" # Lignes des entités sélectionnées (visible sans le focus, contrairement à SEL)
+
+    def __init__(self, master, **text_options):
+        super().__init__(master)
+        self.text = tk.Text(self, wrap="none", state="disabled", **text_options)
+        self.v_scroll = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        h_scroll = ttk.Scrollbar(self, orient="horizontal", command=self.text.xview)
+        self.text.configure(yscrollcommand=self._on_text_scrolled, xscrollcommand=h_scroll.set)
+        self.v_scroll.pack(side="right", fill="y")
+        h_scroll.pack(side="bottom", fill="x")
+        self.text.pack(side="left", fill="both", expand=True)
+        self.text.tag_configure(self.SELECTION_TAG, background=self.text.cget("selectbackground"),
+                                foreground=self.text.cget("selectforeground"))
+        self.text.bind("<Configure>", lambda event: self.show_line(self.top))
+
+        self.lines: Sequence[str] = []
+        self.top = 0 # Première ligne (index dans lines) en haut de la vue
+        self.window_start = self.window_stop = 0 # Lignes [début, fin[ présentes dans le tk.Text
+        self.selection_spans: List[Tuple[int, int]] = [] # Plages [début, fin[ triées et disjointes
+        self._span_starts: List[int] = []
+        self._line_height = max(tkfont.Font(font=self.text.cget("font")).metrics("linespace"), 1)
+        self._materialize_pending = False
+
+    def set_lines(self, lines: Sequence[str]):
+        """Affiche un nouveau programme en gardant, si possible, la position de défilement. Efface la sélection."""
+        self.lines = lines
+        self.selection_spans, self._span_starts = [], []
+        self.text.tag_remove(tk.SEL, "1.0", tk.END)
+        self._materialize(self._clamp_top(self.top))
+
+    def visible_rows(self) -> int:
+        height = self.text.winfo_height()
+        return max(height // self._line_height, 1) if height > 1 else int(self.text.cget("height"))
+
+    def _clamp_top(self, top: int) -> int:
+        return min(max(top, 0), max(len(self.lines) - self.visible_rows(), 0))
+
+    def show_line(self, top: int):
+        """Fait défiler la vue pour que la ligne top soit en haut."""
+        self.top = top = self._clamp_top(top)
+        if self.window_start <= top and min(top + self.visible_rows(), len(self.lines)) <= self.window_stop:
+            self.text.yview(f"{top - self.window_start + 1}.0")
+        else:
+            self._materialize(top)
+
+    def see(self, line_index: int):
+        """Rend la ligne visible ; si elle ne l'est pas déjà, elle est placée au tiers de la vue."""
+        rows = self.visible_rows()
+        if not self.top <= line_index < self.top + rows:
+            self.show_line(line_index - rows // 3)
+
+    def yview(self, *args):
+        """Commande de la barre de défilement, rapportée au programme entier."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.show_line(int(float(args[1]) * len(self.lines)))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.show_line(self.top + int(args[1]) * step)
+
+    def _materialize(self, top: int):
+        """Remplace le contenu du tk.Text par les lignes autour de top (sélections comprises)."""
+        self._materialize_pending = False
+        user_selection = self.selected_line_range()
+        start = max(top - self.WINDOW_MARGIN, 0)
+        stop = min(top + self.visible_rows() + self.WINDOW_MARGIN, len(self.lines))
+        self.text.configure(state="normal")
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", "\n".join(self.lines[start:stop]))
+        self.text.configure(state="disabled")
+        self.window_start, self.window_stop = start, stop
+        self._tag_spans(self.SELECTION_TAG, self.selection_spans)
+        if user_selection is not None:
+            self._tag_spans(tk.SEL, [(user_selection[0], user_selection[1] + 1)])
+        self.top = top
+        self.text.yview(f"{top - start + 1}.0")
+
+    def _on_text_scrolled(self, first: str, last: str):
+        """yscrollcommand du tk.Text : suit son défilement natif et rematérialise aux bords de la fenêtre."""
+        total = len(self.lines)
+        count = self.window_stop - self.window_start
+        if not total or not count:
+            self.v_scroll.set(0.0, 1.0)
+            return
+        first_line = self.window_start + float(first) * count
+        last_line = self.window_start + float(last) * count
+        self.top = int(round(first_line))
+        self.v_scroll.set(first_line / total, last_line / total)
+        at_start = float(first) <= 0.0 and self.window_start > 0
+        at_end = float(last) >= 1.0 and self.window_stop < total
+        if (at_start or at_end) and not self._materialize_pending:
+            # Différé : le tk.Text ne doit pas être modifié pendant son propre défilement
+            self._materialize_pending = True
+            self.after_idle(lambda: self._materialize(self._clamp_top(self.top)) if self._materialize_pending else None)
+
+    def set_selected_lines(self, line_indices: Iterable[int]):
+        """Sélection affichée : les lignes données, regroupées en plages consécutives."""
+        spans: List[Tuple[int, int]] = []
+        for line_index in sorted(set(line_indices)):
+            if spans and spans[-1][1] == line_index:
+                spans[-1] = (spans[-1][0], line_index + 1)
+            else:
+                spans.append((line_index, line_index + 1))
+        self.selection_spans = spans
+        self._span_starts = [start for start, _ in spans]
+        self.text.tag_remove(tk.SEL, "1.0", tk.END)
+        self._tag_spans(self.SELECTION_TAG, spans)
+
+    def update_selected_lines(self, added: Iterable[int] = (), removed: Iterable[int] = ()):
+        """
+        Ajoute et retire des lignes de la sélection affichée : chaque ligne fusionne ou coupe
+        la plage qui la touche (recherche dichotomique), sans reconstruire les autres plages.
+        """
+        spans, starts = self.selection_spans, self._span_starts
+        for line_index in removed:
+            i = bisect.bisect_right(starts, line_index) - 1
+            if i < 0 or line_index >= spans[i][1]:
+                continue # Ligne non sélectionnée
+            start, stop = spans[i]
+            pieces = [(a, b) for a, b in ((start, line_index), (line_index + 1, stop)) if a < b]
+            spans[i:i + 1] = pieces
+            starts[i:i + 1] = [a for a, _ in pieces]
+        for line_index in added:
+            i = bisect.bisect_right(starts, line_index) - 1
+            if i >= 0 and line_index < spans[i][1]:
+                continue # Déjà sélectionnée
+            joins_previous = i >= 0 and spans[i][1] == line_index
+            joins_next = i + 1 < len(spans) and spans[i + 1][0] == line_index + 1
+            if joins_previous and joins_next:
+                spans[i:i + 2] = [(spans[i][0], spans[i + 1][1])]
+                del starts[i + 1]
+            elif joins_previous:
+                spans[i] = (spans[i][0], line_index + 1)
+            elif joins_next:
+                spans[i + 1] = (line_index, spans[i + 1][1])
+                starts[i + 1] = line_index
+            else:
+                spans.insert(i + 1, (line_index, line_index + 1))
+                starts.insert(i + 1, line_index)
+        self.text.tag_remove(tk.SEL, "1.0", tk.END)
+        self._tag_spans(self.SELECTION_TAG, spans)
+
+    def _tag_spans(self, tag: str, spans: List[Tuple[int, int]]):
+        """Marque les plages [début, fin[ (index de ligne du programme) qui recoupent la fenêtre."""
+        self.text.tag_remove(tag, "1.0", tk.END)
+        if not spans or self.window_stop <= self.window_start:
+            return
+        starts = self._span_starts if spans is self.selection_spans else [start for start, _ in spans]
+        first = max(bisect.bisect_right(starts, self.window_start) - 1, 0)
+        for start, stop in spans[first:]:
+            if start >= self.window_stop:
+                break
+            start, stop = max(start, self.window_start), min(stop, self.window_stop)
+            if start < stop:
+                self.text.tag_add(tag, f"{start - self.window_start + 1}.0", f"{stop - self.window_start}.end")
+
+    def selected_line_range(self) -> Optional[Tuple[int, int]]:
+        """Première et dernière lignes (index dans lines) de la sélection faite à la souris, None sans sélection."""
+        try:
+            first = self.text.index(tk.SEL_FIRST)
+            last = self.text.index(tk.SEL_LAST)
+        except tk.TclError:
+            return None
+        return (self.window_start + int(first.split('.')[0]) - 1,
+                self.window_start + int(last.split('.')[0]) - 1)
@@ -1,29 +1,105 @@
 import tkinter as tk
 from tkinter import Canvas
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-from matplotlib.lines import Line2D
+from matplotlib.figure import Figure
 import logging
 import math # Import math module for fmod
-from typing import List, Dict, Tuple, Any
-from matplotlib.colors import to_rgba 
+import time
+from typing import List, Dict, Tuple, Any, Callable, Hashable, Iterable, Optional
+from gcode_renderer import GcodeRenderer
+from instrumentation import TkLoopSampler
+from toolpath_segments import PathGroup
+from toolpath_simulation import ToolpathTimeline
 
 logging.basicConfig(level=logging.INFO, format='[GCODE_VIS] %(message)s')
 
+
+class RedrawScheduler:
+    """
+    Regroupe les demandes de rendu et en exécute au plus une par intervalle de trame
+    (Tk after). Les évènements souris modifient la vue immédiatement (limites des axes,
+    opération peu coûteuse) ; seul le dernier état est rendu, les états intermédiaires
+    sont abandonnés.
+
+    request() demande un rendu complet ; request(frame) une trame légère (par ex. le
+    décalage de l'image pendant un pan), qui ne remplace jamais un rendu complet en
+    attente. Si frame retourne False, un rendu complet est fait à la place.
+    """
+    def __init__(self, tk_widget, render: Callable[[], None], max_fps: float = 60.0):
+        self.tk_widget = tk_widget
+        self._render = render
+        self.max_fps = max_fps
+        self.interval_ms = max(1, int(round(1000.0 / max_fps)))
+        self._after_id = None
+        self._pending_full = False
+        self._pending_frame: Optional[Callable[[], Any]] = None
+        self._last_frame_time = 0.0
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.events_received = 0 # Demandes reçues
+        self.frames_rendered = 0 # Trames effectivement rendues (complètes ou légères)
+        self.frames_dropped = 0 # Demandes remplacées par une plus récente avant leur rendu
+
+    def request(self, frame: Optional[Callable[[], Any]] = None):
+        self.events_received += 1
+        if self._pending_full or self._pending_frame is not None:
+            self.frames_dropped += 1
+        if frame is None:
+            self._pending_full = True
+            self._pending_frame = None
+        elif not self._pending_full:
+            self._pending_frame = frame
+        if self._after_id is None:
+            elapsed_ms = (time.perf_counter() - self._last_frame_time) * 1000.0
+            delay_ms = max(0, int(self.interval_ms - elapsed_ms))
+            self._after_id = self.tk_widget.after(delay_ms, self._flush)
+
+    def _flush(self):
+        self._after_id = None
+        full, frame = self._pending_full, self._pending_frame
+        self._pending_full, self._pending_frame = False, None
+        if frame is not None:
+            if frame() is False:
+                self._render()
+        elif full:
+            self._render()
+        else:
+            return
+        self.frames_rendered += 1
+        self._last_frame_time = time.perf_counter()
+
+    def flush(self):
+        """Rend immédiatement la trame en attente, s'il y en a une."""
+        if self._after_id is not None:
+            self.tk_widget.after_cancel(self._after_id)
+            self._flush()
+
+    def summary(self) -> str:
+        return (f"Rendus : {self.frames_rendered} trames pour {self.events_received} demandes "
+                f"({self.frames_dropped} états intermédiaires abandonnés, max {self.max_fps:g} i/s)")
+
+
 class GcodeVisualizer(tk.Frame):
-    def __init__(self, master):
+    CLICK_MAX_MOVE_PX = 3 # Au-delà, un glissement bouton enfoncé est un pan et non un clic
+    PICK_TOLERANCE_PX = 5 # Distance maximale curseur / segment pour la sélection à la souris
+    HOVER_DELAY_MS = 80 # Intervalle minimal entre deux recherches de l'info-bulle
+    SIMULATION_SPEEDS = ("x1", "x10", "x100", "x1000") # Facteurs de vitesse de la simulation
+
+    def __init__(self, master, max_fps: float = 60.0):
         super().__init__(master)
-        self.figure, self.ax = plt.subplots(figsize=(8, 6))
+        self.figure = Figure(figsize=(8, 6))
         self.canvas = FigureCanvasTkAgg(self.figure, master=self)
         self.canvas_widget = self.canvas.get_tk_widget()
         self.canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+        self._build_simulation_bar()
 
-        self._configure_plot()
-
-        self.path_artists: Dict[str, List[Any]] = {} # Map: original_id -> list of matplotlib artists (Line2D or patches)
-        # Store original colors for highlighting
-        self.original_artist_colors: Dict[Any, Dict[str, Any]] = {} # artist -> {'facecolor': ..., 'edgecolor': ..., 'linecolor': ...}
+        # Tous les rendus passent par le planificateur : au plus un par trame (max_fps)
+        self.redraw_scheduler = RedrawScheduler(self, self.canvas.draw, max_fps)
+        # Le dessin lui-même est délégué à un GcodeRenderer (utilisable aussi sans affichage)
+        self.renderer = GcodeRenderer(self.figure, request_redraw=self.redraw_scheduler.request)
+        self.renderer.enable_blitting() # Sélection et pan sans rendu complet du chemin
+        self.ax = self.renderer.ax
 
         # Connect event for mouse scroll (zoom)
         self.canvas.mpl_connect("scroll_event", self._on_scroll)
@@ -31,40 +107,75 @@ class GcodeVisualizer(tk.Frame):
         self.canvas.mpl_connect('button_press_event', self._on_button_press)
         self.canvas.mpl_connect('button_release_event', self._on_button_release)
         self.canvas.mpl_connect('motion_notify_event', self._on_motion)
-        self.canvas.mpl_connect("scroll_event", self._on_scroll)
-        
-        self._pan_start = None
+
+        self._pan_start = None # Position du clic en pixels
+        self._pan_moved = False
+        self._pan_transform = None
         self._xlim_at_press = None
         self._ylim_at_press = None
+        self.loop_sampler = None # Échantillonnage de la boucle Tk pendant pan/zoom (profilage)
+
+        # Sélection à la souris : on_entity_clicked(original_id ou None, ajout) est appelé sur un clic
+        self.on_entity_clicked: Optional[Callable[[Optional[str], bool], None]] = None
+        self.hover_label = tk.Label(self, bg="#FFFFE0", relief="solid", borderwidth=1)
+        self._hover_event = None
+        self._hover_after_id = None
+        self.canvas_widget.bind("<Leave>", lambda event: self._hide_hover())
+
+        # Simulation d'usinage : la chronologie est calculée à l'activation, la lecture
+        # avance le temps d'une trame à l'autre (after) sans recréer d'artistes
+        self.path_groups: List[PathGroup] = [] # Derniers segments dessinés, par groupe
+        self.timeline: Optional[ToolpathTimeline] = None
+        self.sim_time = 0.0
+        self._sim_playing = False
+        self._sim_after_id = None
+        self._sim_last_tick = 0.0
+
+    def _build_simulation_bar(self):
+        bar = tk.Frame(self)
+        bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.sim_enabled_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(bar, text="Simulation", variable=self.sim_enabled_var,
+                       command=self._on_simulation_toggled).pack(side=tk.LEFT)
+        self.sim_play_button = tk.Button(bar, text="Lecture", width=7, state=tk.DISABLED,
+                                         command=self.toggle_simulation_playback)
+        self.sim_play_button.pack(side=tk.LEFT)
+        self.sim_speed_var = tk.StringVar(value=self.SIMULATION_SPEEDS[1])
+        tk.OptionMenu(bar, self.sim_speed_var, *self.SIMULATION_SPEEDS).pack(side=tk.LEFT)
+        self.sim_scale = tk.Scale(bar, from_=0.0, to=1.0, resolution=0.001, orient=tk.HORIZONTAL,
+                                  showvalue=False, state=tk.DISABLED, command=self._on_simulation_scrub)
+        self.sim_scale.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.sim_status_label = tk.Label(bar, text="", width=36, anchor="w")
+        self.sim_status_label.pack(side=tk.LEFT)
+
+    @property
+    def cut_count(self) -> int:
+        return len(self.renderer.cut_ids)
+
+    def flush_redraw(self):
+        """Rend immédiatement la trame en attente du planificateur."""
+        self.redraw_scheduler.flush()
+
+    def start_loop_sampling(self, interval_ms: int = 10):
+        """Démarre l'échantillonnage du retard de la boucle Tk (voir TkLoopSampler)."""
+        self.loop_sampler = TkLoopSampler(self, interval_ms)
+        self.loop_sampler.start()
+        self.redraw_scheduler.reset_counters()
+
+    def stop_loop_sampling(self) -> str:
+        """Arrête l'échantillonnage et retourne son résumé (chaîne vide s'il n'était pas actif)."""
+        if self.loop_sampler is None:
+            return ""
+        self.loop_sampler.stop()
+        summary = f"{self.loop_sampler.summary()}\n{self.redraw_scheduler.summary()}"
+        self.loop_sampler = None
+        return summary
 
-    def _configure_plot(self):
-        """Configure l'aspect du graphique pour un affichage épuré avec axes XY minimalistes."""
-        self.ax.set_aspect('equal', adjustable='datalim')
-        self.ax.axis('off')  # Supprime axes, ticks, cadre, etc.
-        self.ax.grid(False)
-        self.ax.set_title("")
-        self.ax.legend_ = None
-
-        # Supprime tout ce qui reste
-        self.ax.xaxis.set_visible(False)
-        self.ax.yaxis.set_visible(False)
-        self.ax.set_xticks([])
-        self.ax.set_yticks([])
-
-        # Ajoute deux flèches pour X et Y depuis l'origine
-        arrow_len = 10  # Ajuste la longueur selon ton échelle
-        self.ax.annotate('', xy=(arrow_len, 0), xytext=(0, 0),
-                         arrowprops=dict(facecolor='black', width=1.5, headwidth=8))
-        self.ax.annotate('', xy=(0, arrow_len), xytext=(0, 0),
-                         arrowprops=dict(facecolor='black', width=1.5, headwidth=8))
-        # Labels X et Y
-        self.ax.text(arrow_len + 1, 0, "X", fontsize=10, va='center', ha='left')
-        self.ax.text(0, arrow_len + 1, "Y", fontsize=10, va='bottom', ha='center')
-
-   
     def _on_scroll(self, event):
         if event.xdata is None or event.ydata is None:
             return  # souris en dehors du graphe
+        if self.loop_sampler is not None:
+            self.loop_sampler.mark_interaction()
 
         base_scale = 1.2  # facteur de zoom (zoom in/out)
         scale = base_scale if event.step < 0 else 1 / base_scale
@@ -85,179 +196,199 @@ class GcodeVisualizer(tk.Frame):
 
         self.ax.set_xlim(new_xlim)
         self.ax.set_ylim(new_ylim)
-        self.canvas.draw_idle()
+        self.renderer.request_redraw()
 
     def _on_button_press(self, event):
         if event.button == 1 and event.xdata is not None and event.ydata is not None:
-            self._pan_start = (event.xdata, event.ydata)
+            # Le pan est calculé en pixels avec la transformation figée au clic : les limites
+            # changent pendant le glissement, les coordonnées données de l'évènement aussi
+            self._pan_start = (event.x, event.y)
+            self._pan_moved = False
+            self._pan_transform = self.ax.transData.inverted().frozen()
             self._xlim_at_press = self.ax.get_xlim()
             self._ylim_at_press = self.ax.get_ylim()
+            self.renderer.begin_pan()
+            if self.loop_sampler is not None:
+                self.loop_sampler.mark_interaction(True)
 
     def _on_button_release(self, event):
         if event.button == 1:
+            if self._pan_start is not None:
+                if self._pan_moved:
+                    self.renderer.end_pan() # Rendu complet aux nouvelles limites
+                else:
+                    self.renderer.end_pan(redraw=False)
+                    self._on_click(event)
             self._pan_start = None
+            if self.loop_sampler is not None:
+                self.loop_sampler.mark_interaction(False)
 
     def _on_motion(self, event):
-        if self._pan_start is None or event.xdata is None or event.ydata is None:
+        if self._pan_start is None:
+            self._schedule_hover(event)
             return
+        if not self._pan_moved:
+            if math.hypot(event.x - self._pan_start[0], event.y - self._pan_start[1]) < self.CLICK_MAX_MOVE_PX:
+                return
+            self._pan_moved = True
+            self._hide_hover()
 
-        dx = event.xdata - self._pan_start[0]
-        dy = event.ydata - self._pan_start[1]
+        x0, y0 = self._pan_transform.transform(self._pan_start)
+        x1, y1 = self._pan_transform.transform((event.x, event.y))
+        dx, dy = x1 - x0, y1 - y0
 
         new_xlim = (self._xlim_at_press[0] - dx, self._xlim_at_press[1] - dx)
         new_ylim = (self._ylim_at_press[0] - dy, self._ylim_at_press[1] - dy)
 
         self.ax.set_xlim(new_xlim)
         self.ax.set_ylim(new_ylim)
-        self.canvas.draw_idle()
+        # En mode blitting, l'image en cache est simplement décalée jusqu'au relâchement
+        offset = (event.x - self._pan_start[0], event.y - self._pan_start[1])
+        self.redraw_scheduler.request(lambda: self.renderer.pan_preview(*offset))
+
+    def _pick_at(self, event) -> Optional[int]:
+        """Index de la coupe sous le curseur (voir GcodeRenderer.pick), None hors du graphe."""
+        if event.inaxes is not self.ax or event.xdata is None:
+            return None
+        x_data_per_px = (self.ax.get_xlim()[1] - self.ax.get_xlim()[0]) / max(self.ax.bbox.width, 1)
+        return self.renderer.pick(event.xdata, event.ydata, abs(x_data_per_px) * self.PICK_TOLERANCE_PX)
+
+    def _on_click(self, event):
+        if self.on_entity_clicked is None:
+            return
+        index = self._pick_at(event)
+        modifiers = getattr(event, 'modifiers', None) or () # Touches enfoncées pendant le clic (matplotlib >= 3.6)
+        additive = bool({'ctrl', 'shift'} & set(modifiers)) or (
+            event.key is not None and ('control' in event.key or 'shift' in event.key))
+        self.on_entity_clicked(None if index is None else self.renderer.cut_ids[index], additive)
+
+    def _schedule_hover(self, event):
+        # Limite la fréquence des recherches : seule la dernière position est traitée
+        self._hover_event = event
+        if self._hover_after_id is None:
+            self._hover_after_id = self.after(self.HOVER_DELAY_MS, self._update_hover)
+
+    def _update_hover(self):
+        self._hover_after_id = None
+        event, self._hover_event = self._hover_event, None
+        index = self._pick_at(event) if event is not None else None
+        if index is None:
+            self._hide_hover()
+            return
+        segment = self.renderer.cut_segments[index]
+        self.hover_label.config(text=f"{segment.get('type')} {self.renderer.cut_ids[index]}")
+        # Coordonnées matplotlib (origine en bas) -> coordonnées Tk (origine en haut)
+        self.hover_label.place(x=event.x + 12, y=self.canvas_widget.winfo_height() - event.y + 12)
+
+    def _hide_hover(self):
+        self.hover_label.place_forget()
 
     def draw_gcode_path(self, segments: List[Dict]):
         """
-        Dessine le chemin G-code sur le graphique Matplotlib.
-        segments: Liste de dictionnaires, chacun décrivant un segment (ligne, arc, cercle).
-                Chaque dict doit contenir 'type', 'coords', 'color', 'original_id'.
-                'coords' varie selon le type.
-                Pour les arcs, 'direction_reversed' peut être présent.
+        Dessine le chemin G-code sur le graphique Matplotlib (voir GcodeRenderer.draw_gcode_path).
         """
-        print(f"[INFO] Appel de draw_gcode_path avec {len(segments)} segments.")
-        self.ax.clear()
-        self._configure_plot()
+        self.update_gcode_path([PathGroup(None, None, segments)])
 
-        self.path_artists.clear()
-        self.original_artist_colors.clear()
-
-        all_x = []
-        all_y = []
-
-        for segment in segments:
-            seg_type = segment.get('type')
-            coords = segment.get('coords', {})
-            color = segment.get('color', 'blue')
-            original_id = segment.get('original_id', 'unknown')
-            artist = None
-
-            is_jump = str(original_id).startswith("JUMP_TO_")  # G0?
-
-            try:
-                if seg_type == 'LINE':
-                    x1, y1 = coords['start_point']
-                    x2, y2 = coords['end_point']
-                    linestyle = '--' if is_jump else '-'
-                    linewidth = 1 if is_jump else 2
-                    line_color = 'gray' if is_jump else color
-
-                    print(f"[DEBUG] LINE {x1, y1} → {x2, y2} | jump={is_jump}")
-                    artist = Line2D([x1, x2], [y1, y2], color=line_color, linestyle=linestyle, linewidth=linewidth)
-                    self.ax.add_line(artist)
-                    all_x.extend([x1, x2])
-                    all_y.extend([y1, y2])
-
-                elif seg_type == 'ARC':
-                    center_x, center_y = coords['center']
-                    radius = coords['radius']
-                    start_angle = coords['start_angle'] % 360
-                    end_angle = coords['end_angle'] % 360
-                    direction_reversed = segment.get('direction_reversed', False)
-
-                    if direction_reversed:  # G3
-                        theta1, theta2 = start_angle, end_angle
-                        if theta2 <= theta1:
-                            theta2 += 360
-                    else:  # G2
-                        theta1, theta2 = start_angle, end_angle
-                        if theta2 >= theta1:
-                            theta2 -= 360
-
-                    print(f"[DEBUG] ARC center=({center_x}, {center_y}), r={radius}, θ=({theta1}→{theta2}), reversed={direction_reversed}")
-                    artist = patches.Arc((center_x, center_y), 2 * radius, 2 * radius,
-                                        angle=0, theta1=theta1, theta2=theta2, color=color,
-                                        linewidth=2, fill=False)
-                    self.ax.add_patch(artist)
-                    x1, y1 = coords['start_point']
-                    x2, y2 = coords['end_point']
-                    all_x.extend([x1, x2])
-                    all_y.extend([y1, y2])
-
-                elif seg_type == 'CIRCLE':
-                    center_x, center_y = coords['center']
-                    radius = coords['radius']
-                    print(f"[DEBUG] CIRCLE center=({center_x}, {center_y}), r={radius}")
-                    artist = patches.Circle((center_x, center_y), radius, color=color, fill=False, linewidth=2)
-                    self.ax.add_patch(artist)
-                    all_x.extend([center_x - radius, center_x + radius])
-                    all_y.extend([center_y - radius, center_y + radius])
-
-                else:
-                    print(f"[WARNING] Type de segment inconnu: {seg_type}")
-                    continue
-
-                if artist:
-                    if original_id not in self.path_artists:
-                        self.path_artists[original_id] = []
-                    self.path_artists[original_id].append(artist)
-
-                    if isinstance(artist, Line2D):
-                        self.original_artist_colors[artist] = {'linecolor': artist.get_color()}
-                    elif isinstance(artist, patches.Patch):
-                        self.original_artist_colors[artist] = {
-                            'facecolor': artist.get_facecolor(),
-                            'edgecolor': artist.get_edgecolor()
-                        }
-
-            except Exception as e:
-                print(f"[ERROR] Exception pour {seg_type}: {e} | segment={segment}")
-
-        if all_x and all_y:
-            min_x, max_x = min(all_x), max(all_x)
-            min_y, max_y = min(all_y), max(all_y)
-            padding = max((max_x - min_x) * 0.1, (max_y - min_y) * 0.1, 10)
-            self.ax.set_xlim(min_x - padding, max_x + padding)
-            self.ax.set_ylim(min_y - padding, max_y + padding)
-            self.ax.set_aspect('equal')
+    def update_gcode_path(self, groups: List[PathGroup], changed_keys: Optional[Iterable[Hashable]] = None):
+        """
+        Dessine des segments groupés ; avec changed_keys, seuls ces groupes sont reconstruits
+        (voir GcodeRenderer.update_gcode_path).
+        """
+        self.path_groups = groups
+        self.renderer.update_gcode_path(groups, changed_keys)
+        if self.sim_enabled_var.get():
+            self.start_simulation() # Nouveau chemin : chronologie recalculée, lecture reprise à zéro
+
+    def _on_simulation_toggled(self):
+        if self.sim_enabled_var.get():
+            self.start_simulation()
         else:
-            self.ax.set_xlim(-100, 100)
-            self.ax.set_ylim(-100, 100)
+            self.stop_simulation()
+
+    def start_simulation(self):
+        """Calcule la chronologie des segments dessinés et affiche l'outil au début du programme."""
+        self._pause_simulation()
+        start = time.perf_counter()
+        segments = [segment for group in self.path_groups
+                    for segment in ([group.entry_jump] if group.entry_jump else []) + group.segments]
+        self.timeline = ToolpathTimeline(segments)
+        logging.info(f"Chronologie de simulation : {len(self.timeline.vertices)} sommets, "
+                     f"{self.timeline.total_time:.1f} s, calculée en {(time.perf_counter() - start) * 1000:.0f} ms")
+        self.sim_time = 0.0
+        self.renderer.show_simulation(self.timeline)
+        self.sim_play_button.config(state=tk.NORMAL, text="Lecture")
+        self.sim_scale.config(state=tk.NORMAL)
+        self._update_simulation_view()
+
+    def stop_simulation(self):
+        self._pause_simulation()
+        self.timeline = None
+        self.renderer.hide_simulation()
+        self.sim_play_button.config(state=tk.DISABLED, text="Lecture")
+        self.sim_scale.config(state=tk.DISABLED)
+        self.sim_status_label.config(text="")
+
+    def toggle_simulation_playback(self):
+        if self.timeline is None:
+            return
+        if self._sim_playing:
+            self._pause_simulation()
+            return
+        if self.sim_time >= self.timeline.total_time:
+            self.sim_time = 0.0 # Relecture depuis le début
+        self._sim_playing = True
+        self._sim_last_tick = time.perf_counter()
+        self.sim_play_button.config(text="Pause")
+        self._sim_after_id = self.after(self.redraw_scheduler.interval_ms, self._simulation_tick)
+
+    def _pause_simulation(self):
+        self._sim_playing = False
+        if self._sim_after_id is not None:
+            self.after_cancel(self._sim_after_id)
+            self._sim_after_id = None
+        self.sim_play_button.config(text="Lecture")
+
+    def _simulation_tick(self):
+        self._sim_after_id = None
+        if not self._sim_playing or self.timeline is None:
+            return
+        # Le temps simulé suit le temps réel écoulé : une trame en retard fait avancer l'outil d'autant
+        now = time.perf_counter()
+        speed = float(self.sim_speed_var.get().lstrip("x"))
+        self.sim_time = min(self.sim_time + (now - self._sim_last_tick) * speed, self.timeline.total_time)
+        self._sim_last_tick = now
+        self._update_simulation_view()
+        if self.sim_time >= self.timeline.total_time:
+            self._pause_simulation()
+            return
+        self._sim_after_id = self.after(self.redraw_scheduler.interval_ms, self._simulation_tick)
 
-        self.canvas.draw_idle()
-        logging.info(f"Dessin de {len(segments)} segments sur le visualiseur.")
+    def _simulation_fraction(self) -> float:
+        total = self.timeline.total_time
+        return self.sim_time / total if total > 0 else 0.0
+
+    def _on_simulation_scrub(self, value):
+        if self.timeline is None:
+            return
+        # Tk rappelle aussi cette commande (en différé) après sim_scale.set() : une valeur à la
+        # résolution du curseur près de la position courante n'est pas un déplacement de l'utilisateur
+        if abs(float(value) - self._simulation_fraction()) <= float(self.sim_scale.cget('resolution')):
+            return
+        self.sim_time = float(value) * self.timeline.total_time
+        self._update_simulation_view(update_scale=False)
 
+    def _update_simulation_view(self, update_scale: bool = True):
+        segment_id = self.renderer.update_simulation(self.sim_time)
+        total = self.timeline.total_time
+        if update_scale:
+            self.sim_scale.set(self._simulation_fraction())
+        self.sim_status_label.config(text=f"{self.sim_time:.1f} / {total:.1f} s  {segment_id or ''}")
 
     def highlight_dxf_entities_by_ids(self, selected_dxf_ids: List[str]):
         """
         Met en surbrillance les entités DXF spécifiées par leurs IDs.
-        selected_dxf_ids: Liste des original_id des entités à mettre en surbrillance.
         """
-        highlight_color = 'magenta' # Couleur de surbrillance
-        default_linewidth = 2
-        highlight_linewidth = 4 # Rendre la ligne plus épaisse pour la surbrillance
-
-        logging.info(f"Mise en surbrillance des IDs DXF: {selected_dxf_ids}")
-
-        # D'abord, restaurer la couleur de tous les artistes
-        for artist, colors_dict in self.original_artist_colors.items():
-            if isinstance(artist, Line2D):
-                artist.set_color(colors_dict['linecolor'])
-                artist.set_linewidth(default_linewidth)
-            elif isinstance(artist, patches.Patch): # Covers Circle and Arc
-                artist.set_facecolor(colors_dict['facecolor'])
-                artist.set_edgecolor(colors_dict['edgecolor'])
-                artist.set_linewidth(default_linewidth)
-
-        # Ensuite, appliquer la surbrillance aux artistes sélectionnés
-        for dxf_id in selected_dxf_ids:
-            artists_for_id = self.path_artists.get(dxf_id, [])
-            for artist in artists_for_id:
-                if isinstance(artist, Line2D):
-                    artist.set_color(highlight_color)
-                    artist.set_linewidth(highlight_linewidth)
-                elif isinstance(artist, patches.Patch): # Covers Circle and Arc
-                    # Convertir la couleur de surbrillance en RGBA et ajuster l'alpha
-                    rgba_color = to_rgba(highlight_color)
-                    transparent_highlight_color = (rgba_color[0], rgba_color[1], rgba_color[2], 0.5)
-                    artist.set_facecolor(transparent_highlight_color) # Utiliser la couleur transparente pour le remplissage
-                    artist.set_edgecolor(highlight_color) # Garder la couleur opaque pour les bords
-                    artist.set_linewidth(highlight_linewidth)
-        self.canvas.draw_idle()
+        self.renderer.highlight_dxf_entities_by_ids(selected_dxf_ids)
 
     def _fit_plot_to_content(self):
         """Ajuste les limites du graphique pour occuper ~90% de la surface du widget."""
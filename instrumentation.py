@@ -0,0 +1,265 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class StageRecord:
+    """Mesures d'une étape : temps mur, temps CPU (du thread), nombre d'entités et pic mémoire."""
+    __slots__ = ('name', 'wall_time', 'cpu_time', 'entity_count', 'peak_memory', '_memory_start', '_peak_seen')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.entity_count: Optional[int] = None
+        self.peak_memory: Optional[int] = None # Octets alloués au-delà du début de l'étape
+        self._memory_start = 0
+        self._peak_seen = 0
+
+    def count(self, entity_count: int):
+        self.entity_count = entity_count
+
+    def to_dict(self) -> Dict:
+        return {
+            'stage': self.name,
+            'wall_time_s': round(self.wall_time, 6),
+            'cpu_time_s': round(self.cpu_time, 6),
+            'entities': self.entity_count,
+            'peak_memory_bytes': self.peak_memory,
+        }
+
+
+class StageRecorder:
+    """
+    Instrumentation par étape du pipeline (DxfProcessor) et de l'affichage (AppGUI).
+
+    Utilisation : with recorder.stage("composants") as record: ...; record.count(n)
+    Le temps CPU est celui du thread courant (les étapes tournent dans le thread de
+    chargement ou dans le thread Tk). Le pic mémoire repose sur tracemalloc, démarré
+    à la création de l'enregistreur si track_memory est vrai.
+    """
+    enabled = True
+
+    def __init__(self, track_memory: bool = True):
+        self.records: List[StageRecord] = []
+        self.track_memory = track_memory
+        self._stack: List[StageRecord] = []
+        self._started_tracemalloc = False
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def close(self):
+        """Arrête tracemalloc s'il a été démarré par cet enregistreur."""
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def stage(self, name: str):
+        record = StageRecord(name)
+        if self.track_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack: # Le pic déjà atteint appartient à l'étape englobante
+                self._stack[-1]._peak_seen = max(self._stack[-1]._peak_seen, peak)
+            tracemalloc.reset_peak()
+            record._memory_start = current
+        self._stack.append(record)
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall_time = time.perf_counter() - wall_start
+            record.cpu_time = time.thread_time() - cpu_start
+            self._stack.pop()
+            if self.track_memory and tracemalloc.is_tracing():
+                peak = max(tracemalloc.get_traced_memory()[1], record._peak_seen)
+                record.peak_memory = max(peak - record._memory_start, 0)
+                if self._stack:
+                    self._stack[-1]._peak_seen = max(self._stack[-1]._peak_seen, peak)
+            self.records.append(record)
+            logging.debug(f"[STAGE] {name}: {record.wall_time * 1000:.1f} ms")
+
+    def totals(self) -> Dict[str, Dict]:
+        """Agrège les étapes de même nom (par ex. une étape répétée pour chaque calque)."""
+        totals: Dict[str, Dict] = {}
+        for record in self.records:
+            total = totals.setdefault(record.name, {'calls': 0, 'wall_time_s': 0.0, 'cpu_time_s': 0.0,
+                                                    'entities': None, 'peak_memory_bytes': None})
+            total['calls'] += 1
+            total['wall_time_s'] += record.wall_time
+            total['cpu_time_s'] += record.cpu_time
+            if record.entity_count is not None:
+                total['entities'] = (total['entities'] or 0) + record.entity_count
+            if record.peak_memory is not None:
+                total['peak_memory_bytes'] = max(total['peak_memory_bytes'] or 0, record.peak_memory)
+        return totals
+
+    def summary(self) -> str:
+        """Résumé sur une ligne, pour la barre de statut."""
+        parts = []
+        for name, total in self.totals().items():
+            text = f"{name} {total['wall_time_s'] * 1000:.0f} ms"
+            if total['peak_memory_bytes']:
+                text += f" ({total['peak_memory_bytes'] / 1e6:.1f} Mo)"
+            parts.append(text)
+        return " | ".join(parts)
+
+    def to_dict(self) -> Dict:
+        return {'stages': [record.to_dict() for record in self.records], 'totals': self.totals()}
+
+    def dump_json(self, file_path: str):
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+class _NullStageRecord:
+    __slots__ = ()
+
+    def count(self, entity_count: int):
+        pass
+
+
+class _NullStageContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NULL_STAGE_RECORD
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class NullStageRecorder:
+    """Enregistreur inactif : stage() retourne un contexte partagé qui ne mesure rien."""
+    enabled = False
+    records: List[StageRecord] = []
+
+    def stage(self, name: str):
+        return _NULL_STAGE_CONTEXT
+
+    def close(self):
+        pass
+
+    def summary(self) -> str:
+        return ""
+
+
+_NULL_STAGE_RECORD = _NullStageRecord()
+_NULL_STAGE_CONTEXT = _NullStageContext()
+NULL_RECORDER = NullStageRecorder()
+
+
+class ProfileSession:
+    """
+    Capture cProfile d'un chargement, éventuellement réparti sur plusieurs threads
+    (pipeline dans le thread de chargement, affichage dans le thread Tk) : chaque
+    appel à profile() crée un profileur pour le thread courant, et save() les fusionne.
+    """
+    def __init__(self, output_base: str, top_n: int = 40):
+        self.output_base = output_base
+        self.top_n = top_n
+        self.profilers: List[cProfile.Profile] = []
+
+    @contextmanager
+    def profile(self):
+        profiler = cProfile.Profile()
+        self.profilers.append(profiler)
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+
+    def save(self, extra_text: str = "") -> Optional[str]:
+        """
+        Écrit <output_base>.pstats et un résumé texte <output_base>.txt (top N par temps
+        cumulé puis par temps propre). Retourne le chemin du .pstats, ou None si rien n'a été capturé.
+        """
+        if not self.profilers:
+            return None
+        stats = pstats.Stats(self.profilers[0])
+        for profiler in self.profilers[1:]:
+            stats.add(profiler)
+        stats_path = self.output_base + ".pstats"
+        stats.dump_stats(stats_path)
+
+        stream = io.StringIO()
+        summary = pstats.Stats(stats_path, stream=stream)
+        summary.strip_dirs().sort_stats('cumulative').print_stats(self.top_n)
+        summary.sort_stats('tottime').print_stats(self.top_n)
+        with open(self.output_base + ".txt", 'w') as f:
+            if extra_text:
+                f.write(extra_text + "\n\n")
+            f.write(stream.getvalue())
+        logging.info(f"Profil enregistré : {stats_path}")
+        return stats_path
+
+
+class TkLoopSampler:
+    """
+    Échantillonne la réactivité de la boucle d'événements Tk : un tick est programmé
+    toutes les interval_ms via after(), et son retard est enregistré. Les retards
+    mesurés pendant une interaction (pan/zoom signalés par mark_interaction) sont
+    comptés à part, pour isoler le coût du rendu pendant la navigation.
+    """
+    def __init__(self, tk_widget, interval_ms: int = 10, interaction_timeout_s: float = 0.3):
+        self.tk_widget = tk_widget
+        self.interval_ms = interval_ms
+        self.interaction_timeout_s = interaction_timeout_s
+        self.interaction_lags: List[float] = []
+        self.idle_lags: List[float] = []
+        self._running = False
+        self._expected_at = 0.0
+        self._interaction_until = 0.0
+        self._pan_active = False
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._schedule()
+
+    def stop(self):
+        self._running = False
+
+    def mark_interaction(self, active: Optional[bool] = None):
+        """Signale une interaction : active=True/False encadre un pan, None marque un évènement ponctuel (zoom)."""
+        if active is not None:
+            self._pan_active = active
+        self._interaction_until = time.perf_counter() + self.interaction_timeout_s
+
+    def _schedule(self):
+        self._expected_at = time.perf_counter() + self.interval_ms / 1000.0
+        self.tk_widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        if not self._running:
+            return
+        now = time.perf_counter()
+        lag = max(now - self._expected_at, 0.0)
+        if self._pan_active or now <= self._interaction_until:
+            self.interaction_lags.append(lag)
+        else:
+            self.idle_lags.append(lag)
+        self._schedule()
+
+    @staticmethod
+    def _describe(lags: List[float]) -> str:
+        if not lags:
+            return "aucun échantillon"
+        ordered = sorted(lags)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return (f"{len(lags)} échantillons, retard moyen {sum(lags) / len(lags) * 1000:.1f} ms, "
+                f"p95 {p95 * 1000:.1f} ms, max {ordered[-1] * 1000:.1f} ms")
+
+    def summary(self) -> str:
+        return (f"Boucle Tk (tick {self.interval_ms} ms)\n"
+                f"  pendant pan/zoom : {self._describe(self.interaction_lags)}\n"
+                f"  hors interaction : {self._describe(self.idle_lags)}")
@@ -0,0 +1,128 @@
+"""
+Aperçus PNG/SVG des trajectoires, sans affichage (backend Agg de GcodeRenderer).
+
+Destiné aux traitements par lot : chaque aperçu est rendu à une taille fixe en
+pixels, et render_previews répartit les fichiers sur plusieurs processus.
+
+Exemple :
+    python preview.py pieces/*.dxf --output-dir apercus --size 400x300 --workers 4
+"""
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import dxf_pipeline
+from dxf_processor import ExtractionFilter
+from gcode_renderer import GcodeRenderer, build_path_segments
+
+DEFAULT_SIZE_PX = (400, 300)
+PREVIEW_DPI = 100
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """'400x300' -> (400, 300)."""
+    try:
+        width, height = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Taille invalide : {value} (attendu LARGEURxHAUTEUR)")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"Taille invalide : {value}")
+    return width, height
+
+
+def save_preview(ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict], output_path: str,
+                 size_px: Tuple[int, int] = DEFAULT_SIZE_PX,
+                 connection_tolerance: float = dxf_pipeline.DEFAULT_CONNECTION_TOLERANCE) -> str:
+    """Écrit l'aperçu des trajectoires données ; le format suit l'extension (png, svg, ...)."""
+    width, height = size_px
+    renderer = GcodeRenderer(figsize=(width / PREVIEW_DPI, height / PREVIEW_DPI))
+    renderer.figure.subplots_adjust(left=0, right=1, bottom=0, top=1)
+    renderer.draw_gcode_path(build_path_segments(ordered_trajectories, isolated_circles, connection_tolerance))
+    renderer.figure.savefig(output_path, dpi=PREVIEW_DPI)
+    return output_path
+
+
+def render_preview(dxf_path: str, output_path: Optional[str] = None, size_px: Tuple[int, int] = DEFAULT_SIZE_PX,
+                   entity_filter: Optional[ExtractionFilter] = None, group_by_layer: bool = False,
+                   connection_tolerance: float = dxf_pipeline.DEFAULT_CONNECTION_TOLERANCE) -> Optional[str]:
+    """
+    Calcule les trajectoires d'un DXF (dxf_pipeline, sans état partagé) et écrit leur
+    aperçu. Par défaut, l'aperçu est écrit à côté du DXF (<dxf>.png). Retourne le
+    chemin écrit, ou None si le fichier n'a pas pu être lu.
+    """
+    geometry = dxf_pipeline.extract_geometry(dxf_path, entity_filter)
+    if geometry is None:
+        return None
+    plan = dxf_pipeline.plan_paths(geometry, connection_tolerance, group_by_layer)
+    trajectories = [[dxf_pipeline.oriented_segment(geometry, step) for step in trajectory]
+                    for trajectory in plan.trajectories]
+    circles = [dxf_pipeline.oriented_segment(geometry, step) for step in plan.circles]
+    output_path = output_path or os.path.splitext(dxf_path)[0] + ".png"
+    return save_preview(trajectories, circles, output_path, size_px, connection_tolerance)
+
+
+def render_previews(dxf_paths: Iterable[str], output_dir: Optional[str] = None, image_format: str = "png",
+                    size_px: Tuple[int, int] = DEFAULT_SIZE_PX, max_workers: Optional[int] = None,
+                    **options) -> Dict[str, Optional[str]]:
+    """
+    Rend les aperçus de plusieurs DXF dans des processus séparés. Retourne, pour chaque
+    DXF, le chemin de l'aperçu ou None en cas d'échec (l'erreur est journalisée).
+    """
+    jobs = {}
+    for dxf_path in dxf_paths:
+        base_name = os.path.splitext(os.path.basename(dxf_path))[0] + "." + image_format
+        jobs[dxf_path] = os.path.join(output_dir or os.path.dirname(dxf_path), base_name)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results: Dict[str, Optional[str]] = {}
+    if max_workers == 1 or len(jobs) <= 1:
+        for dxf_path, output_path in jobs.items():
+            try:
+                results[dxf_path] = render_preview(dxf_path, output_path, size_px, **options)
+            except Exception as e:
+                logging.error(f"Aperçu impossible pour {dxf_path} : {e}")
+                results[dxf_path] = None
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {dxf_path: executor.submit(render_preview, dxf_path, output_path, size_px, **options)
+                   for dxf_path, output_path in jobs.items()}
+        for dxf_path, future in futures.items():
+            try:
+                results[dxf_path] = future.result()
+            except Exception as e:
+                logging.error(f"Aperçu impossible pour {dxf_path} : {e}")
+                results[dxf_path] = None
+    return results
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Génère les aperçus PNG/SVG des trajectoires de fichiers DXF.")
+    parser.add_argument("dxf_files", nargs='+', help="Fichiers DXF")
+    parser.add_argument("--output-dir", help="Dossier des aperçus (par défaut : à côté de chaque DXF)")
+    parser.add_argument("--format", choices=("png", "svg"), default="png")
+    parser.add_argument("--size", type=parse_size, default=DEFAULT_SIZE_PX, metavar="LxH",
+                        help="Taille en pixels (défaut : 400x300)")
+    parser.add_argument("--workers", type=int, help="Nombre de processus (défaut : nombre de CPU)")
+    parser.add_argument("--group-by-layer", action="store_true", help="Une série de trajectoires par calque")
+    parser.add_argument("--tolerance", type=float, default=dxf_pipeline.DEFAULT_CONNECTION_TOLERANCE,
+                        help="Tolérance de connexion")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    results = render_previews(args.dxf_files, args.output_dir, args.format, args.size, args.workers,
+                              group_by_layer=args.group_by_layer, connection_tolerance=args.tolerance)
+    for dxf_path, output_path in results.items():
+        print(f"{dxf_path} -> {output_path or 'ÉCHEC'}")
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
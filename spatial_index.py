@@ -0,0 +1,90 @@
+"""
+Index spatial en grille uniforme pour les boîtes englobantes des segments dessinés.
+
+Utilisé par le rendu (culling : seuls les segments qui intersectent la vue sont
+dessinés) et par la sélection à la souris.
+"""
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+class GridIndex:
+    """
+    Grille uniforme de boîtes englobantes (xmin, ymin, xmax, ymax), stockée en CSR :
+    entries[cell_start[c]:cell_start[c + 1]] sont les index des boîtes qui touchent la cellule c.
+
+    La taille de cellule vise target_per_cell boîtes par cellule en moyenne. Une boîte
+    qui couvre plus de MAX_CELLS_PER_BOX cellules n'est pas répartie dans la grille :
+    elle est testée à chaque requête (cas rare : grands cercles, longs déplacements).
+    """
+    MAX_CELLS_PER_BOX = 64
+
+    def __init__(self, bboxes: np.ndarray, target_per_cell: float = 4.0, max_cells_per_axis: int = 1024):
+        self.bboxes = np.asarray(bboxes, dtype=float).reshape(-1, 4)
+        count = len(self.bboxes)
+        self.nx = self.ny = 0
+        self.entries = np.empty(0, dtype=np.intp)
+        self.cell_start = np.zeros(1, dtype=np.intp)
+        self.large = np.empty(0, dtype=np.intp)
+        if count == 0:
+            self.extent = (0.0, 0.0, 0.0, 0.0)
+            self.cell_size = 1.0
+            return
+
+        x0, y0 = self.bboxes[:, 0].min(), self.bboxes[:, 1].min()
+        x1, y1 = self.bboxes[:, 2].max(), self.bboxes[:, 3].max()
+        self.extent = (x0, y0, x1, y1)
+        width, height = x1 - x0, y1 - y0
+        span = max(width, height, 1e-9)
+        cell_size = math.sqrt(max(width, span * 1e-6) * max(height, span * 1e-6) * target_per_cell / count)
+        self.cell_size = max(cell_size, span / max_cells_per_axis)
+        self.nx = int(width // self.cell_size) + 1
+        self.ny = int(height // self.cell_size) + 1
+
+        ix0, iy0 = self._cell_coords(self.bboxes[:, 0], self.bboxes[:, 1])
+        ix1, iy1 = self._cell_coords(self.bboxes[:, 2], self.bboxes[:, 3])
+        columns = ix1 - ix0 + 1
+        spans = columns * (iy1 - iy0 + 1)
+        is_large = spans > self.MAX_CELLS_PER_BOX
+        self.large = np.nonzero(is_large)[0]
+
+        # Une entrée par couple (boîte, cellule couverte), construites sans boucle Python
+        small = np.nonzero(~is_large)[0]
+        counts = spans[small]
+        owners = np.repeat(small, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (iy0[owners] + local // columns[owners]) * self.nx + ix0[owners] + local % columns[owners]
+        order = np.argsort(cells, kind='stable')
+        self.entries = owners[order]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.nx * self.ny + 1))
+
+    def __len__(self):
+        return len(self.bboxes)
+
+    def _cell_coords(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        ix = np.clip(((np.asarray(x) - self.extent[0]) // self.cell_size).astype(np.intp), 0, self.nx - 1)
+        iy = np.clip(((np.asarray(y) - self.extent[1]) // self.cell_size).astype(np.intp), 0, self.ny - 1)
+        return ix, iy
+
+    def query(self, xmin: float, ymin: float, xmax: float, ymax: float) -> np.ndarray:
+        """Index triés des boîtes qui intersectent le rectangle donné."""
+        if not len(self.bboxes):
+            return np.empty(0, dtype=np.intp)
+        ex0, ey0, ex1, ey1 = self.extent
+        if xmax < ex0 or ymax < ey0 or xmin > ex1 or ymin > ey1:
+            return np.empty(0, dtype=np.intp)
+        if xmin <= ex0 and ymin <= ey0 and xmax >= ex1 and ymax >= ey1:
+            return np.arange(len(self.bboxes)) # Vue englobant tout le dessin
+
+        (cx0, cx1), (cy0, cy1) = self._cell_coords([xmin, xmax], [ymin, ymax])
+        cells = (np.arange(cy0, cy1 + 1)[:, None] * self.nx + np.arange(cx0, cx1 + 1)[None, :]).ravel()
+        starts = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - starts
+        positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        candidates = np.unique(np.concatenate((self.entries[positions], self.large)))
+
+        boxes = self.bboxes[candidates]
+        hit = (boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) & (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin)
+        return candidates[hit]
@@ -0,0 +1,114 @@
+"""
+Tessellation des arcs et cercles en polylignes, partagée par le rendu, les aperçus
+et la simulation.
+
+Le nombre de sommets d'un arc découle d'une tolérance de corde (flèche maximale
+entre l'arc et chaque corde). Les tolérances sont arrondies à une puissance de 2
+inférieure (« bucket ») et les sommets sont mémorisés sous forme normalisée (arc
+centré à l'origine, partant de l'angle 0) par (rayon, balayage, bucket), dans un
+cache LRU borné ; chaque arc n'est plus ensuite qu'une rotation et une translation
+de ce tableau. Les dessins à nombreux arcs de même rayon (perçages, cercles
+tessellés) ne calculent ainsi leurs sinus et cosinus qu'une fois.
+"""
+import math
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+ARC_CHORD_TOLERANCE = 0.05 # mm, flèche maximale de la tessellation de référence (index, sélection, simulation)
+MIN_ARC_STEP_DEG = 0.5 # Pas angulaire minimal : borne le nombre de sommets des grands arcs très zoomés
+MAX_ARC_STEP_DEG = 90.0 # Pas angulaire maximal : un cercle a toujours au moins 4 cordes
+ARC_CACHE_SIZE = 4096 # Nombre d'arcs normalisés gardés en mémoire
+
+_MIN_SAGITTA_RATIO = 1.0 - math.cos(math.radians(MIN_ARC_STEP_DEG) / 2) # Flèche / rayon au pas minimal
+_MAX_SAGITTA_RATIO = 1.0 - math.cos(math.radians(MAX_ARC_STEP_DEG) / 2) # Flèche / rayon au pas maximal
+
+
+def tolerance_bucket(tolerance):
+    """Bucket (exposant de 2) d'une tolérance de corde : 2 ** bucket <= tolerance."""
+    return np.floor(np.log2(tolerance)).astype(np.intp) if isinstance(tolerance, np.ndarray) \
+        else math.floor(math.log2(tolerance))
+
+
+def bucket_range(radius):
+    """
+    Buckets (le plus fin, le plus grossier) utiles pour un rayon : au-delà, le pas angulaire
+    est borné par MIN_ARC_STEP_DEG ou MAX_ARC_STEP_DEG et la tessellation ne change plus.
+    Accepte un rayon ou un tableau de rayons (> 0).
+    """
+    return (tolerance_bucket(radius * _MIN_SAGITTA_RATIO),
+            tolerance_bucket(radius * _MAX_SAGITTA_RATIO))
+
+
+def arc_step_count(radius: float, sweep_deg: float, tolerance: float) -> int:
+    """Nombre de cordes d'un arc pour que leur flèche reste sous tolerance."""
+    ratio = min(max(1.0 - tolerance / radius, -1.0), 1.0) if radius > 0 else -1.0
+    step_deg = min(max(math.degrees(2.0 * math.acos(ratio)), MIN_ARC_STEP_DEG), MAX_ARC_STEP_DEG)
+    return max(2, int(math.ceil(abs(sweep_deg) / step_deg - 1e-9)))
+
+
+@lru_cache(maxsize=ARC_CACHE_SIZE)
+def _normalized_arc(radius: float, sweep_deg: float, bucket: int) -> np.ndarray:
+    """Sommets (lecture seule) d'un arc de centre (0, 0) partant de l'angle 0, à la tolérance 2 ** bucket."""
+    steps = arc_step_count(radius, sweep_deg, 2.0 ** bucket)
+    angles = np.radians(np.arange(steps + 1) * (sweep_deg / steps))
+    points = np.empty((steps + 1, 2))
+    points[:, 0] = radius * np.cos(angles)
+    points[:, 1] = radius * np.sin(angles)
+    points.flags.writeable = False
+    return points
+
+
+def arc_points(center: Tuple[float, float], radius: float, start_deg: float, sweep_deg: float,
+               tolerance: float = ARC_CHORD_TOLERANCE) -> np.ndarray:
+    """Sommets (N x 2) d'un arc parcouru de start_deg sur sweep_deg degrés (sens trigonométrique si positif)."""
+    finest, coarsest = bucket_range(radius) if radius > 0 else (0, 0)
+    bucket = min(max(tolerance_bucket(tolerance), finest), coarsest)
+    points = _normalized_arc(float(radius), float(sweep_deg), bucket)
+    if start_deg % 360:
+        angle = math.radians(start_deg)
+        cos_a, sin_a = math.cos(angle), math.sin(angle)
+        points = points @ np.array(((cos_a, sin_a), (-sin_a, cos_a)))
+    return points + (center[0], center[1])
+
+
+def arc_parameters(segment: Dict) -> Optional[Tuple[float, float, float, float, float]]:
+    """
+    (centre x, centre y, rayon, angle de départ, balayage) d'un ARC ou d'un CIRCLE, None
+    pour un autre type. Comme en DXF, un arc est parcouru dans le sens trigonométrique de
+    start_angle à end_angle ; le sens d'usinage (direction_reversed) ne change pas le tracé.
+    """
+    seg_type = segment.get('type')
+    if seg_type not in ('ARC', 'CIRCLE'):
+        return None
+    coords = segment['coords']
+    center = coords['center']
+    if seg_type == 'CIRCLE':
+        return center[0], center[1], coords['radius'], 0.0, 360.0
+    start_angle = coords['start_angle'] % 360
+    sweep = (coords['end_angle'] % 360) - start_angle
+    if sweep <= 0:
+        sweep += 360
+    return center[0], center[1], coords['radius'], start_angle, sweep
+
+
+def tessellate_segment(segment: Dict, tolerance: float = ARC_CHORD_TOLERANCE) -> Optional[np.ndarray]:
+    """
+    Sommets (tableau N x 2) de la polyligne qui représente un segment : 2 points pour
+    une LINE, une approximation à la tolérance de corde donnée pour un ARC ou un CIRCLE
+    (voir arc_parameters pour le sens de parcours). Retourne None pour un type inconnu.
+    """
+    if segment.get('type') == 'LINE':
+        coords = segment.get('coords', {})
+        return np.array((coords['start_point'][:2], coords['end_point'][:2]), dtype=float)
+    arc = arc_parameters(segment)
+    if arc is None:
+        return None
+    cx, cy, radius, start_angle, sweep = arc
+    return arc_points((cx, cy), radius, start_angle, sweep, tolerance)
+
+
+def cache_info():
+    """Statistiques du cache des arcs normalisés (functools.lru_cache)."""
+    return _normalized_arc.cache_info()
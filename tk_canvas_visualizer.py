@@ -0,0 +1,324 @@
+"""
+Visualiseur G-code léger dessiné directement sur un tk.Canvas, sans matplotlib.
+
+Même interface que GcodeVisualizer (draw_gcode_path, highlight_dxf_entities_by_ids,
+on_entity_clicked, zoom à la molette, pan au glisser) : l'IHM le choisit au démarrage
+(python app_gui.py --renderer tk). Chaque segment est un item natif du canevas (ligne,
+arc ou ovale) placé par une transformation monde -> écran ; le zoom met les items à
+l'échelle côté Tk (Canvas.scale) et le pan fait défiler la vue (scan_mark/scan_dragto),
+sans recalculer ni redessiner les segments en Python.
+"""
+import logging
+import math
+import tkinter as tk
+from typing import List, Dict, Tuple, Callable, Hashable, Iterable, Optional
+
+from instrumentation import TkLoopSampler
+from toolpath_segments import PathGroup, segment_distance
+
+CUT_WIDTH = 2
+JUMP_WIDTH = 1
+JUMP_DASH = (4, 3)
+HIGHLIGHT_COLOR = 'magenta' # Couleur de surbrillance
+HIGHLIGHT_WIDTH = 4
+ZOOM_FACTOR = 1.2 # Facteur de zoom par cran de molette
+
+
+class TkCanvasVisualizer(tk.Frame):
+    CLICK_MAX_MOVE_PX = 3 # Au-delà, un glissement bouton enfoncé est un pan et non un clic
+    PICK_TOLERANCE_PX = 5 # Distance maximale curseur / segment pour la sélection à la souris
+    HOVER_DELAY_MS = 80 # Intervalle minimal entre deux recherches de l'info-bulle
+
+    def __init__(self, master):
+        super().__init__(master)
+        # confine=False : le pan (scan_dragto) peut faire défiler la vue au-delà des items
+        self.canvas = tk.Canvas(self, bg="white", highlightthickness=0, confine=False)
+        self.canvas.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
+
+        # Transformation monde -> canevas : X = x * scale + offset_x, Y = offset_y - y * scale
+        self.scale = 1.0
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+        # Les coupes sont repérées par leur item du canevas, qui ne change pas quand l'ordre du
+        # programme change : une mise à jour incrémentale ne touche que les groupes modifiés
+        self.cut_items: Dict[str, List[int]] = {} # Map: original_id -> [item du canevas, ...]
+        self._item_segments: Dict[int, Dict] = {} # Item de coupe -> segment d'origine
+        self._item_colors: Dict[int, Tuple[str, str]] = {} # Item de coupe -> ('fill' ou 'outline', couleur)
+        self.highlighted_items: set = set()
+        self._groups: Dict[Hashable, List[int]] = {} # Clé de groupe -> items (coupes et G0 internes)
+        self._entry_jump_items: Dict[Tuple, int] = {} # (départ, arrivée) -> item du déplacement G0 d'entrée
+
+        self.canvas.bind("<ButtonPress-1>", self._on_button_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<ButtonRelease-1>", self._on_button_release)
+        self.canvas.bind("<MouseWheel>", self._on_mouse_wheel) # Windows, macOS
+        self.canvas.bind("<Button-4>", lambda event: self._zoom_at(event, ZOOM_FACTOR)) # X11
+        self.canvas.bind("<Button-5>", lambda event: self._zoom_at(event, 1 / ZOOM_FACTOR))
+        self.canvas.bind("<Motion>", self._schedule_hover)
+        self.canvas.bind("<Leave>", lambda event: self._hide_hover())
+
+        self._press_position: Optional[Tuple[int, int]] = None
+        self._pan_moved = False
+        self.loop_sampler = None # Échantillonnage de la boucle Tk pendant pan/zoom (profilage)
+
+        # Sélection à la souris : on_entity_clicked(original_id ou None, ajout) est appelé sur un clic
+        self.on_entity_clicked: Optional[Callable[[Optional[str], bool], None]] = None
+        self.hover_label = tk.Label(self, bg="#FFFFE0", relief="solid", borderwidth=1)
+        self._hover_event = None
+        self._hover_after_id = None
+
+    @property
+    def cut_count(self) -> int:
+        return len(self._item_segments)
+
+    def flush_redraw(self):
+        """Force l'affichage des items en attente (Tk dessine le canevas à l'inactivité)."""
+        self.canvas.update_idletasks()
+
+    def start_loop_sampling(self, interval_ms: int = 10):
+        """Démarre l'échantillonnage du retard de la boucle Tk (voir TkLoopSampler)."""
+        self.loop_sampler = TkLoopSampler(self, interval_ms)
+        self.loop_sampler.start()
+
+    def stop_loop_sampling(self) -> str:
+        """Arrête l'échantillonnage et retourne son résumé (chaîne vide s'il n'était pas actif)."""
+        if self.loop_sampler is None:
+            return ""
+        self.loop_sampler.stop()
+        summary = f"{self.loop_sampler.summary()}\nRendu : Tk Canvas"
+        self.loop_sampler = None
+        return summary
+
+    def to_canvas(self, x: float, y: float) -> Tuple[float, float]:
+        return x * self.scale + self.offset_x, self.offset_y - y * self.scale
+
+    def to_world(self, canvas_x: float, canvas_y: float) -> Tuple[float, float]:
+        return (canvas_x - self.offset_x) / self.scale, (self.offset_y - canvas_y) / self.scale
+
+    def _fit_transform(self, segments: List[Dict]):
+        """Cadre les segments dans la vue actuelle du canevas, avec une marge de 10 %."""
+        xs, ys = [], []
+        for segment in segments:
+            coords = segment.get('coords', {})
+            if segment.get('type') == 'LINE':
+                xs.extend((coords['start_point'][0], coords['end_point'][0]))
+                ys.extend((coords['start_point'][1], coords['end_point'][1]))
+            elif segment.get('type') in ('ARC', 'CIRCLE'):
+                cx, cy = coords['center'][:2]
+                r = coords['radius']
+                xs.extend((cx - r, cx + r))
+                ys.extend((cy - r, cy + r))
+        if xs:
+            min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+        else:
+            min_x, max_x, min_y, max_y = -100.0, 100.0, -100.0, 100.0
+        padding = max((max_x - min_x) * 0.1, (max_y - min_y) * 0.1, 10)
+        width = max(self.canvas.winfo_width(), 2) if self.canvas.winfo_ismapped() else int(self.canvas['width'])
+        height = max(self.canvas.winfo_height(), 2) if self.canvas.winfo_ismapped() else int(self.canvas['height'])
+        self.scale = min(width / (max_x - min_x + 2 * padding), height / (max_y - min_y + 2 * padding))
+        # Centre du dessin au centre de la vue (qui a pu défiler lors d'un pan précédent)
+        view_center_x = self.canvas.canvasx(width / 2)
+        view_center_y = self.canvas.canvasy(height / 2)
+        self.offset_x = view_center_x - (min_x + max_x) / 2 * self.scale
+        self.offset_y = view_center_y + (min_y + max_y) / 2 * self.scale
+
+    def _create_item(self, segment: Dict, color: str, width: int, **options) -> Optional[Tuple[int, str]]:
+        """Crée l'item natif d'un segment ; retourne (item, option de couleur) ou None si type inconnu."""
+        seg_type = segment.get('type')
+        coords = segment['coords']
+        if seg_type == 'LINE':
+            x1, y1 = self.to_canvas(*coords['start_point'][:2])
+            x2, y2 = self.to_canvas(*coords['end_point'][:2])
+            return self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width, **options), 'fill'
+        if seg_type not in ('ARC', 'CIRCLE'):
+            return None
+        cx, cy = self.to_canvas(*coords['center'][:2])
+        r = coords['radius'] * self.scale
+        if seg_type == 'CIRCLE':
+            return self.canvas.create_oval(cx - r, cy - r, cx + r, cy + r, outline=color, width=width,
+                                           **options), 'outline'
+        # Angles Tk comptés dans le sens trigonométrique à l'écran : l'axe Y étant retourné,
+        # ce sont ceux du DXF
+        start_angle = coords['start_angle'] % 360
+        sweep = (coords['end_angle'] % 360 - start_angle) % 360 or 359.999
+        return self.canvas.create_arc(cx - r, cy - r, cx + r, cy + r, start=start_angle, extent=sweep,
+                                      style=tk.ARC, outline=color, width=width, **options), 'outline'
+
+    def draw_gcode_path(self, segments: List[Dict]):
+        """
+        Dessine le chemin G-code sur le canevas (même format que GcodeRenderer.draw_gcode_path).
+        """
+        self.update_gcode_path([PathGroup(None, None, segments)])
+
+    def update_gcode_path(self, groups: List[PathGroup], changed_keys: Optional[Iterable[Hashable]] = None):
+        """
+        Dessine des segments groupés (voir GcodeRenderer.update_gcode_path). changed_keys=None :
+        canevas vidé et vue recadrée ; sinon seuls les items des groupes modifiés, nouveaux ou
+        absents sont supprimés ou créés, les autres restent en place. Les déplacements G0 sont
+        dessinés sous les coupes.
+        """
+        changed = set(changed_keys or ())
+        if changed_keys is None:
+            self.canvas.delete("all")
+            self.cut_items, self._item_segments, self._item_colors = {}, {}, {}
+            self._groups, self._entry_jump_items = {}, {}
+            self._fit_transform([segment for group in groups
+                                 for segment in ([group.entry_jump] if group.entry_jump else []) + group.segments])
+        self.highlight_dxf_entities_by_ids([])
+
+        keys = {group.key for group in groups}
+        for key in [key for key in self._groups if key in changed or key not in keys]:
+            self._delete_group(key)
+        created_count = 0
+        entry_jump_items: Dict[Tuple, int] = {}
+        for group in groups:
+            if group.entry_jump is not None:
+                coords = group.entry_jump['coords']
+                jump_key = (tuple(coords['start_point']), tuple(coords['end_point']))
+                item = self._entry_jump_items.pop(jump_key, None)
+                if item is None:
+                    item, _ = self._create_item(group.entry_jump, 'gray', JUMP_WIDTH, dash=JUMP_DASH, tags=("jump",))
+                entry_jump_items[jump_key] = item
+            if group.key not in self._groups:
+                self._groups[group.key] = self._create_group(group.segments)
+                created_count += len(group.segments)
+        for item in self._entry_jump_items.values(): # Déplacements d'entrée qui n'existent plus
+            self.canvas.delete(item)
+        self._entry_jump_items = entry_jump_items
+        self.canvas.tag_lower("jump")
+        logging.info(f"Dessin de {created_count} segments sur le canevas Tk ({len(self._item_segments)} coupes).")
+
+    def _create_group(self, segments: List[Dict]) -> List[int]:
+        items = []
+        for segment in segments:
+            original_id = segment.get('original_id', 'unknown')
+            is_jump = str(original_id).startswith("JUMP_TO_")
+            color = 'gray' if is_jump else segment.get('color', 'blue')
+            try:
+                if is_jump:
+                    created = self._create_item(segment, color, JUMP_WIDTH, dash=JUMP_DASH, tags=("jump",))
+                else:
+                    created = self._create_item(segment, color, CUT_WIDTH, tags=("cut",))
+            except (KeyError, TypeError, ValueError) as e:
+                logging.warning(f"Segment ignoré ({e}) : {segment}")
+                continue
+            if created is None:
+                logging.warning(f"Type de segment inconnu: {segment.get('type')}")
+                continue
+            item, color_option = created
+            items.append(item)
+            if not is_jump:
+                self.cut_items.setdefault(original_id, []).append(item)
+                self._item_segments[item] = segment
+                self._item_colors[item] = (color_option, color)
+        return items
+
+    def _delete_group(self, key: Hashable):
+        items = self._groups.pop(key)
+        for item in items:
+            segment = self._item_segments.pop(item, None)
+            if segment is not None:
+                del self._item_colors[item]
+                group_items = self.cut_items.get(segment.get('original_id', 'unknown'), [])
+                if item in group_items:
+                    group_items.remove(item)
+        self.canvas.delete(*items)
+
+    def highlight_dxf_entities_by_ids(self, selected_dxf_ids: List[str]):
+        """
+        Met en surbrillance les entités DXF spécifiées par leurs IDs.
+        Seuls les items qui changent d'état depuis la sélection précédente sont modifiés.
+        """
+        selected = {item for dxf_id in selected_dxf_ids for item in self.cut_items.get(dxf_id, ())}
+        for item in self.highlighted_items - selected:
+            if item in self._item_colors:
+                color_option, color = self._item_colors[item]
+                self.canvas.itemconfigure(item, width=CUT_WIDTH, **{color_option: color})
+        for item in selected - self.highlighted_items:
+            self.canvas.itemconfigure(item, width=HIGHLIGHT_WIDTH, **{self._item_colors[item][0]: HIGHLIGHT_COLOR})
+            self.canvas.tag_raise(item)
+        self.highlighted_items = selected
+
+    def _on_mouse_wheel(self, event):
+        self._zoom_at(event, ZOOM_FACTOR if event.delta > 0 else 1 / ZOOM_FACTOR)
+
+    def _zoom_at(self, event, factor: float):
+        """Zoom centré sur la souris : Tk met à l'échelle les coordonnées de tous les items."""
+        if self.loop_sampler is not None:
+            self.loop_sampler.mark_interaction()
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        self.canvas.scale("all", x, y, factor, factor)
+        self.scale *= factor
+        self.offset_x = x + (self.offset_x - x) * factor
+        self.offset_y = y + (self.offset_y - y) * factor
+
+    def _on_button_press(self, event):
+        self._press_position = (event.x, event.y)
+        self._pan_moved = False
+        self.canvas.scan_mark(event.x, event.y)
+        if self.loop_sampler is not None:
+            self.loop_sampler.mark_interaction(True)
+
+    def _on_drag(self, event):
+        if self._press_position is None:
+            return
+        if not self._pan_moved:
+            if math.hypot(event.x - self._press_position[0],
+                          event.y - self._press_position[1]) < self.CLICK_MAX_MOVE_PX:
+                return
+            self._pan_moved = True
+            self._hide_hover()
+        # Défilement de la vue : les items ne bougent pas, la transformation monde -> canevas non plus
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+
+    def _on_button_release(self, event):
+        if self._press_position is not None and not self._pan_moved:
+            self._on_click(event)
+        self._press_position = None
+        if self.loop_sampler is not None:
+            self.loop_sampler.mark_interaction(False)
+
+    def _pick_at(self, event) -> Optional[int]:
+        """Item de la coupe la plus proche du curseur, à moins de PICK_TOLERANCE_PX."""
+        canvas_x, canvas_y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        tolerance = self.PICK_TOLERANCE_PX
+        items = self.canvas.find_overlapping(canvas_x - tolerance, canvas_y - tolerance,
+                                             canvas_x + tolerance, canvas_y + tolerance)
+        x, y = self.to_world(canvas_x, canvas_y)
+        best_item, best_distance = None, tolerance / self.scale
+        for item in items:
+            segment = self._item_segments.get(item)
+            if segment is None:
+                continue
+            distance = segment_distance(segment, x, y)
+            if distance <= best_distance:
+                best_item, best_distance = item, distance
+        return best_item
+
+    def _on_click(self, event):
+        if self.on_entity_clicked is None:
+            return
+        item = self._pick_at(event)
+        additive = bool(event.state & 0x0005) # Shift (0x0001) ou Control (0x0004)
+        self.on_entity_clicked(None if item is None else self._item_segments[item].get('original_id'), additive)
+
+    def _schedule_hover(self, event):
+        # Limite la fréquence des recherches : seule la dernière position est traitée
+        self._hover_event = event
+        if self._hover_after_id is None:
+            self._hover_after_id = self.after(self.HOVER_DELAY_MS, self._update_hover)
+
+    def _update_hover(self):
+        self._hover_after_id = None
+        event, self._hover_event = self._hover_event, None
+        item = self._pick_at(event) if event is not None and self._press_position is None else None
+        if item is None:
+            self._hide_hover()
+            return
+        segment = self._item_segments[item]
+        self.hover_label.config(text=f"{segment.get('type')} {segment.get('original_id')}")
+        self.hover_label.place(x=event.x + 12, y=event.y + 12)
+
+    def _hide_hover(self):
+        self.hover_label.place_forget()
@@ -0,0 +1,162 @@
+"""
+Segments à dessiner (coupes et déplacements G0), sans dépendance graphique.
+
+Partagé par les visualiseurs (matplotlib et Tk Canvas) et les aperçus : ce module
+n'importe ni matplotlib ni numpy, pour que l'IHM en mode Tk Canvas démarre sans eux.
+"""
+import math
+from typing import List, Dict, Tuple, Hashable, Iterable, NamedTuple, Optional
+
+TRAJECTORY_COLORS = [
+    "#FF6666", "#66CC66", "#6699FF", "#FFCC00", "#00CCCC", "#CC66FF", "#FF9966", "#66FFCC"
+]
+
+
+class PathGroup(NamedTuple):
+    """
+    Segments d'une trajectoire ou d'un cercle isolé, au format de draw_gcode_path :
+    entry_jump est le déplacement G0 qui y mène depuis le groupe précédent (None si
+    l'outil y est déjà), segments les coupes et les déplacements G0 internes.
+    """
+    key: Hashable
+    entry_jump: Optional[Dict]
+    segments: List[Dict]
+    start_point: Optional[Tuple[float, float]] = None # None pour une trajectoire vide
+    end_point: Optional[Tuple[float, float]] = None
+    jump_id: str = "" # original_id du déplacement G0 d'entrée
+
+
+def _jump_segment(start: Tuple[float, float], end: Tuple[float, float], jump_id: str) -> Dict:
+    return {
+        'type': 'LINE',
+        'coords': {'start_point': start, 'end_point': end},
+        'color': 'gray',
+        'original_id': jump_id
+    }
+
+
+def _trajectory_group(key: Hashable, trajectory: List[Dict], color: str, connection_tolerance: float) -> PathGroup:
+    segments = []
+    current = None
+    for segment in trajectory:
+        sx, sy = segment['coords']['start_point']
+        if current is not None and math.hypot(current[0] - sx, current[1] - sy) > connection_tolerance:
+            # Ajouter segment G0 fictif
+            segments.append(_jump_segment(current, (sx, sy), f"JUMP_TO_DXF_{segment['original_id']}"))
+        segments.append({
+            'type': segment['type'],
+            'coords': segment['coords'],
+            'color': color,
+            'original_id': segment['original_id'],
+            'direction_reversed': segment.get('direction_reversed', False)
+        })
+        current = segment['coords']['end_point']
+    if not trajectory:
+        return PathGroup(key, None, segments)
+    start_x, start_y = trajectory[0]['coords']['start_point']
+    end_x, end_y = trajectory[-1]['coords']['end_point']
+    return PathGroup(key, None, segments, (start_x, start_y), (end_x, end_y),
+                     f"JUMP_TO_DXF_{trajectory[0]['original_id']}")
+
+
+def _circle_group(key: Hashable, circle: Dict) -> PathGroup:
+    cx, cy = circle['coords']['center']
+    start = (cx + circle['coords']['radius'], cy)
+    segment = {
+        'type': 'CIRCLE',
+        'coords': circle['coords'],
+        'color': 'red',
+        'original_id': circle['original_id']
+    }
+    return PathGroup(key, None, [segment], start, start, f"JUMP_TO_CIRCLE_{circle['original_id']}")
+
+
+def build_path_groups(ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict],
+                      connection_tolerance: float, trajectory_colors: List[str] = TRAJECTORY_COLORS,
+                      initial_position: Tuple[float, float] = (0.0, 0.0),
+                      trajectory_keys: Optional[List[int]] = None,
+                      previous: Optional[Dict[Hashable, PathGroup]] = None,
+                      changed_keys: Iterable[Hashable] = ()) -> List[PathGroup]:
+    """
+    Segments à dessiner groupés dans l'ordre du programme : un PathGroup par trajectoire
+    (clé trajectory_keys[i], par défaut i ; couleur trajectory_colors[clé % n]) puis un par
+    cercle isolé (clé ('circle', original_id)).
+
+    previous (clé -> PathGroup du dessin précédent) : les segments d'un groupe absent de
+    changed_keys sont repris sans être reconstruits ; seul son déplacement G0 d'entrée,
+    qui dépend du groupe précédent, est recalculé.
+    """
+    previous = previous or {}
+    changed_keys = set(changed_keys)
+    keys = trajectory_keys if trajectory_keys is not None else range(len(ordered_trajectories))
+    groups = []
+    current_x, current_y = initial_position
+    items = [(key, trajectory, False) for key, trajectory in zip(keys, ordered_trajectories)]
+    items.extend((('circle', circle['original_id']), circle, True) for circle in isolated_circles)
+    for key, item, is_circle in items:
+        group = previous.get(key) if key not in changed_keys else None
+        if group is None:
+            if is_circle:
+                group = _circle_group(key, item)
+            else:
+                group = _trajectory_group(key, item, trajectory_colors[key % len(trajectory_colors)],
+                                          connection_tolerance)
+        if group.start_point is None:
+            groups.append(group)
+            continue
+        jump = group.entry_jump
+        if jump is None or jump['coords']['start_point'] != (current_x, current_y):
+            # Le groupe précédent a changé : déplacement d'entrée recalculé
+            sx, sy = group.start_point
+            jump = None
+            if math.hypot(current_x - sx, current_y - sy) > connection_tolerance:
+                jump = _jump_segment((current_x, current_y), (sx, sy), group.jump_id)
+            if jump is not None or group.entry_jump is not None:
+                group = group._replace(entry_jump=jump)
+        groups.append(group)
+        current_x, current_y = group.end_point
+    return groups
+
+
+def build_path_segments(ordered_trajectories: List[List[Dict]], isolated_circles: List[Dict],
+                        connection_tolerance: float, trajectory_colors: List[str] = TRAJECTORY_COLORS,
+                        initial_position: Tuple[float, float] = (0.0, 0.0)) -> List[Dict]:
+    """
+    Construit la liste des segments à dessiner (coupes et déplacements G0 visibles)
+    dans l'ordre du programme, au format attendu par draw_gcode_path.
+    """
+    visualizer_segments = []
+    for group in build_path_groups(ordered_trajectories, isolated_circles, connection_tolerance,
+                                   trajectory_colors, initial_position):
+        if group.entry_jump is not None:
+            visualizer_segments.append(group.entry_jump)
+        visualizer_segments.extend(group.segments)
+    return visualizer_segments
+
+
+def segment_distance(segment: Dict, x: float, y: float) -> float:
+    """Distance exacte du point (x, y) à un segment LINE, ARC ou CIRCLE (inf pour un type inconnu)."""
+    seg_type = segment.get('type')
+    coords = segment.get('coords', {})
+    if seg_type == 'LINE':
+        x1, y1 = coords['start_point'][:2]
+        x2, y2 = coords['end_point'][:2]
+        dx, dy = x2 - x1, y2 - y1
+        length_sq = dx * dx + dy * dy
+        u = 0.0 if length_sq == 0 else max(0.0, min(1.0, ((x - x1) * dx + (y - y1) * dy) / length_sq))
+        return math.hypot(x - (x1 + u * dx), y - (y1 + u * dy))
+    if seg_type not in ('ARC', 'CIRCLE'):
+        return math.inf
+    cx, cy = coords['center'][:2]
+    radius = coords['radius']
+    distance_to_center = math.hypot(x - cx, y - cy)
+    if seg_type == 'CIRCLE':
+        return abs(distance_to_center - radius)
+    # Arc parcouru dans le sens trigonométrique de start_angle à end_angle, comme en DXF
+    start_angle = coords['start_angle'] % 360
+    sweep = (coords['end_angle'] % 360 - start_angle) % 360 or 360.0
+    if (math.degrees(math.atan2(y - cy, x - cx)) - start_angle) % 360 <= sweep:
+        return abs(distance_to_center - radius)
+    return min(math.hypot(x - (cx + radius * math.cos(math.radians(angle))),
+                          y - (cy + radius * math.sin(math.radians(angle))))
+               for angle in (start_angle, start_angle + sweep))
@@ -0,0 +1,102 @@
+"""
+Chronologie d'un programme pour la simulation d'usinage du visualiseur.
+
+Tout le parcours (coupes et déplacements G0, dans l'ordre du programme) est
+tessellé une seule fois en tableaux de sommets, avec la longueur et le temps
+cumulés à chaque sommet. Une position dans le temps se retrouve ensuite par
+recherche dichotomique, sans parcourir les segments.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tessellation import tessellate_segment
+
+DEFAULT_FEED_RATE = 1000.0 # mm/min, vitesse de coupe (G1/G2/G3) ; le G-code généré n'en précise pas
+DEFAULT_RAPID_RATE = 5000.0 # mm/min, vitesse des déplacements G0
+
+
+def _oriented_points(segment: Dict) -> Optional[np.ndarray]:
+    """Sommets d'un segment dans le sens de parcours de l'outil (de start_point à end_point)."""
+    points = tessellate_segment(segment)
+    if points is None or segment.get('type') != 'ARC':
+        return points
+    # tessellate_segment parcourt les arcs dans le sens trigonométrique : inverser si l'outil part de l'autre bout
+    start = np.asarray(segment['coords']['start_point'][:2], dtype=float)
+    if np.hypot(*(points[-1] - start)) < np.hypot(*(points[0] - start)):
+        return points[::-1]
+    return points
+
+
+class ToolpathTimeline:
+    """
+    Tableaux de la simulation, indexés par sommet :
+    - vertices (M x 2) : positions successives de l'outil ;
+    - cumulative_length, cumulative_time (M) : longueur (mm) et temps (s) depuis le début ;
+    et par segment (K, dans l'ordre du programme, segments non tessellables exclus comme
+    dans GcodeRenderer.draw_gcode_path) :
+    - segment_first_vertex : premier sommet du segment, segment_ids : son original_id ;
+    - segment_is_rapid : déplacement G0 ;
+    - segment_cut_item : nombre de coupes qui le précèdent, soit son index dans la
+      cut_collection du GcodeRenderer pour une coupe.
+    """
+    def __init__(self, segments: List[Dict], feed_rate: float = DEFAULT_FEED_RATE,
+                 rapid_rate: float = DEFAULT_RAPID_RATE):
+        point_arrays, rapid_flags, self.segment_ids = [], [], []
+        for segment in segments:
+            try:
+                points = _oriented_points(segment)
+            except (KeyError, TypeError, ValueError):
+                continue
+            if points is None:
+                continue
+            point_arrays.append(points)
+            rapid_flags.append(str(segment.get('original_id', '')).startswith("JUMP_TO_"))
+            self.segment_ids.append(segment.get('original_id'))
+
+        counts = np.array([len(points) for points in point_arrays], dtype=np.intp)
+        self.segment_first_vertex = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else counts
+        self.segment_is_rapid = np.array(rapid_flags, dtype=bool)
+        is_cut = (~self.segment_is_rapid).astype(np.intp)
+        self.segment_cut_item = np.cumsum(is_cut) - is_cut
+        self.vertices = np.concatenate(point_arrays) if point_arrays else np.empty((0, 2))
+        vertex_is_rapid = np.repeat(self.segment_is_rapid, counts)
+
+        # Arête i -> i + 1 : à la vitesse du segment qui contient le sommet i + 1
+        edge_lengths = np.hypot(*np.diff(self.vertices, axis=0).T) if len(self.vertices) > 1 else np.empty(0)
+        edge_rates = np.where(vertex_is_rapid[1:], rapid_rate, feed_rate) / 60.0 # mm/s
+        self.cumulative_length = np.concatenate(([0.0], np.cumsum(edge_lengths)))[:len(self.vertices)]
+        self.cumulative_time = np.concatenate(([0.0], np.cumsum(edge_lengths / edge_rates)))[:len(self.vertices)]
+
+    @property
+    def total_time(self) -> float:
+        return float(self.cumulative_time[-1]) if len(self.cumulative_time) else 0.0
+
+    @property
+    def total_length(self) -> float:
+        return float(self.cumulative_length[-1]) if len(self.cumulative_length) else 0.0
+
+    def locate(self, time_s: float) -> Tuple[int, Tuple[float, float]]:
+        """Dernier sommet atteint à l'instant time_s et position interpolée de l'outil."""
+        last = len(self.vertices) - 1
+        if last < 0:
+            return -1, (0.0, 0.0)
+        index = int(np.searchsorted(self.cumulative_time, time_s, side='right')) - 1
+        index = min(max(index, 0), last)
+        if index == last:
+            return index, tuple(self.vertices[last])
+        t0, t1 = self.cumulative_time[index], self.cumulative_time[index + 1]
+        ratio = 0.0 if t1 <= t0 else (time_s - t0) / (t1 - t0)
+        position = self.vertices[index] + (self.vertices[index + 1] - self.vertices[index]) * ratio
+        return index, (float(position[0]), float(position[1]))
+
+    def segment_index_at_vertex(self, vertex_index: int) -> int:
+        """Index (dans segment_ids) du segment en cours au sommet donné, -1 si aucun."""
+        if vertex_index < 0 or not len(self.segment_first_vertex):
+            return -1
+        return int(np.searchsorted(self.segment_first_vertex, vertex_index, side='right')) - 1
+
+    def segment_at_vertex(self, vertex_index: int) -> Optional[str]:
+        """original_id du segment en cours au sommet donné."""
+        segment_index = self.segment_index_at_vertex(vertex_index)
+        return self.segment_ids[segment_index] if segment_index >= 0 else None